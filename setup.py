@@ -9,7 +9,6 @@ with open("README.md") as readme_file:
 
 requirements = [
     "requests",
-    "SPARQLWrapper",
     "tqdm",
     "inflect",
     "pandas",
@@ -20,6 +19,10 @@ test_requirements = ["pytest"]
 
 docs_requirements = ["mkdocs", "mkdocstrings", "mkdocstrings.python"]
 
+arrow_requirements = ["pyarrow"]
+
+fast_requirements = ["orjson"]
+
 setup(
     author="Tiago Lubiana",
     author_email="tiago.lubiana.alves@usp.br",
@@ -44,7 +47,12 @@ setup(
     keywords="wdcuration",
     name="wdcuration",
     packages=find_packages(include=["wdcuration", "wdcuration.*"]),
-    extras_require={"tests": test_requirements, "docs": docs_requirements},
+    extras_require={
+        "tests": test_requirements,
+        "docs": docs_requirements,
+        "arrow": arrow_requirements,
+        "fast": fast_requirements,
+    },
     url="https://github.com/lubianat/wdcuration",
     version="0.2.1",
     zip_safe=False,
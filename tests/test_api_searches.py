@@ -1,7 +1,19 @@
+import json
 import unittest
 import unittest.mock
 
-from wdcuration.api_searches import add_key, get_label_and_description, search_wikidata
+import pandas as pd
+
+from wdcuration.api_searches import (
+    SearchResults,
+    get_label_and_description,
+    merge_search_hits,
+    rerank_candidates,
+    search_expression,
+    search_wikidata,
+    search_wikidata_candidates,
+)
+from wdcuration.dict_handler import add_key
 
 
 class TestWdcurationAPI(unittest.TestCase):
@@ -64,3 +76,138 @@ class TestWdcurationAPI(unittest.TestCase):
         result = add_key(dictionary=target, string="brazil")
 
         self.assertEqual(result, target)
+
+    def test_merge_search_hits(self):
+        result = merge_search_hits([["Q1", "Q2", "Q3"], ["Q2", "Q4"], []])
+
+        self.assertEqual(result, ["Q2", "Q1", "Q4", "Q3"])
+
+    @unittest.mock.patch("wdcuration.api_searches.get_entities")
+    @unittest.mock.patch("wdcuration.api_searches.get_scheduler")
+    def test_search_wikidata_languages(self, mocked_scheduler, mocked_entities):
+        hits = {"pt": ["Q155", "Q1"], "es": ["Q2", "Q155"]}
+        mocked_scheduler.return_value.request.side_effect = (
+            lambda method, url, params: unittest.mock.Mock(
+                content=json.dumps(
+                    {
+                        "query": {
+                            "search": [{"title": q} for q in hits[params["uselang"]]]
+                        }
+                    }
+                )
+            )
+        )
+        mocked_entities.return_value = {
+            "Q155": {
+                "labels": {"pt": {"value": "Brasil"}, "es": {"value": "Brasil"}},
+                "descriptions": {"es": {"value": "país de América del Sur"}},
+            }
+        }
+
+        result = search_wikidata("Brasil", exclude_basic=False, languages=["pt", "es"])
+
+        self.assertEqual(
+            result,
+            {
+                "id": "Q155",
+                "label": "Brasil",
+                "description": "país de América del Sur",
+                "url": "https://www.wikidata.org/wiki/Q155",
+            },
+        )
+        mocked_entities.assert_called_once_with(
+            ["Q155"], ["labels", "descriptions"], ["pt", "es"]
+        )
+        with self.assertRaises(ValueError):
+            search_wikidata("Brasil", top_k=5, languages=["pt"])
+
+    @unittest.mock.patch("wdcuration.api_searches.get_scheduler")
+    def test_search_wikidata_uses_basic_exclusion(self, mocked_scheduler):
+        mocked_scheduler.return_value.request.return_value = unittest.mock.Mock(
+            content=b'{"query": {"search": []}}'
+        )
+
+        search_wikidata("Brazil", exclude_basic=True)
+
+        params = mocked_scheduler.return_value.request.call_args.kwargs["params"]
+        self.assertEqual(
+            params["srsearch"],
+            search_expression("Brazil", [], None, exclude_basic=True),
+        )
+        self.assertIn("-haswbstatement:P31=Q16521", params["srsearch"])
+
+    @unittest.mock.patch("wdcuration.api_searches.get_entities")
+    @unittest.mock.patch("wdcuration.api_searches.get_scheduler")
+    def test_search_wikidata_candidates_language(
+        self, mocked_scheduler, mocked_entities
+    ):
+        mocked_scheduler.return_value.request.return_value = unittest.mock.Mock(
+            content=b'{"query": {"search": []}}'
+        )
+        mocked_entities.return_value = {}
+
+        self.assertEqual(search_wikidata_candidates("Brasil", lang="pt"), [])
+
+        params = mocked_scheduler.return_value.request.call_args.kwargs["params"]
+        self.assertEqual(params["uselang"], "pt")
+        self.assertNotIn("language", params)
+
+    def test_rerank_candidates(self):
+        def entity(label, p31):
+            return {
+                "labels": {"en": {"value": label}},
+                "descriptions": {},
+                "claims": {
+                    "P31": [
+                        {
+                            "mainsnak": {"datavalue": {"value": {"id": p31}}},
+                            "rank": "normal",
+                        }
+                    ]
+                },
+            }
+
+        entities = {
+            "Q1": entity("Brazil", "Q5"),
+            "Q155": entity("Brazil", "Q6256"),
+            "Q2": entity("Brazil nut", "Q11004"),
+        }
+        result = rerank_candidates("brazil", ["Q1", "Q2", "Q155"], entities)
+        self.assertEqual([c["id"] for c in result], ["Q155", "Q2", "Q1"])
+        self.assertEqual(result[0]["description"], "no description")
+
+        result = rerank_candidates(
+            "brazil", ["Q1", "Q2", "Q155"], entities, fixed_type="Q11004"
+        )
+        self.assertEqual([c["id"] for c in result], ["Q2"])
+
+    def test_search_results(self):
+        none = {
+            "id": "NONE",
+            "label": "NONE",
+            "description": "NONE",
+            "url": "https://www.wikidata.org/wiki/NONE",
+        }
+        brazil = {
+            "id": "Q155",
+            "label": "Brazil",
+            "description": "country in South America",
+            "url": "https://www.wikidata.org/wiki/Q155",
+        }
+        results = SearchResults({"Brasil": brazil, "Blob": none})
+        results.add("Brazil", brazil)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results["Blob"], none)
+        self.assertEqual(results.to_dict()["Brazil"], brazil)
+
+        df = pd.DataFrame({"search_term": ["Brazil", "Blob", "Chile", "Brasil"]})
+        joined = results.join(df)
+        self.assertEqual(
+            list(joined["wikidata_id"].fillna("")), ["Q155", "NONE", "", "Q155"]
+        )
+        self.assertIsInstance(joined["wikidata_label"].dtype, pd.CategoricalDtype)
+        self.assertEqual(
+            list(joined["wikidata_label"].cat.categories), ["Brazil", "NONE"]
+        )
+        self.assertTrue(pd.isna(joined["wikidata_description"][2]))
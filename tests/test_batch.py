@@ -0,0 +1,91 @@
+import json
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from wdcuration.batch import CurationJob, SharedRateLimiter, load_manifest, run_jobs
+from wdcuration.instrumentation import RequestEvent, emit_request_event
+from wdcuration.scheduler import get_scheduler
+
+
+def fake_generate(
+    identifiers_property, curation_table_path, output_file_path, **kwargs
+):
+    if identifiers_property == "P0":
+        raise ValueError("unknown property")
+    emit_request_event(RequestEvent("query.wikidata.org/sparql"))
+    Path(output_file_path).write_text(str(get_scheduler().shared_limiter is not None))
+
+
+class TestWdcurationBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_shared_rate_limiter(self):
+        state_path = self.path.joinpath("rate_limit.json")
+        first = SharedRateLimiter(state_path, rates={"example.org": 10})
+        second = SharedRateLimiter(state_path, rates={"example.org": 10})
+
+        delays = [limiter.reserve("example.org") for limiter in [first, second, first]]
+        self.assertAlmostEqual(delays[0], 0.0, places=2)
+        self.assertAlmostEqual(delays[1], 0.1, places=2)
+        self.assertAlmostEqual(delays[2], 0.2, places=2)
+
+        second.block("example.org", 5)
+        self.assertGreater(first.reserve("example.org"), 4.9)
+        self.assertAlmostEqual(first.reserve("other.org"), 0.0, places=2)
+
+    def test_load_manifest(self):
+        json_path = self.path.joinpath("jobs.json")
+        json_path.write_text(
+            json.dumps(
+                {
+                    "jobs": [
+                        {
+                            "identifiers_property": "P123",
+                            "curation_table_path": "a.csv",
+                            "output_file_path": "a_curation.csv",
+                            "excluded_types": ["Q5"],
+                        }
+                    ]
+                }
+            )
+        )
+        csv_path = self.path.joinpath("jobs.csv")
+        csv_path.write_text(
+            "identifiers_property,curation_table_path,output_file_path,excluded_types,exclude_basic\n"
+            "P123,a.csv,a_curation.csv,Q5,\n"
+            "P456,b.csv,b_curation.csv,Q5|Q4167410,true\n"
+        )
+
+        self.assertEqual(load_manifest(json_path)[0], load_manifest(csv_path)[0])
+        second = load_manifest(csv_path)[1]
+        self.assertEqual(second.excluded_types, ["Q5", "Q4167410"])
+        self.assertTrue(second.exclude_basic)
+        self.assertEqual(second.name, "P456:b.csv")
+
+    @unittest.mock.patch(
+        "wdcuration.batch.generate_curation_spreadsheet", side_effect=fake_generate
+    )
+    def test_run_jobs_in_process(self, mocked_generate):
+        jobs = [
+            CurationJob("P123", "a.csv", str(self.path.joinpath("a_curation.csv"))),
+            CurationJob("P0", "b.csv", str(self.path.joinpath("b_curation.csv"))),
+        ]
+        previous_scheduler = get_scheduler()
+
+        results = run_jobs(jobs, processes=1)
+
+        self.assertIs(get_scheduler(), previous_scheduler)
+        self.assertIsNone(results[0].error)
+        self.assertIn("unknown property", results[1].error)
+        self.assertEqual(self.path.joinpath("a_curation.csv").read_text(), "True")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import unittest
+import unittest.mock
+
+from wdcuration.api_searches import search_wikidata
+from wdcuration.cache import (
+    EntityCache,
+    SearchCache,
+    WikibaseAPIError,
+    get_entities,
+    set_entity_cache,
+    set_search_cache,
+)
+from wdcuration.sheet_based_curation import async_search_wikidata
+from wdcuration.sparql import get_statement_values, lookup_label
+
+BRAZIL = {
+    "id": "Q155",
+    "lastrevid": 10,
+    "labels": {"en": {"language": "en", "value": "Brazil"}},
+    "descriptions": {"en": {"language": "en", "value": "country in South America"}},
+    "claims": {
+        "P31": [
+            {
+                "mainsnak": {
+                    "snaktype": "value",
+                    "datavalue": {
+                        "type": "wikibase-entityid",
+                        "value": {"id": "Q6256"},
+                    },
+                },
+                "rank": "normal",
+            }
+        ]
+    },
+}
+COUNTRY = {
+    "id": "Q6256",
+    "lastrevid": 3,
+    "labels": {"en": {"language": "en", "value": "country"}},
+}
+
+
+def wbgetentities(method, url, params):
+    response = unittest.mock.Mock(status_code=200, headers={})
+    entities = {}
+    for qid in params["ids"].split("|"):
+        if not qid[1:].isdigit():
+            error = {"code": "no-such-entity", "info": "Invalid id", "id": qid}
+            response.content = json.dumps({"error": error}).encode()
+            return response
+        entity = {"Q155": BRAZIL, "Q6256": COUNTRY}.get(qid, {"id": qid, "missing": ""})
+        if params["props"] == "info" and "missing" not in entity:
+            entity = {"id": qid, "lastrevid": entity["lastrevid"]}
+        entities[qid] = entity
+    response.content = json.dumps({"entities": entities}).encode()
+    return response
+
+
+@unittest.mock.patch("wdcuration.scheduler.requests.request", side_effect=wbgetentities)
+class TestWdcurationCache(unittest.TestCase):
+    def tearDown(self):
+        set_entity_cache(None)
+
+    def test_cached_entities_are_not_refetched(self, mocked_get):
+        cache = EntityCache()
+        first = get_entities(["Q155", "Q404"], cache=cache)
+        second = get_entities(["Q155"], cache=cache)
+
+        self.assertEqual(mocked_get.call_count, 1)
+        self.assertNotIn("Q404", first)
+        self.assertEqual(second["Q155"]["labels"]["en"]["value"], "Brazil")
+
+    def test_malformed_ids_are_dropped(self, mocked_get):
+        result = get_entities(["Q155", "Brazil", "Q6256"])
+
+        self.assertEqual(list(result), ["Q155", "Q6256"])
+        self.assertEqual(mocked_get.call_count, 2)
+
+    def test_api_errors_are_raised(self, mocked_get):
+        error = {"code": "internal_api_error", "info": "Database error"}
+        mocked_get.side_effect = None
+        mocked_get.return_value = unittest.mock.Mock(
+            status_code=200,
+            headers={},
+            content=json.dumps({"error": error}).encode(),
+        )
+
+        with self.assertRaises(WikibaseAPIError) as context:
+            get_entities(["Q155"])
+        self.assertEqual(context.exception.code, "internal_api_error")
+
+    def test_stale_entities_are_revalidated(self, mocked_get):
+        cache = EntityCache(max_age=0)
+        get_entities(["Q155"], cache=cache)
+        result = get_entities(["Q155"], cache=cache)
+
+        self.assertEqual(mocked_get.call_count, 2)
+        self.assertEqual(mocked_get.call_args.kwargs["params"]["props"], "info")
+        self.assertEqual(
+            result["Q155"]["descriptions"]["en"]["value"],
+            BRAZIL["descriptions"]["en"]["value"],
+        )
+
+    def test_shared_cache_for_sparql_lookups(self, mocked_get):
+        set_entity_cache(EntityCache())
+
+        self.assertEqual(lookup_label("wd:Q155"), "Brazil")
+        self.assertEqual(
+            get_statement_values("Q155", "P31"),
+            ["http://www.wikidata.org/entity/Q6256"],
+        )
+        self.assertEqual(
+            get_statement_values("Q155", "P31", label=True),
+            [{"id": "Q6256", "label": "country"}],
+        )
+        get_statement_values("Q155", "P31", label=True)
+        self.assertEqual(mocked_get.call_count, 3)
+
+
+class TestWdcurationSearchCache(unittest.TestCase):
+    def tearDown(self):
+        set_search_cache(None)
+
+    def test_search_cache(self):
+        cache = SearchCache()
+        result = {"id": "Q155", "label": "Brazil"}
+        cache.put(result, "Brazil", excluded_types=["Q5", "Q4167410"])
+
+        self.assertEqual(
+            cache.get("Brazil", excluded_types=["Q4167410", "Q5", "Q5"]), result
+        )
+        self.assertIsNone(cache.get("Brazil", excluded_types=["Q5"]))
+        self.assertIsNone(cache.get("Brazil", excluded_types=[], fixed_type="Q6256"))
+
+        cache.invalidate(["Brazil"])
+        self.assertIsNone(cache.get("Brazil", excluded_types=["Q5", "Q4167410"]))
+
+    def test_expired_entries_are_ignored(self):
+        cache = SearchCache(ttl=0)
+        cache.put({"id": "Q155"}, "Brazil")
+
+        self.assertIsNone(cache.get("Brazil"))
+
+    @unittest.mock.patch("wdcuration.api_searches._search_wikidata_uncached")
+    def test_search_cache_is_shared_by_sync_and_async_searches(self, mocked_search):
+        mocked_search.return_value = {"id": "Q155", "label": "Brazil"}
+        set_search_cache(SearchCache())
+
+        first = search_wikidata("Brazil", excluded_types=[], exclude_basic=False)
+        second = search_wikidata("Brazil", excluded_types=[], exclude_basic=False)
+        result = asyncio.run(async_search_wikidata("Brazil", session=None))
+
+        self.assertEqual(mocked_search.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(result, {"Brazil": first})
@@ -0,0 +1,68 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from wdcuration.dumps import (
+    LABELS_EXTRACT,
+    EDGES_EXTRACT,
+    IDENTIFIERS_EXTRACT,
+    extract_from_dump,
+    read_extract,
+)
+from wdcuration.local_index import IdentifierIndex
+
+
+def claim(value):
+    return {
+        "mainsnak": {"snaktype": "value", "datavalue": {"value": value}},
+        "rank": "normal",
+    }
+
+
+class TestWdcurationDumps(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        entities = [
+            {
+                "id": f"Q{i}",
+                "labels": {"en": {"language": "en", "value": f"gene {i}"}},
+                "aliases": {"en": [{"language": "en", "value": f"g{i}"}]},
+                "descriptions": {},
+                "claims": {
+                    "P31": [claim({"id": "Q7187" if i % 2 else "Q5"})],
+                    "P279": [claim({"id": "Q7187"})],
+                    "P594": [claim(f"ENSG{i}")],
+                },
+            }
+            for i in range(1, 11)
+        ]
+        self.dump = Path(self.tmp.name).joinpath("dump.json")
+        self.dump.write_text(
+            "[\n" + ",\n".join(json.dumps(e) for e in entities) + "\n]\n"
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_extract_from_dump(self):
+        output_dir = Path(self.tmp.name).joinpath("extract")
+        report = extract_from_dump(
+            self.dump,
+            output_dir,
+            identifier_properties=["P594"],
+            types=["Q7187"],
+            processes=2,
+            lines_per_batch=3,
+        )
+
+        self.assertEqual(report.entities_read, 10)
+        self.assertEqual(report.entities_kept, 5)
+        labels = list(read_extract(output_dir.joinpath(LABELS_EXTRACT)))
+        self.assertEqual(labels[0], ["Q1", "en", "gene 1", "g1", "", "Q7187"])
+        edges = list(read_extract(output_dir.joinpath(EDGES_EXTRACT)))
+        self.assertEqual(edges[-1], ["Q9", "P279", "Q7187"])
+
+        index = IdentifierIndex.from_extract(output_dir.joinpath(IDENTIFIERS_EXTRACT))
+        self.assertEqual(index.items_for_property("P594")["ENSG3"], "Q3")
+        self.assertEqual(index.lookup("P594", ["ENSG2"]), {})
@@ -0,0 +1,79 @@
+import unittest
+import unittest.mock
+
+from wdcuration.cache import EntityCache, get_entities
+from wdcuration.instrumentation import collect_requests, endpoint_name
+from wdcuration.scheduler import RequestScheduler
+
+
+def make_response(status_code=200, headers=None, content=b"{}"):
+    return unittest.mock.Mock(
+        status_code=status_code, headers=headers or {}, content=content
+    )
+
+
+@unittest.mock.patch("wdcuration.scheduler.time.sleep")
+@unittest.mock.patch("wdcuration.scheduler.requests.request")
+class TestWdcurationInstrumentation(unittest.TestCase):
+    def test_requests_are_collected(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = [
+            make_response(429),
+            make_response(200, content=b'{"entities": {}}'),
+            make_response(200, headers={"Content-Length": "10"}),
+            make_response(200),
+        ]
+        scheduler = RequestScheduler()
+
+        with collect_requests() as collector:
+            scheduler.request(
+                "GET",
+                "https://www.wikidata.org/w/api.php",
+                params={"action": "wbgetentities", "ids": "Q155"},
+            )
+            scheduler.request("GET", "https://query.wikidata.org/sparql")
+        scheduler.request("GET", "https://query.wikidata.org/sparql")
+
+        summary = collector.summary()
+        self.assertEqual(
+            list(summary.index),
+            [
+                "query.wikidata.org/sparql",
+                "www.wikidata.org/w/api.php?action=wbgetentities",
+            ],
+        )
+        entities = summary.loc["www.wikidata.org/w/api.php?action=wbgetentities"]
+        self.assertEqual(entities["requests"], 1)
+        self.assertEqual(entities["retries"], 1)
+        self.assertEqual(entities["bytes"], 16)
+        self.assertEqual(summary.loc["query.wikidata.org/sparql", "bytes"], 10)
+
+    def test_cache_hits_are_collected(self, mocked_request, mocked_sleep):
+        response = make_response(
+            content=b'{"entities": {"Q155": {"id": "Q155", "lastrevid": 1, "labels": {}}}}'
+        )
+        mocked_request.return_value = response
+        cache = EntityCache()
+
+        with collect_requests() as collector:
+            get_entities(["Q155"], cache=cache)
+            get_entities(["Q155"], cache=cache)
+
+        hits = [event for event in collector.events if event.cache_hit]
+        self.assertEqual(len(collector.events), 2)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(collector.summary()["cache_hits"].sum(), 1)
+
+
+class TestEndpointName(unittest.TestCase):
+    def test_endpoint_name(self):
+        self.assertEqual(
+            endpoint_name(
+                "https://www.wikidata.org/w/api.php?action=query",
+                {"list": "search", "srsearch": "Brazil"},
+            ),
+            "www.wikidata.org/w/api.php?action=query&list=search",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
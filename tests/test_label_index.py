@@ -0,0 +1,60 @@
+import unittest
+
+from wdcuration.api_searches import search_wikidata
+from wdcuration.label_index import LabelIndex, normalize_label
+
+
+class TestWdcurationLabelIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = LabelIndex.from_records(
+            [
+                {
+                    "item": "http://www.wikidata.org/entity/Q155",
+                    "label": "Brazil",
+                    "aliases": "Brasil|Federative Republic of Brazil",
+                    "description": "country in South America",
+                    "types": "Q6256",
+                },
+                {
+                    "item": "Q1000",
+                    "label": "Brazil",
+                    "description": "1985 film by Terry Gilliam",
+                    "types": ["Q11424"],
+                },
+                {"item": "Q5", "label": "Brazil Smith", "types": ["Q5"]},
+            ]
+        )
+
+    def test_normalize_label(self):
+        self.assertEqual(normalize_label("  São-Paulo  "), "sao paulo")
+
+    def test_search(self):
+        target = {
+            "id": "Q155",
+            "label": "Brazil",
+            "description": "country in South America",
+            "url": "https://www.wikidata.org/wiki/Q155",
+        }
+        self.assertEqual(search_wikidata("brasil", label_index=self.index), target)
+        self.assertEqual(self.index.search("Brazil", fixed_type="Q6256"), target)
+        self.assertEqual(
+            self.index.search("Brazil", excluded_types=["Q6256"])["id"], "Q1000"
+        )
+        self.assertEqual(self.index.search("Argentina")["id"], "NONE")
+
+    def test_candidates_respect_basic_exclusion(self):
+        result = self.index.candidates("Brazil Smith", exclude_basic=True)
+        self.assertNotIn("Q5", [qid for score, qid in result])
+
+        result = self.index.candidates("Brazil Smith", exclude_basic=False)
+        self.assertEqual(result[0], (1.0, "Q5"))
+
+    def test_adding_a_qid_again_merges_it(self):
+        self.index.add("Q155", "Brazil", aliases=["Brasilien"], types=["Q3624078"])
+
+        self.assertEqual(len(self.index.qids), 3)
+        result = self.index.candidates("Brazil", k=10, exclude_basic=False)
+        self.assertEqual([qid for score, qid in result], ["Q155", "Q1000", "Q5"])
+        self.assertEqual(
+            self.index.search("Brasilien", fixed_type="Q6256")["id"], "Q155"
+        )
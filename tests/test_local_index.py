@@ -0,0 +1,87 @@
+import gzip
+import json
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from wdcuration.local_index import IdentifierIndex
+from wdcuration.sparql import (
+    get_wikidata_items_for_id,
+    lookup_id,
+    lookup_multiple_ids,
+    set_default_backend,
+)
+
+
+def statement(value, rank="normal"):
+    return {
+        "mainsnak": {"snaktype": "value", "datavalue": {"value": value}},
+        "rank": rank,
+    }
+
+
+class TestWdcurationLocalIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        entities = [
+            {"id": "Q227339", "claims": {"P594": [statement("ENSG00000012048")]}},
+            {
+                "id": "Q24381608",
+                "claims": {
+                    "P594": [
+                        statement("ENSRNOG00000020701"),
+                        statement("ENSRNOG_OLD", rank="deprecated"),
+                    ]
+                },
+            },
+        ]
+        self.json_dump = Path(self.tmp.name).joinpath("dump.json.gz")
+        with gzip.open(self.json_dump, "wt") as f:
+            f.write("[\n" + ",\n".join(json.dumps(e) for e in entities) + "\n]\n")
+
+    def tearDown(self):
+        set_default_backend(None)
+        self.tmp.cleanup()
+
+    def test_from_json_dump(self):
+        index = IdentifierIndex.from_json_dump(self.json_dump, ["P594"])
+
+        self.assertEqual(lookup_id("ENSG00000012048", "P594", backend=index), "Q227339")
+        self.assertEqual(lookup_id("ENSRNOG_OLD", "P594", backend=index), "")
+        self.assertEqual(
+            get_wikidata_items_for_id("P594", backend=index),
+            {"ENSG00000012048": "Q227339", "ENSRNOG00000020701": "Q24381608"},
+        )
+
+    def test_from_ntriples_as_default_backend(self):
+        dump = Path(self.tmp.name).joinpath("truthy.nt")
+        dump.write_text(
+            "<http://www.wikidata.org/entity/Q227339> "
+            "<http://www.wikidata.org/prop/direct/P594> "
+            '"ENSG00000012048" .\n'
+            "<http://www.wikidata.org/entity/Q227339> "
+            "<http://www.w3.org/2000/01/rdf-schema#label> "
+            '"FOXP2"@en .\n'
+        )
+        index = IdentifierIndex.from_ntriples(dump, ["P594"])
+        set_default_backend(index)
+
+        result = lookup_multiple_ids(["ENSG00000012048", "ENSG_MISSING"], "P594")
+
+        self.assertEqual(result, {"ENSG00000012048": "Q227339"})
+
+    @unittest.mock.patch("wdcuration.sparql.query_wikidata")
+    def test_ids_on_several_items(self, mocked_query):
+        index = IdentifierIndex()
+        index.add([("P594", "ENSG_SHARED", "Q1"), ("P594", "ENSG_SHARED", "Q2")])
+        mocked_query.return_value = [
+            {"id": "ENSG_SHARED", "qid": "Q1"},
+            {"id": "ENSG_SHARED", "qid": "Q2"},
+        ]
+
+        local = lookup_multiple_ids(["ENSG_SHARED"], "P594", backend=index)
+        remote = lookup_multiple_ids(["ENSG_SHARED"], "P594", backend="wdqs")
+
+        self.assertEqual(local, {"ENSG_SHARED": "Q1"})
+        self.assertEqual(remote, local)
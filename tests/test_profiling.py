@@ -0,0 +1,50 @@
+import tracemalloc
+import unittest
+import unittest.mock
+
+from wdcuration.profiling import StageProfiler
+
+
+class TestWdcurationProfiling(unittest.TestCase):
+    def test_stage_profiler(self):
+        profiler = StageProfiler()
+        with profiler.stage("allocate") as stage:
+            data = [str(i) for i in range(100000)]
+            stage.rows = len(data)
+        with profiler.stage("empty", rows=0):
+            pass
+        profiler.close()
+
+        report = profiler.report().set_index("name")
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(list(report.index), ["allocate", "empty"])
+        self.assertGreater(report.loc["allocate", "peak_memory_bytes"], 1000000)
+        self.assertGreater(report.loc["allocate", "rows_per_second"], 0)
+        self.assertTrue(report.loc[["empty"], "rows_per_second"].isna().all())
+
+    @unittest.mock.patch("wdcuration.profiling.hasattr", create=True)
+    def test_stage_profiler_without_reset_peak(self, mocked_hasattr):
+        # Python < 3.9 has no tracemalloc.reset_peak.
+        mocked_hasattr.return_value = False
+        profiler = StageProfiler()
+        with profiler.stage("allocate"):
+            data = [str(i) for i in range(100000)]
+        with profiler.stage("empty"):
+            pass
+        profiler.close()
+
+        report = profiler.report().set_index("name")
+        self.assertGreater(report.loc["allocate", "peak_memory_bytes"], 1000000)
+        self.assertLess(report.loc["empty", "peak_memory_bytes"], 1000000)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_disabled_profiler(self):
+        profiler = StageProfiler(enabled=False)
+        with profiler.stage("load"):
+            pass
+
+        self.assertEqual(len(profiler.report()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,32 @@
+import tempfile
 import unittest
+import unittest.mock
 
-from wdcuration.quickstatements import convert_date_to_quickstatements
+from wdcuration.quickstatements import (
+    Alias,
+    Create,
+    Description,
+    Label,
+    Statement,
+    convert_date_to_quickstatements,
+    drop_existing_commands,
+    render_qs_url,
+    render_qs_urls,
+    split_commands,
+    to_csv,
+    to_v1,
+    write_quickstatements_batches,
+)
+
+
+def new_item(name):
+    return [
+        Create(),
+        Label("LAST", "en", name),
+        Description("LAST", "en", "human"),
+        Statement("LAST", "P31", "Q5"),
+        Statement("LAST", "P496", "0000-0000", is_string=True),
+    ]
 
 
 class TestWdcurationQS(unittest.TestCase):
@@ -16,3 +42,99 @@ class TestWdcurationQS(unittest.TestCase):
         )
 
         self.assertEqual(result_monthday, target_two)
+
+    def test_to_v1(self):
+        commands = new_item("Ana") + [Alias("Q42", "pt", "Douglas")]
+
+        self.assertEqual(
+            to_v1(commands),
+            "CREATE\n"
+            'LAST|Len|"Ana"\n'
+            'LAST|Den|"human"\n'
+            "LAST|P31|Q5\n"
+            'LAST|P496|"0000-0000"\n'
+            'Q42|Apt|"Douglas"',
+        )
+
+    def test_to_csv(self):
+        commands = new_item("Ana") + [
+            Statement("Q42", "P31", "Q5"),
+            Statement("Q42", "P31", "Q1650915"),
+        ]
+
+        self.assertEqual(
+            to_csv(commands),
+            "qid,Len,Den,P31,P31,P496\n"
+            ',Ana,human,Q5,,"""0000-0000"""\n'
+            "Q42,,,Q5,Q1650915,\n",
+        )
+
+    def test_split_commands(self):
+        commands = [c for i in range(10) for c in new_item(f"person {i}")]
+
+        batches = list(split_commands(commands, max_commands=12))
+        self.assertEqual([len(b) for b in batches], [10, 10, 10, 10, 10])
+        self.assertTrue(all(isinstance(b[0], Create) for b in batches))
+        self.assertEqual([c for b in batches for c in b], commands)
+
+        max_url_length = 600
+        urls = list(render_qs_urls(commands, max_url_length=max_url_length))
+        self.assertGreater(len(urls), 1)
+        self.assertTrue(all(len(url) <= max_url_length for url in urls))
+        batches = list(split_commands(commands, max_url_length=max_url_length))
+        self.assertEqual(urls, [render_qs_url(to_v1(b)) for b in batches])
+        self.assertGreater(
+            len(render_qs_url(to_v1(batches[0] + batches[1]))), max_url_length
+        )
+
+    def test_write_quickstatements_batches(self):
+        commands = [c for i in range(5) for c in new_item(f"person {i}")]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_quickstatements_batches(commands, tmp, max_commands=10)
+            self.assertEqual(len(paths), 3)
+            self.assertEqual(paths[-1].read_text(), to_v1(new_item("person 4")))
+
+            paths = write_quickstatements_batches(
+                commands, tmp, max_commands=10, format="csv"
+            )
+            self.assertEqual(paths[0].read_text().count("\n"), 3)
+
+    @unittest.mock.patch(
+        "wdcuration.quickstatements.get_entities",
+        return_value={
+            "Q42": {
+                "labels": {"en": {"language": "en", "value": "Douglas Adams"}},
+                "aliases": {"en": [{"language": "en", "value": "DNA"}]},
+            }
+        },
+    )
+    @unittest.mock.patch(
+        "wdcuration.quickstatements.get_statement_values_for_multiple_qids",
+        return_value={
+            "Q42": {"P31": ["http://www.wikidata.org/entity/Q5"], "P214": ["113230702"]}
+        },
+    )
+    def test_drop_existing_commands(self, mocked_values, mocked_entities):
+        commands = new_item("Ana") + [
+            Statement("Q42", "P31", "Q5"),
+            Statement("Q42", "P214", "113230702", is_string=True),
+            Statement("Q42", "P214", "999", is_string=True),
+            Alias("Q42", "en", "Douglas Adams"),
+            Alias("Q42", "en", "DNA"),
+            Alias("Q42", "en", "Douglas Noel Adams"),
+            Alias("Q42", "en", "Douglas Noel Adams"),
+        ]
+
+        result = drop_existing_commands(commands)
+
+        self.assertEqual(
+            result,
+            new_item("Ana")
+            + [
+                Statement("Q42", "P214", "999", is_string=True),
+                Alias("Q42", "en", "Douglas Noel Adams"),
+            ],
+        )
+        mocked_values.assert_called_once_with(["Q42", "Q42", "Q42"], ["P31", "P214"])
+        self.assertEqual(mocked_entities.call_count, 1)
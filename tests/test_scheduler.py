@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import unittest
+import unittest.mock
+
+from wdcuration import scheduler
+from wdcuration.scheduler import DatabaseLagError, RequestScheduler, TokenBucket
+
+
+def make_response(status_code=200, headers=None):
+    return unittest.mock.Mock(status_code=status_code, headers=headers or {})
+
+
+@unittest.mock.patch("wdcuration.scheduler.time.sleep")
+@unittest.mock.patch("wdcuration.scheduler.requests.request")
+class TestWdcurationScheduler(unittest.TestCase):
+    def test_throttled_requests_are_retried(self, mocked_request, mocked_sleep):
+        mocked_request.side_effect = [
+            make_response(429, {"Retry-After": "7"}),
+            make_response(200, {"X-Database-Lag": "12", "Retry-After": "5"}),
+            make_response(200),
+        ]
+        scheduler = RequestScheduler()
+
+        response = scheduler.request("GET", "https://www.wikidata.org/w/api.php")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mocked_request.call_count, 3)
+        backoffs = [c.args[0] for c in mocked_sleep.call_args_list if c.args[0] > 0]
+        self.assertTrue(any(delay >= 7 for delay in backoffs))
+        self.assertEqual(scheduler.buckets["www.wikidata.org"].rate, 10.0 / 4)
+
+    def test_gives_up_after_max_retries(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = make_response(503)
+        scheduler = RequestScheduler(max_retries=2)
+
+        response = scheduler.request("GET", "https://query.wikidata.org/sparql")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mocked_request.call_count, 3)
+
+    def test_persistent_lag_raises(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = make_response(200, {"X-Database-Lag": "12"})
+        scheduler = RequestScheduler(max_retries=1)
+
+        with self.assertRaises(DatabaseLagError) as context:
+            scheduler.request("GET", "https://www.wikidata.org/w/api.php")
+
+        self.assertEqual(context.exception.lag, 12.0)
+        self.assertEqual(mocked_request.call_count, 2)
+
+    def test_rate_increases_when_healthy(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = make_response(200)
+        scheduler = RequestScheduler(rates={"example.org": 1.0}, increase_after=2)
+
+        for _ in range(4):
+            scheduler.request("GET", "https://example.org/")
+
+        self.assertAlmostEqual(scheduler.buckets["example.org"].rate, 1.21)
+
+    def test_maxlag_is_sent_to_the_wikidata_api(self, mocked_request, mocked_sleep):
+        mocked_request.return_value = make_response(200)
+        scheduler = RequestScheduler(maxlag=5)
+
+        scheduler.request(
+            "GET", "https://www.wikidata.org/w/api.php", params={"action": "query"}
+        )
+
+        self.assertEqual(
+            mocked_request.call_args.kwargs["params"], {"action": "query", "maxlag": 5}
+        )
+
+
+class FakeAsyncResponse:
+    status = 200
+
+    def __init__(self, body, headers=None):
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def read(self):
+        return self.body
+
+    def raise_for_status(self):
+        pass
+
+
+class TestAsyncRequestJson(unittest.TestCase):
+    def test_large_bodies_are_decoded_in_the_executor(self):
+        session = unittest.mock.Mock()
+        session.request.side_effect = lambda method, url: FakeAsyncResponse(b'{"a": 1}')
+        decoding_threads = []
+        original_json_loads = scheduler.json_loads
+
+        def json_loads(data):
+            decoding_threads.append(threading.current_thread())
+            return original_json_loads(data)
+
+        with unittest.mock.patch.object(scheduler, "json_loads", json_loads):
+            for threshold in [1024, 0]:
+                with unittest.mock.patch.object(
+                    scheduler, "EXECUTOR_DECODE_BYTES", threshold
+                ):
+                    result = asyncio.run(
+                        RequestScheduler().async_request_json(
+                            session, "GET", "https://example.org"
+                        )
+                    )
+                self.assertEqual(result, {"a": 1})
+
+        self.assertIs(decoding_threads[0], threading.main_thread())
+        self.assertIsNot(decoding_threads[1], threading.main_thread())
+
+    @unittest.mock.patch("wdcuration.scheduler.asyncio.sleep")
+    def test_persistent_lag_raises(self, mocked_sleep):
+        session = unittest.mock.Mock()
+        session.request.side_effect = lambda method, url: FakeAsyncResponse(
+            b'{"error": {"code": "maxlag"}}', {"X-Database-Lag": "8"}
+        )
+
+        with self.assertRaises(DatabaseLagError) as context:
+            asyncio.run(
+                RequestScheduler(max_retries=1).async_request_json(
+                    session, "GET", "https://www.wikidata.org/w/api.php"
+                )
+            )
+
+        self.assertEqual(context.exception.lag, 8.0)
+        self.assertEqual(session.request.call_count, 2)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reservations_beyond_the_burst_wait(self):
+        bucket = TokenBucket(rate=2.0, capacity=2)
+        now = bucket.updated
+
+        delays = [bucket.reserve(now) for _ in range(4)]
+
+        self.assertEqual(delays, [0.0, 0.0, 0.5, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
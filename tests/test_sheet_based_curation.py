@@ -0,0 +1,219 @@
+import asyncio
+import tempfile
+import tracemalloc
+import unittest
+import unittest.mock
+from pathlib import Path
+
+import pandas as pd
+
+from wdcuration.sheet_based_curation import (
+    async_search_wikidata,
+    generate_curation_spreadsheet,
+    get_quickstatements_for_curated_sheet,
+    score_curation_sheet,
+)
+
+
+class TestWdcurationSheetBasedCuration(unittest.TestCase):
+    def setUp(self):
+        self.sheet = pd.DataFrame(
+            {
+                "id": ["1", "2", "3", "4"],
+                "name": ["Brazils", "Argentina", "São Paulo", "Blob"],
+                "search_term": ["Brazil", "Argentina", "São Paulo", "Blob"],
+                "wikidata_id": ["Q155", "Q414", "Q174", "Q224964"],
+                "wikidata_label": [
+                    "Brazil",
+                    "Argentine Republic",
+                    "Sao Paulo",
+                    "The Blob",
+                ],
+                "wikidata_description": ["country", "country", "city", "1958 film"],
+                "wikidata_aliases": ["", "Argentina|AR", None, ""],
+            }
+        )
+
+    def test_score_curation_sheet(self):
+        result = score_curation_sheet(self.sheet, expected_description_terms=["film"])
+
+        self.assertEqual(list(result["match_score"][:3]), [1.0, 1.0, 1.0])
+        self.assertEqual(
+            list(result["match_status"]), ["accept", "accept", "accept", "review"]
+        )
+
+    def test_quickstatements_filtered_by_score(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("sheet.csv")
+            self.sheet.to_csv(path, index=False)
+            result = get_quickstatements_for_curated_sheet(
+                path, "P123", add_name_as_alias=False, min_score=0.9
+            )
+
+        self.assertEqual(result, 'Q155|P123|"1"\nQ414|P123|"2"\nQ174|P123|"3"\n')
+
+    @unittest.mock.patch(
+        "wdcuration.quickstatements.get_entities",
+        return_value={"Q414": {"aliases": {"en": [{"value": "Argentina"}]}}},
+    )
+    @unittest.mock.patch(
+        "wdcuration.quickstatements.get_statement_values_for_multiple_qids",
+        return_value={"Q155": {"P123": ["1"]}},
+    )
+    def test_quickstatements_skip_existing(self, mocked_values, mocked_entities):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("sheet.csv")
+            self.sheet.iloc[:2].to_csv(path, index=False)
+            result = get_quickstatements_for_curated_sheet(
+                path, "P123", skip_existing=True
+            )
+
+        self.assertEqual(result, 'Q155|Aen|"Brazils"\nQ414|P123|"2"\n')
+        self.assertEqual(mocked_values.call_count, 1)
+
+    @unittest.mock.patch("wdcuration.sheet_based_curation.get_scheduler")
+    def test_async_search_wikidata_languages(self, mocked_scheduler):
+        requests = []
+
+        async def fake_request_json(session, method, url, params):
+            requests.append(params)
+            if params["action"] == "wbgetentities":
+                return {
+                    "entities": {
+                        "Q174": {"labels": {"pt": {"value": "São Paulo"}}},
+                    }
+                }
+            hits = {"pt": ["Q174"], "en": ["Q90", "Q174"]}[params["uselang"]]
+            return {"query": {"search": [{"title": qid} for qid in hits]}}
+
+        mocked_scheduler.return_value.async_request_json = fake_request_json
+
+        result = asyncio.run(
+            async_search_wikidata("São Paulo", None, languages=["pt", "en"])
+        )
+
+        self.assertEqual(result["São Paulo"]["id"], "Q174")
+        self.assertEqual(result["São Paulo"]["label"], "São Paulo")
+        self.assertEqual(result["São Paulo"]["description"], "NONE")
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[-1]["languages"], "pt|en")
+
+
+async def fake_searches(search_terms, **kwargs):
+    return {
+        term: {
+            "id": "NONE" if term == "Blob" else f"Q{len(term)}",
+            "label": term,
+            "description": "NONE",
+            "url": "",
+        }
+        for term in search_terms
+    }
+
+
+@unittest.mock.patch(
+    "wdcuration.sheet_based_curation.run_multiple_searches", side_effect=fake_searches
+)
+@unittest.mock.patch(
+    "wdcuration.sheet_based_curation.get_wikidata_items_for_id",
+    return_value={"4": "Q224964"},
+)
+class TestGenerateCurationSpreadsheet(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_path = Path(self.tmp.name).joinpath("catalog.csv")
+        self.output_path = Path(self.tmp.name).joinpath("curation.csv")
+        pd.DataFrame(
+            {
+                "id": ["1", "2", "3", "4", "5"],
+                "name": ["Brazils", "Argentina", "Blob", "Chile", "Peru"],
+                "description": ["country", "country", "film", "country", "country"],
+            }
+        ).to_csv(self.input_path, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_generate_curation_spreadsheet(self, mocked_ids, mocked_searches):
+        result = generate_curation_spreadsheet(
+            "P123", self.input_path, self.output_path
+        )
+
+        sheet = pd.read_csv(self.output_path, dtype={"id": object})
+        self.assertIsNone(result)
+        self.assertEqual(list(sheet["id"]), ["1", "2", "5"])
+        self.assertEqual(list(sheet["search_term"]), ["Brazil", "Argentina", "Peru"])
+        self.assertEqual(list(sheet["wikidata_id"]), ["Q6", "Q9", "Q4"])
+
+    def test_generate_curation_spreadsheet_with_scores(
+        self, mocked_ids, mocked_searches
+    ):
+        generate_curation_spreadsheet(
+            "P123",
+            self.input_path,
+            self.output_path,
+            drop_nones=False,
+            score_matches=True,
+        )
+
+        sheet = pd.read_csv(self.output_path, dtype={"id": object})
+        self.assertEqual(
+            list(sheet["match_status"]), ["accept", "accept", "reject", "accept"]
+        )
+
+    def test_incremental_generation_with_fingerprints(
+        self, mocked_ids, mocked_searches
+    ):
+        fingerprint_path = Path(self.tmp.name).joinpath("fingerprints.csv")
+        generate_curation_spreadsheet(
+            "P123", self.input_path, self.output_path, fingerprint_path=fingerprint_path
+        )
+        first = pd.read_csv(self.output_path, dtype={"id": object})
+
+        catalog = pd.read_csv(self.input_path, dtype={"id": object})
+        catalog.loc[1, "name"] = "Argentinas"
+        catalog.to_csv(self.input_path, index=False)
+        generate_curation_spreadsheet(
+            "P123", self.input_path, self.output_path, fingerprint_path=fingerprint_path
+        )
+        second = pd.read_csv(self.output_path, dtype={"id": object})
+
+        searched = [c.args[0] for c in mocked_searches.call_args_list]
+        self.assertEqual(list(searched[1]), ["Argentina"])
+        self.assertEqual(list(first["wikidata_id"]), list(second["wikidata_id"]))
+        self.assertEqual(list(second["name"]), ["Brazils", "Argentinas", "Peru"])
+        self.assertEqual(len(pd.read_csv(fingerprint_path)), 4)
+
+    def test_generate_curation_spreadsheet_with_profile(
+        self, mocked_ids, mocked_searches
+    ):
+        report_path = Path(self.tmp.name).joinpath("profile.json")
+        report = generate_curation_spreadsheet(
+            "P123", self.input_path, self.output_path, profile=report_path
+        )
+
+        self.assertEqual(
+            list(report["name"]),
+            [
+                "existing_ids",
+                "load_and_filter",
+                "normalization",
+                "searches",
+                "column_mapping",
+                "dedup",
+                "write",
+            ],
+        )
+        self.assertEqual(report.set_index("name").loc["load_and_filter", "rows"], 5)
+        self.assertTrue((report["peak_memory_bytes"] >= 0).all())
+        self.assertTrue(report_path.exists())
+
+    def test_profiling_stops_when_a_stage_fails(self, mocked_ids, mocked_searches):
+        mocked_searches.side_effect = RuntimeError("search failed")
+
+        with self.assertRaises(RuntimeError):
+            generate_curation_spreadsheet(
+                "P123", self.input_path, self.output_path, profile=True
+            )
+
+        self.assertFalse(tracemalloc.is_tracing())
@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+import pandas as pd
+
+from wdcuration import sheet_io
+from wdcuration.sheet_io import CATALOG_COLUMNS, read_sheet, write_sheet
+
+
+class TestWdcurationSheetIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sheet = pd.DataFrame(
+            {
+                "id": ["001", "002"],
+                "name": ["Brazil", "Argentina"],
+                "url": ["https://example.org/1", "https://example.org/2"],
+                "description": ["country", None],
+            }
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_catalog_columns(self, path):
+        result = read_sheet(path, columns=[*CATALOG_COLUMNS, "missing"])
+        self.assertEqual(list(result.columns), ["id", "name", "description"])
+        self.assertEqual(list(result["id"]), ["001", "002"])
+        self.assertTrue(pd.isna(result["description"][1]))
+
+    def test_csv(self):
+        path = Path(self.tmp.name).joinpath("sheet.csv")
+        write_sheet(self.sheet, path)
+
+        self.check_catalog_columns(path)
+        with unittest.mock.patch.object(sheet_io, "pyarrow", None):
+            self.check_catalog_columns(path)
+
+    def test_csv_bad_lines(self):
+        path = Path(self.tmp.name).joinpath("sheet.csv")
+        write_sheet(self.sheet, path)
+        path.write_text(path.read_text() + "003,Chile,too,many,fields\n")
+
+        self.assertEqual(len(read_sheet(path, skip_bad_lines=True)), 2)
+        with unittest.mock.patch.object(sheet_io, "pyarrow", None):
+            self.assertEqual(len(read_sheet(path, skip_bad_lines=True)), 2)
+
+    @unittest.skipUnless(sheet_io.pyarrow, "pyarrow is not installed")
+    def test_csv_multiline_values(self):
+        # Enough rows to span several blocks of the pyarrow reader.
+        sheet = pd.DataFrame(
+            {
+                "id": [str(i) for i in range(300000)],
+                "name": [f"item\n{i}" for i in range(300000)],
+                "description": "line one\nline two",
+            }
+        )
+        path = Path(self.tmp.name).joinpath("sheet.csv")
+        write_sheet(sheet, path)
+
+        for skip_bad_lines in [False, True]:
+            result = read_sheet(path, skip_bad_lines=skip_bad_lines)
+            self.assertEqual(len(result), 300000)
+            self.assertEqual(result["name"].iloc[-1], "item\n299999")
+
+    @unittest.skipUnless(sheet_io.pyarrow, "pyarrow is not installed")
+    def test_parquet_and_feather(self):
+        for name in ["sheet.parquet", "sheet.feather"]:
+            path = Path(self.tmp.name).joinpath(name)
+            write_sheet(self.sheet, path)
+
+            self.check_catalog_columns(path)
+
+    def test_parquet_without_pyarrow(self):
+        with unittest.mock.patch.object(sheet_io, "pyarrow", None):
+            with self.assertRaises(ImportError):
+                write_sheet(self.sheet, Path(self.tmp.name).joinpath("sheet.parquet"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,30 @@
+import io
 import unittest
+import unittest.mock
 from textwrap import dedent
 
 from wdcuration.sparql import (
     detect_direct_links,
     get_statement_values,
+    get_statement_values_for_multiple_qids,
     get_wikidata_items_for_id,
+    iter_query_wikidata,
     lookup_id,
+    lookup_label,
+    lookup_labels,
     lookup_multiple_ids,
+    parse_csv_result,
+    parse_json_result,
+    parse_tsv_lines,
     query_wikidata,
 )
 
 
 class TestWdcurationSPARQL(unittest.TestCase):
     def test_query_wikidata(self):
-        basic_query = dedent(
-            """
+        basic_query = dedent("""
         SELECT ?item ?itemLabel WHERE { ?item wdt:P31 wd:Q146. }
-        """
-        )
+        """)
 
         target = {"item": "http://www.wikidata.org/entity/Q25171691"}
         basic_res = query_wikidata(basic_query)
@@ -30,14 +37,49 @@ class TestWdcurationSPARQL(unittest.TestCase):
 
         self.assertEqual(bioc_packages["DESeq2"], "Q113018293")
 
-    def test_detect_direct_links(self):
-        # TODO: Need basic example
-        pass
+    @unittest.mock.patch("wdcuration.sparql.query_wikidata")
+    def test_detect_direct_links_in_blocks(self, mocked_query):
+        mocked_query.return_value = [{"a": "Q2", "b": "Q1"}]
+
+        result = detect_direct_links(["Q1", "Q2", "Q3", float("nan")], block_size=2)
+
+        self.assertEqual(mocked_query.call_count, 4)
+        self.assertEqual(result, [{"a": "Q2", "b": "Q1"}])
+
+    @unittest.mock.patch.dict("wdcuration.sparql._label_cache", clear=True)
+    @unittest.mock.patch("wdcuration.sparql.query_wikidata")
+    def test_lookup_labels(self, mocked_query):
+        mocked_query.return_value = [
+            {"qid": "Q155", "label": "Brazil", "lang": "en"},
+            {"qid": "Q155", "label": "Brasil", "lang": "pt"},
+            {"qid": "Q5", "label": "human", "lang": "en"},
+        ]
+        result = lookup_labels(["Q155", "Q5", "Q404"], ["pt"], fallback_chain=["en"])
+        target = {
+            "Q155": {"pt": "Brasil"},
+            "Q5": {"pt": "human"},
+            "Q404": {"pt": ""},
+        }
+        self.assertEqual(result, target)
+
+        self.assertEqual(lookup_label("wd:Q155", lang="en"), "Brazil")
+        self.assertEqual(lookup_labels(["Q155"], "pt"), {"Q155": "Brasil"})
+        self.assertEqual(mocked_query.call_count, 1)
 
-    def test_lookup_label(self):
-        # TODO: Confusing function, unused variables,
-        # Should input qid be preceded by 'wd'?
-        pass
+    @unittest.mock.patch.dict("wdcuration.sparql._label_cache", clear=True)
+    @unittest.mock.patch("wdcuration.sparql.LABEL_CACHE_SIZE", 10)
+    @unittest.mock.patch("wdcuration.sparql.query_wikidata")
+    def test_lookup_labels_beyond_the_cache_size(self, mocked_query):
+        qids = [f"Q{i}" for i in range(1, 31)]
+        mocked_query.side_effect = lambda query: [
+            {"qid": qid, "label": f"item {qid}", "lang": "en"}
+            for qid in qids
+            if f"wd:{qid} " in query
+        ]
+
+        result = lookup_labels(qids, chunk_size=10)
+
+        self.assertEqual(result, {qid: f"item {qid}" for qid in qids})
 
     def test_get_list(self):
         target = ["1.C.110.1.1"]
@@ -67,3 +109,130 @@ class TestWdcurationSPARQL(unittest.TestCase):
         result_list = lookup_multiple_ids(ensg_ids, "P594", return_type="list")
 
         self.assertEqual(result_list, target_list)
+
+    def test_parse_json_result(self):
+        bindings = [
+            {
+                "item": {"type": "uri", "value": "http://www.wikidata.org/entity/Q1"},
+                "count": {
+                    "type": "literal",
+                    "datatype": "http://www.w3.org/2001/XMLSchema#integer",
+                    "value": "3",
+                },
+                "date": {
+                    "type": "literal",
+                    "datatype": "http://www.w3.org/2001/XMLSchema#dateTime",
+                    "value": "2022-01-08T00:00:00Z",
+                },
+                "label": {"type": "literal", "xml:lang": "en", "value": "universe"},
+            },
+            {
+                "item": {"type": "uri", "value": "http://www.wikidata.org/entity/Q2"},
+                "label": {"type": "literal", "xml:lang": "en", "value": "Earth"},
+            },
+        ]
+        result = parse_json_result(["item", "count", "date", "label"], bindings)
+
+        self.assertEqual(list(result["item"]), ["Q1", "Q2"])
+        self.assertEqual(str(result["count"].dtype), "Int64")
+        self.assertEqual(result["count"][0], 3)
+        self.assertTrue(result["count"].isna()[1])
+        self.assertEqual(result["date"][0].year, 2022)
+        self.assertEqual(list(result["label"]), ["universe", "Earth"])
+
+    def test_parse_csv_result(self):
+        data = (
+            b"item,count,date\r\n"
+            b"http://www.wikidata.org/entity/Q1,3,2022-01-08T00:00:00Z\r\n"
+            b"http://www.wikidata.org/entity/Q2,4,2021-01-08T00:00:00Z\r\n"
+        )
+        result = parse_csv_result(data)
+
+        self.assertEqual(list(result["item"]), ["Q1", "Q2"])
+        self.assertEqual(list(result["count"]), [3, 4])
+        self.assertEqual(result["date"][1].year, 2021)
+
+    def test_parse_tsv_lines(self):
+        lines = [
+            "?item\t?label\t?count",
+            '<http://www.wikidata.org/entity/Q1>\t"uni\\tverse"@en\t"3"^^<http://www.w3.org/2001/XMLSchema#integer>',
+            "<http://www.wikidata.org/entity/Q2>\t\t4",
+        ]
+        target = [
+            {
+                "item": "http://www.wikidata.org/entity/Q1",
+                "label": "uni\tverse",
+                "count": "3",
+            },
+            {"item": "http://www.wikidata.org/entity/Q2", "count": "4"},
+        ]
+        result = list(parse_tsv_lines(lines))
+
+        self.assertEqual(result, target)
+
+    @unittest.mock.patch("wdcuration.sparql._sparql_request")
+    def test_iter_query_wikidata_batches(self, mocked_request):
+        response = mocked_request.return_value
+        response.__enter__.return_value = response
+        response.raw = io.BytesIO(b'?id\n"a"\n"b"\n"c"\n')
+
+        result = list(iter_query_wikidata("SELECT ?id WHERE {}", batch_size=2))
+
+        self.assertEqual(result, [({"id": "a"}, {"id": "b"}), ({"id": "c"},)])
+
+    @unittest.mock.patch("wdcuration.sparql._sparql_request")
+    def test_iter_query_wikidata_unicode_line_breaks(self, mocked_request):
+        response = mocked_request.return_value
+        response.__enter__.return_value = response
+        response.raw = io.BytesIO(
+            '?label\t?id\n"c\x85d"\t"Q2"\n"e\u2028f\x0cg"\t"Q3"\n'.encode("utf-8")
+        )
+
+        result = list(iter_query_wikidata("SELECT ?label ?id WHERE {}"))
+
+        target = [
+            {"label": "c\x85d", "id": "Q2"},
+            {"label": "e\u2028f\x0cg", "id": "Q3"},
+        ]
+        self.assertEqual(result, target)
+
+    @unittest.mock.patch("wdcuration.scheduler.requests.request")
+    def test_long_queries_use_post(self, mocked_request):
+        mocked_request.return_value.status_code = 200
+        mocked_request.return_value.headers = {}
+        mocked_request.return_value.content = (
+            b'{"head": {"vars": []}, "results": {"bindings": []}}'
+        )
+
+        query_wikidata("SELECT ?item WHERE { ?item wdt:P31 wd:Q5 . }")
+        self.assertEqual(mocked_request.call_args.args[0], "GET")
+
+        values = " ".join(f"wd:Q{i}" for i in range(1000))
+        query_wikidata(f"SELECT ?item WHERE {{ VALUES ?item {{ {values} }} }}")
+        self.assertEqual(mocked_request.call_args.args[0], "POST")
+        headers = mocked_request.call_args.kwargs["headers"]
+        self.assertIn("gzip", headers["Accept-Encoding"])
+
+    @unittest.mock.patch("wdcuration.sparql.query_wikidata")
+    def test_get_statement_values_for_multiple_qids(self, mocked_query):
+        mocked_query.side_effect = [
+            [
+                {
+                    "qid": "Q283350",
+                    "property": "P31",
+                    "value": "http://www.wikidata.org/entity/Q8054",
+                    "valueLabel": "protein",
+                }
+            ],
+            [],
+        ]
+        result = get_statement_values_for_multiple_qids(
+            ["Q283350", "Q1"], ["P31", "P7260"], label=True, chunk_size=1
+        )
+        target = {
+            "Q283350": {"P31": [{"id": "Q8054", "label": "protein"}], "P7260": []},
+            "Q1": {"P31": [], "P7260": []},
+        }
+
+        self.assertEqual(mocked_query.call_count, 2)
+        self.assertEqual(result, target)
@@ -0,0 +1,51 @@
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from wdcuration.subclass_graph import SubclassGraph
+
+
+class TestWdcurationSubclassGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = SubclassGraph.from_edges(
+            [("Q3", "Q2"), ("Q2", "Q1"), ("Q4", "Q1"), ("Q5", "Q6")]
+        )
+
+    def test_ancestors_and_descendants(self):
+        self.assertEqual(self.graph.ancestors("Q3"), {"Q2", "Q1"})
+        self.assertEqual(self.graph.descendants("Q1"), {"Q2", "Q3", "Q4"})
+        self.assertEqual(self.graph.ancestors("Q404"), set())
+
+    def test_detect_links(self):
+        target = [
+            {"a": "Q2", "b": "Q1"},
+            {"a": "Q3", "b": "Q1"},
+            {"a": "Q3", "b": "Q2"},
+            {"a": "Q4", "b": "Q1"},
+        ]
+        result = self.graph.detect_links(["Q1", "Q3", "Q4", "Q2", "Q5"])
+        self.assertEqual(sorted(result, key=lambda x: x["a"]), target)
+
+    def test_closure_save_and_load(self):
+        self.graph.compute_closure()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp).joinpath("graph.npz")
+            self.graph.save(path)
+            loaded = SubclassGraph.load(path)
+
+        self.assertIsNotNone(loaded.closure_indptr)
+        self.assertTrue(loaded.is_linked("Q3", "Q1"))
+        self.assertFalse(loaded.is_linked("Q1", "Q3"))
+        self.assertEqual(loaded.ancestors("Q3"), {"Q2", "Q1"})
+
+    @unittest.mock.patch("wdcuration.subclass_graph.query_wikidata")
+    def test_from_wikidata(self, mocked_query):
+        mocked_query.return_value = [
+            {"source": "Q3", "target": "Q2"},
+            {"source": "Q2", "target": "Q1"},
+        ]
+        graph = SubclassGraph.from_wikidata(["Q3"])
+
+        self.assertIn("wdt:P279* ?item", mocked_query.call_args.args[0])
+        self.assertTrue(graph.is_linked("Q3", "Q1"))
@@ -1,6 +1,9 @@
+import json
 import unittest
+import unittest.mock
 
-from wdcuration.utils import chunk
+from wdcuration import utils
+from wdcuration.utils import chunk, json_loads
 
 
 class TestWdcurationUtils(unittest.TestCase):
@@ -9,3 +12,11 @@ class TestWdcurationUtils(unittest.TestCase):
         result = list(chunk([1, 2, 3, 4], 2))
 
         self.assertEqual(result, target)
+
+    def test_json_loads(self):
+        for orjson in [utils.orjson, None]:
+            with unittest.mock.patch.object(utils, "orjson", orjson):
+                self.assertEqual(json_loads(b'{"id": "Q155"}'), {"id": "Q155"})
+                self.assertEqual(json_loads('["São Paulo"]'), ["São Paulo"])
+                with self.assertRaises(json.JSONDecodeError):
+                    json_loads("{")
@@ -4,7 +4,21 @@ __author__ = """Tiago Lubiana"""
 __email__ = "tiago.lubiana.alves@usp.br"
 __version__ = "0.2.1"
 
-from wdcuration.api_searches import parse_wikidata_result, search_wikidata
+from wdcuration.api_searches import (
+    SearchResults,
+    parse_wikidata_result,
+    search_wikidata,
+    search_wikidata_candidates,
+)
+from wdcuration.batch import CurationJob, load_manifest, run_jobs
+from wdcuration.cache import (
+    EntityCache,
+    SearchCache,
+    WikibaseAPIError,
+    get_entities,
+    set_entity_cache,
+    set_search_cache,
+)
 from wdcuration.dict_handler import (
     NewItemConfig,
     WikidataDictAndKey,
@@ -12,27 +26,45 @@ from wdcuration.dict_handler import (
     add_key,
     add_key_and_save_to_independent_dict
 )
+from wdcuration.instrumentation import (
+    add_request_hook,
+    collect_requests,
+    remove_request_hook,
+)
+from wdcuration.label_index import LabelIndex
+from wdcuration.local_index import IdentifierIndex
+from wdcuration.profiling import StageProfiler
 from wdcuration.quickstatements import (
     convert_date_to_quickstatements,
     render_qs_url,
+    render_qs_urls,
     today_in_quickstatements,
+    write_quickstatements_batches,
 )
+from wdcuration.scheduler import DatabaseLagError, RequestScheduler, set_scheduler
 from wdcuration.sheet_based_curation import (
+    fingerprint_rows,
     generate_curation_spreadsheet,
     get_quickstatements_for_curated_sheet,
     get_subset_not_on_wikidata,
     print_quickstatements_for_curated_sheet,
     run_multiple_searches,
+    score_curation_sheet,
 )
+from wdcuration.sheet_io import read_sheet, write_sheet
 from wdcuration.sparql import (
     detect_direct_links,
     get_statement_values,
+    get_statement_values_for_multiple_qids,
     get_wikidata_items_for_id,
     lookup_id,
     lookup_multiple_ids,
     lookup_label,
+    lookup_labels,
     lookup_value_for_multiple_qids,
     query_wikidata,
+    set_default_backend,
 )
+from wdcuration.subclass_graph import SubclassGraph
 from wdcuration.utils import divide_in_chunks_of_equal_len
 from wdcuration.wikipedia import get_qids_from_enwiki_pages
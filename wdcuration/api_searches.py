@@ -1,10 +1,49 @@
 """Other Wikidata-related searches, mostly using Cirrus Search"""
 import webbrowser
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
 from urllib.parse import quote
 
-import requests
+import numpy as np
+import pandas as pd
 
+from wdcuration.cache import WIKIDATA_API, get_entities, get_search_cache
+from wdcuration.instrumentation import emit_cache_hit
+from wdcuration.scheduler import get_scheduler
 from wdcuration.sparql import query_wikidata
+from wdcuration.utils import json_loads, normalize_label, truthy_values
+
+BASIC_EXCLUSION = list(
+    {
+        "Q26842193": "journal",
+        "Q5633421": "scientific journal",
+        "Q737498": "academic journal",
+        "Q7725634": "literary work",
+        "Q47461344": "written work",
+        "Q101352": "family name",
+        "Q13442814": "scholarly article",
+        "Q732577": "publication",
+        "Q3331189": "version, edition or translation",
+        "Q187685": "doctoral thesis",
+        "Q1266946": "thesis",
+        "Q4167410": "disambiguation page",
+        "Q16521": "taxon",
+        "Q4167836": "Wikimedia category",
+        "Q30612": "clinical trial",
+        "Q215380": "musical group",
+        "Q482994": "musical album",
+        "Q105543609": "musical work",
+        "Q134556": "music single",
+        "Q5": "human",
+        "Q838795": "comic strip",
+        "Q3305213": "painting",
+        "Q21191270": "television series episode",
+        "Q15711870": "animated character",
+    }.keys()
+)
+# The number of hits per language considered by multilingual searches.
+MULTILINGUAL_SEARCH_LIMIT = 5
 
 
 def search_wikidata(
@@ -12,63 +51,321 @@ def search_wikidata(
     excluded_types=[],
     fixed_type=None,
     exclude_basic=True,
+    label_index=None,
+    top_k=None,
+    languages=None,
 ):
     """
     Looks up string on Wikidata
+
+    If a `wdcuration.label_index.LabelIndex` is passed as label_index,
+    the search is answered locally, without network calls.
+    If top_k is set, the best of the first top_k hits after local re-ranking is
+    returned instead (see `search_wikidata_candidates`).
+    If a list of languages is set, the string is searched in each language, the hits
+    are merged with `merge_search_hits`, and the label and description of the best
+    hit are taken from the first language that has them (see `multilingual_result`).
+    top_k can not be combined with languages.
+    Results are reused from the search cache, if one is set with
+    `wdcuration.cache.set_search_cache`.
     """
+    if label_index is not None:
+        return label_index.search(
+            search_term,
+            excluded_types=excluded_types,
+            fixed_type=fixed_type,
+            exclude_basic=exclude_basic,
+        )
+    if languages is not None and top_k is not None:
+        raise ValueError("top_k can not be combined with languages")
+    search_cache = get_search_cache()
+    options = {
+        "excluded_types": excluded_types,
+        "fixed_type": fixed_type,
+        "exclude_basic": exclude_basic,
+        "top_k": top_k,
+    }
+    if languages is not None:
+        options["language"] = "|".join(languages)
+    if search_cache is not None:
+        cached = search_cache.get(search_term, **options)
+        if cached is not None:
+            emit_cache_hit(WIKIDATA_API, {"action": "query", "list": "search"})
+            return cached
+    if languages is not None:
+        parsed_res = _search_wikidata_multilingual(
+            search_term, excluded_types, fixed_type, exclude_basic, languages
+        )
+    else:
+        parsed_res = _search_wikidata_uncached(
+            search_term, excluded_types, fixed_type, exclude_basic, top_k
+        )
+    if search_cache is not None:
+        search_cache.put(parsed_res, search_term, **options)
+    return parsed_res
 
-    basic_exclusion = list(
-        {
-            "Q26842193": "journal",
-            "Q5633421": "scientific journal",
-            "Q737498": "academic journal",
-            "Q7725634": "literary work",
-            "Q47461344": "written work",
-            "Q101352": "family name",
-            "Q13442814": "scholarly article",
-            "Q732577": "publication",
-            "Q3331189": "version, edition or translation",
-            "Q187685": "doctoral thesis",
-            "Q1266946": "thesis",
-            "Q4167410": "disambiguation page",
-            "Q3754629": "taxon",
-            "Q4167836": "Wikimedia category",
-            "Q30612": "clinical trial",
-            "Q215380": "musical group",
-            "Q482994": "musical album",
-            "Q105543609": "musical work",
-            "Q5": "human",
-            "Q838795": "comic strip",
-        }.keys()
+
+def _search_wikidata_uncached(
+    search_term, excluded_types, fixed_type, exclude_basic, top_k
+):
+    if top_k is not None:
+        candidates = search_wikidata_candidates(
+            search_term,
+            k=top_k,
+            excluded_types=excluded_types,
+            fixed_type=fixed_type,
+            exclude_basic=exclude_basic,
+        )
+        if not candidates:
+            return parse_wikidata_result({"query": {"search": []}})
+        best = candidates[0]
+        return {key: best[key] for key in ["id", "label", "description", "url"]}
+
+    expression = search_expression(
+        search_term, excluded_types, fixed_type, exclude_basic
     )
-    excluded_types_local = excluded_types
+    payload = {
+        "action": "query",
+        "list": "search",
+        "srsearch": expression,
+        "language": "en",
+        "format": "json",
+        "origin": "*",
+    }
+
+    res = get_scheduler().request("GET", WIKIDATA_API, params=payload)
 
-    # Workaround to avoid accumulation. Not sure why, but they are accumulating.
-    excluded_types_local = list(set(excluded_types_local))
+    parsed_res = parse_wikidata_result(json_loads(res.content))
+    return parsed_res
 
-    if exclude_basic == True:
-        for excluded_type in basic_exclusion:
-            excluded_types_local.append(excluded_type)  # Disambiguation page
 
-    for excluded_type in excluded_types_local:
-        search_term += f" -haswbstatement:P31={excluded_type} "
+def _search_wikidata_multilingual(
+    search_term, excluded_types, fixed_type, exclude_basic, languages
+):
+    expression = search_expression(
+        search_term, excluded_types, fixed_type, exclude_basic
+    )
+    # The scheduler is thread-safe, so the languages are searched concurrently.
+    with ThreadPoolExecutor(max_workers=len(languages)) as executor:
+        responses = executor.map(
+            lambda language: get_scheduler().request(
+                "GET",
+                WIKIDATA_API,
+                params=multilingual_search_payload(expression, language),
+            ),
+            languages,
+        )
+        hit_lists = [
+            [hit["title"] for hit in json_loads(res.content)["query"]["search"]]
+            for res in responses
+        ]
+    qids = merge_search_hits(hit_lists)
+    entities = get_entities(qids[:1], ["labels", "descriptions"], languages)
+    return multilingual_result(qids, entities, languages)
+
+
+def search_expression(search_term, excluded_types, fixed_type, exclude_basic):
+    """
+    Adds "haswbstatement" filters for the excluded types (and BASIC_EXCLUSION, if
+    exclude_basic is True) and the fixed type to a search term.
+    """
+    excluded = list(dict.fromkeys(excluded_types or []))
+    if exclude_basic:
+        excluded += [t for t in BASIC_EXCLUSION if t not in excluded]
+    expression = search_term
+    for excluded_type in excluded:
+        expression += f" -haswbstatement:P31={excluded_type} "
     if fixed_type is not None:
-        search_term += f" haswbstatement:P31={fixed_type} "
+        expression += f" haswbstatement:P31={fixed_type} "
+    return expression
+
+
+def multilingual_search_payload(expression, language):
+    """
+    Returns the search API parameters for one language of a multilingual search.
+
+    list=search has no language parameter; uselang sets the language used for matching.
+    """
+    return {
+        "action": "query",
+        "list": "search",
+        "srsearch": expression,
+        "srlimit": MULTILINGUAL_SEARCH_LIMIT,
+        "uselang": language,
+        "format": "json",
+        "origin": "*",
+    }
+
+
+def merge_search_hits(hit_lists):
+    """
+    Merges the QIDs found by searches in several languages, without duplicates.
+
+    QIDs are ranked by the sum of their reciprocal ranks in the searches, so items
+    found in several languages come first. Ties keep the order of first appearance.
+
+    Args:
+      hit_lists (list): A list of QIDs for each search, in search order.
+
+    Returns:
+      list: The merged QIDs, best first.
+    """
+    scores = {}
+    for hits in hit_lists:
+        for rank, qid in enumerate(hits):
+            scores[qid] = scores.get(qid, 0) + 1 / (rank + 1)
+    return sorted(scores, key=lambda qid: -scores[qid])
+
+
+def multilingual_result(qids, entities, languages):
+    """
+    Returns a search result for the first of qids, in the format of `parse_wikidata_result`.
+
+    The label and description are those of the first language in languages that has them.
+
+    Args:
+      qids (list): The merged QIDs, best first.
+      entities (dict): A QID:entity dictionary in the wbgetentities format, with the
+        labels and descriptions of the first QID in all languages.
+      languages (list): The languages, in order of preference.
+    """
+    if not qids:
+        return parse_wikidata_result({"query": {"search": []}})
+    qid = qids[0]
+    entity = entities.get(qid, {})
+    result = {"id": qid}
+    for kind, key in [("labels", "label"), ("descriptions", "description")]:
+        terms = entity.get(kind, {})
+        result[key] = next(
+            (terms[lang]["value"] for lang in languages if lang in terms), "NONE"
+        )
+    result["url"] = f"https://www.wikidata.org/wiki/{qid}"
+    return result
 
-    base_url = "https://www.wikidata.org/w/api.php"
+
+def search_wikidata_candidates(
+    search_term,
+    k=5,
+    excluded_types=None,
+    fixed_type=None,
+    exclude_basic=True,
+    preferred_types=None,
+    lang="en",
+):
+    """
+    Looks up string on Wikidata and returns up to k re-ranked candidates.
+
+    The search is run without "haswbstatement" filters, which degrade the ranking
+    of Cirrus Search. Labels, descriptions, aliases and types of the first k hits are
+    fetched in one batched call and the type filtering and ranking happen locally
+    (see `rerank_candidates`).
+
+    Args:
+      search_term (str): The string to search.
+      k (int): The number of hits to consider. Defaults to 5.
+      excluded_types (list): P31 values whose items are dropped.
+      fixed_type (str): If set, only items with this P31 value are kept.
+      exclude_basic (bool): Whether to penalize items with a type in BASIC_EXCLUSION. Defaults to True.
+      preferred_types (list): P31 values whose items get a bonus.
+      lang (str): The language of labels and descriptions. Defaults to "en".
+
+    Returns:
+      list: Dicts with "id", "label", "description", "url", "types" and "score", best first.
+    """
     payload = {
         "action": "query",
         "list": "search",
         "srsearch": search_term,
-        "language": "en",
+        "srlimit": k,
+        "uselang": lang,
         "format": "json",
         "origin": "*",
     }
+    res = get_scheduler().request(
+        "GET", "https://www.wikidata.org/w/api.php", params=payload
+    )
+    qids = [hit["title"] for hit in json_loads(res.content)["query"]["search"]]
+    entities = get_entities(
+        qids, ["labels", "descriptions", "aliases", "claims"], [lang]
+    )
+    return rerank_candidates(
+        search_term,
+        qids,
+        entities,
+        excluded_types=excluded_types,
+        fixed_type=fixed_type,
+        exclude_basic=exclude_basic,
+        preferred_types=preferred_types,
+        lang=lang,
+    )
 
-    res = requests.get(base_url, params=payload)
 
-    parsed_res = parse_wikidata_result(res.json())
-    return parsed_res
+def rerank_candidates(
+    search_term,
+    qids,
+    entities,
+    excluded_types=None,
+    fixed_type=None,
+    exclude_basic=True,
+    preferred_types=None,
+    lang="en",
+):
+    """
+    Filters and re-ranks search hits locally.
+
+    The score is the best string similarity between the search term and the label
+    or aliases, plus a small bonus for the original search rank and for preferred
+    types, minus a penalty for types in BASIC_EXCLUSION.
+
+    Args:
+      search_term (str): The string searched.
+      qids (list): The QIDs of the hits, in search order.
+      entities (dict): A QID:entity dictionary in the wbgetentities format,
+        with labels, descriptions, aliases and claims.
+
+    Returns:
+      list: Dicts with "id", "label", "description", "url", "types" and "score", best first.
+    """
+    excluded = set(excluded_types or [])
+    preferred = set(preferred_types or [])
+    basic = set(BASIC_EXCLUSION) if exclude_basic else set()
+    normalized_term = normalize_label(search_term)
+
+    candidates = []
+    for rank, qid in enumerate(qids):
+        entity = entities.get(qid, {})
+        types = truthy_values(entity, "P31")
+        if excluded.intersection(types):
+            continue
+        if fixed_type is not None and fixed_type not in types:
+            continue
+        label = entity.get("labels", {}).get(lang, {}).get("value", "NONE")
+        description = (
+            entity.get("descriptions", {}).get(lang, {}).get("value", "no description")
+        )
+        names = [label] + [
+            alias["value"] for alias in entity.get("aliases", {}).get(lang, [])
+        ]
+        similarity = max(
+            SequenceMatcher(None, normalized_term, normalize_label(name)).ratio()
+            for name in names
+        )
+        score = similarity + 0.1 * (1 - rank / len(qids))
+        if preferred.intersection(types):
+            score += 0.2
+        if basic.intersection(types):
+            score -= 0.5
+        candidates.append(
+            {
+                "id": qid,
+                "label": label,
+                "description": description,
+                "url": f"https://www.wikidata.org/wiki/{qid}",
+                "types": types,
+                "score": round(score, 4),
+            }
+        )
+    return sorted(candidates, key=lambda candidate: -candidate["score"])
 
 
 def parse_wikidata_result(wikidata_result):
@@ -95,23 +392,145 @@ def parse_wikidata_result(wikidata_result):
     }
 
 
+class SearchResults:
+    """
+    A compact, columnar store of search results, keyed by search term.
+
+    QIDs are kept as integers, labels and descriptions as codes into tables of
+    their distinct values, and URLs are rebuilt on access, so large numbers of
+    results take a fraction of the memory of a dict of `parse_wikidata_result` dicts.
+    Each table is a value:code dict and a code-indexed list, so both directions
+    are constant-time lookups.
+
+    Args:
+      results (dict): Optional search term:result dicts to start with, e.g. the
+        output of `wdcuration.sheet_based_curation.run_multiple_searches`.
+    """
+
+    __slots__ = [
+        "_positions",
+        "_qids",
+        "_label_codes",
+        "_description_codes",
+        "_labels",
+        "_descriptions",
+        "_other_ids",
+        "_label_values",
+        "_description_values",
+        "_other_id_values",
+    ]
+
+    def __init__(self, results=None):
+        self._positions = {}
+        self._qids = array("q")
+        self._label_codes = array("l")
+        self._description_codes = array("l")
+        self._labels = {}
+        self._descriptions = {}
+        # IDs that are not QIDs (e.g. "NONE") get negative codes.
+        self._other_ids = {}
+        self._label_values = []
+        self._description_values = []
+        self._other_id_values = []
+        if results is not None:
+            self.update(results)
+
+    def add(self, search_term, result):
+        """Adds (or replaces) the result dict of a search term."""
+        id = result["id"]
+        if id[:1] == "Q" and id[1:].isdigit():
+            qid_code = int(id[1:])
+        else:
+            qid_code = -1 - _intern(self._other_ids, self._other_id_values, id)
+        label_code = _intern(self._labels, self._label_values, result["label"])
+        description_code = _intern(
+            self._descriptions, self._description_values, result["description"]
+        )
+        position = self._positions.setdefault(search_term, len(self._positions))
+        if position == len(self._qids):
+            self._qids.append(qid_code)
+            self._label_codes.append(label_code)
+            self._description_codes.append(description_code)
+        else:
+            self._qids[position] = qid_code
+            self._label_codes[position] = label_code
+            self._description_codes[position] = description_code
+
+    def update(self, results):
+        """Adds search term:result dicts."""
+        for search_term, result in results.items():
+            self.add(search_term, result)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, search_term):
+        return search_term in self._positions
+
+    def __getitem__(self, search_term):
+        position = self._positions[search_term]
+        qid = self._decode_ids([self._qids[position]])[0]
+        return {
+            "id": qid,
+            "label": self._label_values[self._label_codes[position]],
+            "description": self._description_values[self._description_codes[position]],
+            "url": f"https://www.wikidata.org/wiki/{qid}",
+        }
+
+    def to_dict(self):
+        """Returns the results as search term:result dicts."""
+        return {search_term: self[search_term] for search_term in self._positions}
+
+    def join(self, df, on="search_term"):
+        """
+        Adds "wikidata_id", "wikidata_label" and "wikidata_description" columns to a
+        DataFrame, looking up all rows in a single pass. Labels and descriptions are
+        categorical columns. Rows whose search term has no result get missing values.
+
+        Returns:
+          pandas.DataFrame: A copy of df with the columns added.
+        """
+        # Missing search terms get position -1, which points to a trailing missing value.
+        positions = pd.Index(list(self._positions)).get_indexer(df[on])
+        ids = np.array([*self._decode_ids(self._qids), np.nan], dtype=object)
+        columns = {"wikidata_id": ids[positions]}
+        for column, codes, values in [
+            ("wikidata_label", self._label_codes, self._label_values),
+            ("wikidata_description", self._description_codes, self._description_values),
+        ]:
+            row_codes = np.append(np.asarray(codes, dtype=np.int64), -1)[positions]
+            columns[column] = pd.Categorical.from_codes(row_codes, values)
+        return df.assign(**columns)
+
+    def _decode_ids(self, qid_codes):
+        other_ids = self._other_id_values
+        return [f"Q{code}" if code >= 0 else other_ids[-1 - code] for code in qid_codes]
+
+
+def _intern(codes, values, value):
+    """Returns the code of value in a codes dict and values list, adding it if new."""
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(values)
+        values.append(value)
+    return code
+
+
 def get_label_and_description(qid, lang="en", method="wikidata_api"):
     if method == "wikidata_api":
-        url = f"https://www.wikidata.org/w/api.php?action=wbgetentities&props=labels|descriptions&ids={qid}&languages={lang}&format=json"
-        r = requests.get(url)
-        data = r.json()
+        entity = get_entities([qid], ("labels", "descriptions"), [lang]).get(qid, {})
         try:
             return {
-                "label": data["entities"][qid]["labels"][lang]["value"],
-                "description": data["entities"][qid]["descriptions"][lang]["value"],
+                "label": entity["labels"][lang]["value"],
+                "description": entity["descriptions"][lang]["value"],
             }
         except KeyError:
             return {"label": "NONE", "DESCRIPTION": "NONE"}
 
     if method == "json_dump":
         url = f"https://www.wikidata.org/wiki/Special:EntityData/{qid}.json"
-        r = requests.get(url)
-        data = r.json()
+        r = get_scheduler().request("GET", url)
+        data = json_loads(r.content)
         return {
             "label": data["entities"][qid]["labels"][lang]["value"],
             "description": data["entities"][qid]["descriptions"][lang]["value"],
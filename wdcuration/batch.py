@@ -0,0 +1,267 @@
+"""Running curation jobs for many catalogs in parallel, within shared rate limits"""
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+from tqdm import tqdm
+
+from wdcuration.instrumentation import add_request_hook, remove_request_hook
+from wdcuration.scheduler import (
+    DEFAULT_RATE,
+    HOST_RATES,
+    RequestScheduler,
+    get_scheduler,
+    set_scheduler,
+)
+from wdcuration.sheet_based_curation import generate_curation_spreadsheet
+
+
+@dataclass
+class CurationJob:
+    """
+    The arguments of one `generate_curation_spreadsheet` run.
+
+    Attributes:
+      identifiers_property: The identifier property of the catalog.
+      curation_table_path: The path to the catalog.
+      output_file_path: The path of the curation sheet to write.
+      description_term_lookup: A term to filter the catalog on its descriptions.
+      fixed_type: A P31 value required for matches.
+      excluded_types: P31 values excluded from matches.
+      exclude_basic: Whether to exclude the basic types.
+      drop_nones: Whether to drop rows without a match.
+      score_matches: Whether to add match scores.
+      fingerprint_path: A file for incremental re-curation.
+      languages: The languages to search in, if not only English.
+    """
+
+    identifiers_property: str
+    curation_table_path: str
+    output_file_path: str
+    description_term_lookup: str = ""
+    fixed_type: str = None
+    excluded_types: List[str] = field(default_factory=list)
+    exclude_basic: bool = False
+    drop_nones: bool = True
+    score_matches: bool = False
+    fingerprint_path: str = None
+    languages: List[str] = None
+
+    @property
+    def name(self):
+        return f"{self.identifiers_property}:{Path(self.curation_table_path).name}"
+
+
+@dataclass
+class JobResult:
+    """
+    The outcome of a `CurationJob`.
+
+    Attributes:
+      name: The name of the job.
+      output_file_path: The path of the curation sheet.
+      seconds: The wall time of the job.
+      error: The traceback if the job failed, None otherwise.
+    """
+
+    name: str
+    output_file_path: str
+    seconds: float
+    error: str = None
+
+
+def load_manifest(path):
+    """
+    Reads jobs from a manifest file.
+
+    JSON manifests hold a list of objects (or an object with a "jobs" list) with the
+    fields of `CurationJob`. CSV manifests have one job per row, with the excluded
+    types and the languages separated by "|".
+
+    Returns:
+      list: The CurationJob objects.
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        entries = json.loads(path.read_text())
+        if isinstance(entries, dict):
+            entries = entries["jobs"]
+        return [CurationJob(**entry) for entry in entries]
+
+    manifest = pd.read_csv(path, dtype=str, keep_default_na=False)
+    jobs = []
+    for entry in manifest.to_dict("records"):
+        entry = {key: value for key, value in entry.items() if value != ""}
+        entry["excluded_types"] = [
+            t for t in entry.get("excluded_types", "").split("|") if t
+        ]
+        if "languages" in entry:
+            entry["languages"] = entry["languages"].split("|")
+        for key in ["exclude_basic", "drop_nones", "score_matches"]:
+            if key in entry:
+                entry[key] = entry[key].lower() in ["true", "1", "yes"]
+        jobs.append(CurationJob(**entry))
+    return jobs
+
+
+class SharedRateLimiter:
+    """
+    A rate limiter shared by processes through a lock file.
+
+    The file holds, for each host, the earliest time at which the next request may
+    start. Each reservation takes that slot and moves it 1/rate seconds later, so all
+    processes together stay within the rate. Needs `fcntl` (POSIX systems).
+
+    Args:
+      path (str): The path of the state file. It is created if missing.
+      rates (dict): Requests per second by host, for all processes together.
+        Defaults to `wdcuration.scheduler.HOST_RATES`.
+    """
+
+    def __init__(self, path, rates=None):
+        self.path = str(path)
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        Path(self.path).touch()
+
+    def reserve(self, host):
+        """Takes the next slot for host and returns the seconds to wait for it."""
+        interval = 1 / self.rates.get(host, DEFAULT_RATE)
+        with self._locked_state() as state:
+            now = time.time()
+            slot = max(now, state.get(host, 0.0))
+            state[host] = slot + interval
+        return slot - now
+
+    def block(self, host, seconds):
+        """Keeps all processes from starting requests to host for the given seconds."""
+        with self._locked_state() as state:
+            state[host] = max(state.get(host, 0.0), time.time() + seconds)
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        import fcntl
+
+        with open(self.path, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                content = f.read()
+                state = json.loads(content) if content else {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def run_jobs(jobs, processes=None, rate_limit_path=None, rates=None):
+    """
+    Runs curation jobs across a process pool, sharing one rate limit.
+
+    All workers pace their requests through a `SharedRateLimiter`, so together they
+    use, but do not exceed, the request budget. A single progress bar shows the
+    finished jobs and the requests made by all workers. The output of the workers
+    is silenced, and a failing job does not stop the others.
+
+    Args:
+      jobs (list): CurationJob objects, e.g. from `load_manifest`.
+      processes (int): The number of worker processes. 1 runs the jobs in this process.
+        Defaults to the number of jobs, up to the number of CPUs.
+      rate_limit_path (str): The state file of the shared rate limiter. Defaults to
+        a temporary file.
+      rates (dict): Requests per second by host, for all workers together.
+
+    Returns:
+      list: A JobResult for each job, in the order of jobs.
+    """
+    jobs = list(jobs)
+    if processes is None:
+        processes = max(1, min(len(jobs), os.cpu_count() or 1))
+
+    with contextlib.ExitStack() as stack:
+        if rate_limit_path is None:
+            tmp = stack.enter_context(tempfile.TemporaryDirectory())
+            rate_limit_path = Path(tmp).joinpath("rate_limit.json")
+        limiter = SharedRateLimiter(rate_limit_path, rates)
+        request_count = multiprocessing.Value("q", 0)
+        progress = stack.enter_context(tqdm(total=len(jobs), unit=" jobs"))
+
+        if processes == 1:
+            previous_scheduler = get_scheduler()
+            hook = _init_worker(limiter, request_count)
+            try:
+                results = []
+                for job in jobs:
+                    results.append(_run_job(job))
+                    progress.update(1)
+                    progress.set_postfix(requests=request_count.value)
+            finally:
+                remove_request_hook(hook)
+                set_scheduler(previous_scheduler)
+            return results
+
+        executor = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(limiter, request_count),
+            )
+        )
+        futures = {executor.submit(_run_job, job): i for i, job in enumerate(jobs)}
+        results = [None] * len(jobs)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+            progress.update(len(done))
+            progress.set_postfix(requests=request_count.value)
+    return results
+
+
+def _init_worker(limiter, request_count):
+    set_scheduler(RequestScheduler(shared_limiter=limiter))
+
+    def count_request(event):
+        if not event.cache_hit:
+            with request_count.get_lock():
+                request_count.value += 1
+
+    add_request_hook(count_request)
+    return count_request
+
+
+def _run_job(job):
+    start = time.perf_counter()
+    error = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+            io.StringIO()
+        ):
+            generate_curation_spreadsheet(
+                job.identifiers_property,
+                job.curation_table_path,
+                job.output_file_path,
+                description_term_lookup=job.description_term_lookup,
+                fixed_type=job.fixed_type,
+                excluded_types=list(job.excluded_types),
+                drop_nones=job.drop_nones,
+                exclude_basic=job.exclude_basic,
+                score_matches=job.score_matches,
+                fingerprint_path=job.fingerprint_path,
+                languages=job.languages,
+            )
+    except Exception:
+        error = traceback.format_exc()
+    return JobResult(job.name, job.output_file_path, time.perf_counter() - start, error)
@@ -0,0 +1,387 @@
+"""Local caches for data fetched from Wikidata"""
+import json
+import sqlite3
+import time
+
+from wdcuration.instrumentation import emit_cache_hit, has_request_hooks
+from wdcuration.scheduler import get_scheduler
+from wdcuration.utils import chunk, json_loads
+
+WIKIDATA_API = "https://www.wikidata.org/w/api.php"
+# wbgetentities accepts at most 50 ids per request.
+WBGETENTITIES_CHUNK_SIZE = 50
+
+_default_entity_cache = None
+_default_search_cache = None
+
+
+class WikibaseAPIError(Exception):
+    """
+    Raised when the Wikibase API answers a request with an error.
+
+    Attributes:
+      code (str): The error code from the response, e.g. "param-illegal".
+    """
+
+    def __init__(self, error):
+        self.code = error.get("code")
+        super().__init__(f"{self.code}: {error.get('info', '')}")
+
+
+def set_entity_cache(cache):
+    """
+    Sets the entity cache shared by `get_entities`, `get_label_and_description`,
+    `async_parse_result`, `lookup_label` and `get_statement_values`.
+
+    Args:
+      cache (EntityCache): The cache, or None to disable caching.
+    """
+    global _default_entity_cache
+    _default_entity_cache = cache
+
+
+def get_entity_cache():
+    """Returns the entity cache set with `set_entity_cache`, if any."""
+    return _default_entity_cache
+
+
+def set_search_cache(cache):
+    """
+    Sets the search cache shared by `search_wikidata` and `async_search_wikidata`.
+
+    Args:
+      cache (SearchCache): The cache, or None to disable caching.
+    """
+    global _default_search_cache
+    _default_search_cache = cache
+
+
+def get_search_cache():
+    """Returns the search cache set with `set_search_cache`, if any."""
+    return _default_search_cache
+
+
+class EntityCache:
+    """
+    A SQLite store of entity fragments (labels, descriptions, aliases and claims)
+    fetched with wbgetentities.
+
+    Fragments are stored per QID and language, together with the revision they
+    were fetched at. Entries older than max_age are revalidated against the
+    current revision before being used, and only refetched if the entity changed.
+
+    Args:
+      path (str): The path to the SQLite file. Defaults to ":memory:" (not persisted).
+      max_age (float): Seconds after which entries are revalidated. Defaults to one day.
+    """
+
+    def __init__(self, path=":memory:", max_age=86400):
+        self.path = str(path)
+        self.max_age = max_age
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entity_fragments ("
+            "qid TEXT NOT NULL, kind TEXT NOT NULL, language TEXT NOT NULL, "
+            "data TEXT, lastrevid INTEGER, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (qid, kind, language))"
+        )
+
+    def get(self, qid, props, languages):
+        """
+        Returns the cached fragments of an entity.
+
+        Returns:
+          tuple: (entity, lastrevid, fetched_at), or None if any requested fragment is missing.
+            fetched_at is the time of the oldest fragment, and lastrevid is None if
+            the fragments come from different revisions.
+        """
+        keys = _fragment_keys(props, languages)
+        rows = self.connection.execute(
+            "SELECT kind, language, data, lastrevid, fetched_at "
+            "FROM entity_fragments WHERE qid = ?",
+            (qid,),
+        ).fetchall()
+        found = {(kind, language): row for kind, language, *row in rows}
+        if any(key not in found for key in keys):
+            return None
+
+        entity = {"id": qid}
+        revisions = set()
+        fetched_at = None
+        for kind, language in keys:
+            data, row_lastrevid, row_fetched_at = found[(kind, language)]
+            data = json_loads(data)
+            if kind == "claims":
+                entity["claims"] = data
+            else:
+                entity.setdefault(kind, {})
+                if data is not None:
+                    entity[kind][language] = data
+            revisions.add(row_lastrevid)
+            if fetched_at is None or row_fetched_at < fetched_at:
+                fetched_at = row_fetched_at
+        # Fragments fetched at different revisions can not be revalidated together.
+        lastrevid = revisions.pop() if len(revisions) == 1 else None
+        return entity, lastrevid, fetched_at
+
+    def put(self, entity, props, languages):
+        """
+        Stores the fragments of an entity from a wbgetentities response.
+        """
+        now = time.time()
+        rows = []
+        for kind, language in _fragment_keys(props, languages):
+            if kind == "claims":
+                data = entity.get("claims", {})
+            else:
+                data = entity.get(kind, {}).get(language)
+            rows.append(
+                (
+                    entity["id"],
+                    kind,
+                    language,
+                    json.dumps(data),
+                    entity.get("lastrevid"),
+                    now,
+                )
+            )
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entity_fragments "
+                "(qid, kind, language, data, lastrevid, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def is_fresh(self, fetched_at):
+        """Returns True if an entry fetched at fetched_at can be used without revalidation."""
+        return time.time() - fetched_at < self.max_age
+
+    def touch(self, qids):
+        """Marks the entries of the QIDs as fetched now, after a successful revalidation."""
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE entity_fragments SET fetched_at = ? WHERE qid = ?",
+                [(now, qid) for qid in qids],
+            )
+
+    def invalidate(self, qids=None):
+        """Removes the entries of the QIDs, or all entries if qids is None."""
+        with self.connection:
+            if qids is None:
+                self.connection.execute("DELETE FROM entity_fragments")
+            else:
+                self.connection.executemany(
+                    "DELETE FROM entity_fragments WHERE qid = ?",
+                    [(qid,) for qid in qids],
+                )
+
+    def close(self):
+        self.connection.close()
+
+
+class SearchCache:
+    """
+    A SQLite store of parsed Wikidata search results.
+
+    Results are keyed on the search term and the options of the search (excluded
+    types, fixed type, exclude_basic, language and top_k), so different catalogs
+    searching for the same names share them. Entries older than ttl are ignored.
+
+    Args:
+      path (str): The path to the SQLite file. Defaults to ":memory:" (not persisted).
+      ttl (float): Seconds after which entries expire. Defaults to one week.
+    """
+
+    def __init__(self, path=":memory:", ttl=604800):
+        self.path = str(path)
+        self.ttl = ttl
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS search_results ("
+            "key TEXT PRIMARY KEY, search_term TEXT NOT NULL, "
+            "result TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def key(
+        search_term,
+        excluded_types=None,
+        fixed_type=None,
+        exclude_basic=True,
+        language="en",
+        top_k=None,
+    ):
+        return json.dumps(
+            [
+                search_term,
+                sorted(set(excluded_types or [])),
+                fixed_type,
+                bool(exclude_basic),
+                language,
+                top_k,
+            ]
+        )
+
+    def get(self, search_term, **options):
+        """
+        Returns the cached result of a search, or None if it is missing or expired.
+
+        Args:
+          search_term (str): The searched string.
+          **options: The options of the search, as in `SearchCache.key`.
+        """
+        row = self.connection.execute(
+            "SELECT result, stored_at FROM search_results WHERE key = ?",
+            (self.key(search_term, **options),),
+        ).fetchone()
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return json_loads(row[0])
+
+    def put(self, result, search_term, **options):
+        """Stores the result of a search."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO search_results "
+                "(key, search_term, result, stored_at) VALUES (?, ?, ?, ?)",
+                (
+                    self.key(search_term, **options),
+                    search_term,
+                    json.dumps(result),
+                    time.time(),
+                ),
+            )
+
+    def invalidate(self, search_terms=None):
+        """Removes the entries of the search terms (with any options), or all entries if None."""
+        with self.connection:
+            if search_terms is None:
+                self.connection.execute("DELETE FROM search_results")
+            else:
+                self.connection.executemany(
+                    "DELETE FROM search_results WHERE search_term = ?",
+                    [(search_term,) for search_term in search_terms],
+                )
+
+    def purge_expired(self):
+        """Removes the entries older than ttl."""
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM search_results WHERE stored_at <= ?",
+                (time.time() - self.ttl,),
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+def get_entities(qids, props=("labels", "descriptions"), languages=("en",), cache=None):
+    """
+    Fetches entity data from Wikidata with batched wbgetentities calls, using the entity cache.
+
+    Fresh cached entities are used directly. Stale ones are revalidated with a
+    single batched revision check, and only entities that changed are refetched.
+
+    Args:
+      qids (list): The QIDs of the entities.
+      props (list): The wbgetentities props to fetch: any of "labels",
+        "descriptions", "aliases" and "claims". Defaults to labels and descriptions.
+      languages (list): The languages of labels, descriptions and aliases. Defaults to ("en",).
+      cache (EntityCache): The cache to use. Defaults to the one set with `set_entity_cache`.
+
+    Returns:
+      dict: A QID:entity dictionary, with entities in the wbgetentities format.
+        Entities that do not exist and malformed ids are left out.
+
+    Raises:
+      WikibaseAPIError: If the API answers with any other error.
+      requests.HTTPError: If the API answers with an error status.
+    """
+    if cache is None:
+        cache = _default_entity_cache
+    qids = list(dict.fromkeys(qids))
+    if cache is None:
+        return _fetch_entities(qids, props, languages)
+
+    entities = {}
+    stale = {}
+    missing = []
+    for qid in qids:
+        cached = cache.get(qid, props, languages)
+        if cached is None:
+            missing.append(qid)
+        elif cache.is_fresh(cached[2]):
+            entities[qid] = cached[0]
+        else:
+            stale[qid] = cached
+
+    if stale:
+        revisions = _fetch_revisions(list(stale))
+        unchanged = []
+        for qid, (entity, lastrevid, _) in stale.items():
+            if lastrevid is not None and revisions.get(qid) == lastrevid:
+                entities[qid] = entity
+                unchanged.append(qid)
+            else:
+                missing.append(qid)
+        cache.touch(unchanged)
+
+    if has_request_hooks():
+        for _ in range(len(qids) - len(missing)):
+            emit_cache_hit(WIKIDATA_API, {"action": "wbgetentities"})
+
+    for qid, entity in _fetch_entities(missing, [*props, "info"], languages).items():
+        cache.put(entity, props, languages)
+        entities[qid] = entity
+    return {qid: entities[qid] for qid in qids if qid in entities}
+
+
+def _fetch_entities(qids, props, languages):
+    entities = {}
+    for qids_chunk in chunk(qids, WBGETENTITIES_CHUNK_SIZE):
+        qids_chunk = list(qids_chunk)
+        while qids_chunk:
+            params = {
+                "action": "wbgetentities",
+                "ids": "|".join(qids_chunk),
+                "props": "|".join(props),
+                "format": "json",
+            }
+            if languages:
+                params["languages"] = "|".join(languages)
+            response = get_scheduler().request("GET", WIKIDATA_API, params=params)
+            response.raise_for_status()
+            data = json_loads(response.content)
+            error = data.get("error")
+            if error is None:
+                break
+            # A malformed id fails the whole request, so it is dropped and the rest retried.
+            if (
+                error.get("code") != "no-such-entity"
+                or error.get("id") not in qids_chunk
+            ):
+                raise WikibaseAPIError(error)
+            qids_chunk.remove(error["id"])
+        for qid, entity in data.get("entities", {}).items():
+            if "missing" not in entity:
+                entities[qid] = entity
+    return entities
+
+
+def _fetch_revisions(qids):
+    return {
+        qid: entity.get("lastrevid")
+        for qid, entity in _fetch_entities(qids, ["info"], []).items()
+    }
+
+
+def _fragment_keys(props, languages):
+    keys = []
+    for kind in props:
+        if kind == "claims":
+            keys.append(("claims", ""))
+        elif kind != "info":
+            keys.extend((kind, language) for language in languages)
+    return keys
@@ -5,7 +5,13 @@ from pathlib import Path
 from typing import List
 
 from wdcuration.api_searches import  go_to_wikidata, search_wikidata
-from wdcuration.quickstatements import render_qs_url
+from wdcuration.quickstatements import (
+    Create,
+    Description,
+    Label,
+    Statement,
+    render_qs_url,
+)
 
 
 @dataclass
@@ -25,27 +31,24 @@ class NewItemConfig:
     id_property_value_pairs: dict = field(default_factory=lambda: {})
     quickstatements = ""
 
-    def render_quickstatements(self):
-        qs = """CREATE
-      """
-        for k, v in self.labels.items():
-            qs += f"""
-      LAST|L{k}|"{v}" """
-
-        for k, v in self.descriptions.items():
-            qs += f"""
-      LAST|D{k}|"{v}" """
-
+    def commands(self):
+        """Returns the Quickstatements commands that create the item."""
+        commands = [Create()]
+        commands += [Label("LAST", k, v) for k, v in self.labels.items()]
+        commands += [Description("LAST", k, v) for k, v in self.descriptions.items()]
         for k, v in self.item_property_value_pairs.items():
-            for value in v:
-                qs += f"""
-        LAST|{k}|{value} """
+            commands += [Statement("LAST", k, value) for value in v]
         for k, v in self.id_property_value_pairs.items():
-            for value in v:
-                qs += f"""
-        LAST|{k}|"{value}" """
+            commands += [Statement("LAST", k, value, is_string=True) for value in v]
+        return commands
 
-        self.quickstatements = qs
+    def render_quickstatements(self):
+        # Keeps the historical layout, with labels and statements indented.
+        lines = ["CREATE\n      "]
+        for command in self.commands()[1:]:
+            indent = "      " if isinstance(command, Label) else "        "
+            lines.append(f"{indent}{command.to_v1()} ")
+        self.quickstatements = "\n".join(lines)
 
 
 @dataclass
@@ -0,0 +1,290 @@
+"""Reading Wikidata dumps and extracts of them"""
+import bz2
+import csv
+import gzip
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+from tqdm import tqdm
+
+from wdcuration.sparql import ENTITY_PREFIX, parse_tsv_term
+from wdcuration.utils import json_loads, truthy_values
+
+DIRECT_PROPERTY_PREFIX = "http://www.wikidata.org/prop/direct/"
+
+IDENTIFIERS_EXTRACT = "identifiers.tsv"
+LABELS_EXTRACT = "labels.tsv"
+EDGES_EXTRACT = "edges.tsv"
+
+
+@dataclass
+class DumpReport:
+    """
+    Counts and timing for a pass over a dump.
+
+    Attributes:
+      entities_read: The number of entities decoded.
+      entities_kept: The number of entities that passed the filters.
+      seconds: The wall time of the pass.
+    """
+
+    entities_read: int = 0
+    entities_kept: int = 0
+    seconds: float = 0.0
+
+    @property
+    def entities_per_second(self):
+        if self.seconds == 0:
+            return 0.0
+        return self.entities_read / self.seconds
+
+
+def open_dump(path):
+    """
+    Opens a (possibly gzip or bz2 compressed) dump file for reading text.
+    """
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def parse_entity_line(line):
+    """
+    Parses one line of a Wikidata JSON dump.
+
+    The dumps are a single JSON array with one entity per line, so the brackets
+    and trailing commas are stripped before decoding.
+
+    Returns:
+      dict: The entity, or None for lines without one.
+    """
+    line = line.strip().rstrip(",")
+    if line in ["", "[", "]"]:
+        return None
+    return json_loads(line)
+
+
+def iter_entities(dump_path):
+    """
+    Yields the entities of a line-delimited Wikidata JSON dump, e.g. latest-all.json.gz.
+    """
+    with open_dump(dump_path) as f:
+        for line in f:
+            entity = parse_entity_line(line)
+            if entity is not None:
+                yield entity
+
+
+def iter_ntriples(dump_path, properties=None):
+    """
+    Yields (QID, PID, value) triples from a Wikidata N-Triples dump, e.g. latest-truthy.nt.gz.
+
+    Only "wdt:" statements about Wikidata entities are kept.
+    Values that are entities are returned as QIDs.
+
+    Args:
+      dump_path (str): The path to the dump.
+      properties (list): If set, only triples for these PIDs are yielded.
+    """
+    if properties is not None:
+        properties = set(properties)
+    with open_dump(dump_path) as f:
+        for line in f:
+            triple = parse_ntriples_line(line)
+            if triple is None:
+                continue
+            if properties is not None and triple[1] not in properties:
+                continue
+            yield triple
+
+
+def parse_ntriples_line(line):
+    """
+    Parses one line of a Wikidata N-Triples dump into a (QID, PID, value) triple.
+
+    Returns:
+      tuple: The triple, or None if the line is not a "wdt:" statement about an entity.
+    """
+    line = line.strip()
+    if not line.endswith(" ."):
+        return None
+    subject, predicate, value = line[:-2].split(" ", 2)
+    subject = parse_tsv_term(subject)
+    predicate = parse_tsv_term(predicate)
+    if not subject.startswith(ENTITY_PREFIX) or not predicate.startswith(
+        DIRECT_PROPERTY_PREFIX
+    ):
+        return None
+    value = parse_tsv_term(value)
+    if value.startswith(ENTITY_PREFIX):
+        value = value[len(ENTITY_PREFIX) :]
+    return (
+        subject[len(ENTITY_PREFIX) :],
+        predicate[len(DIRECT_PROPERTY_PREFIX) :],
+        value,
+    )
+
+
+def extract_from_dump(
+    dump_path,
+    output_dir,
+    identifier_properties=(),
+    edge_properties=("P279",),
+    languages=("en",),
+    types=None,
+    required_properties=None,
+    processes=None,
+    lines_per_batch=1000,
+):
+    """
+    Streams a Wikidata JSON dump and writes compact extracts of the entities of interest.
+
+    Lines are decoded and filtered in a process pool, in batches, while the main process
+    reads ahead a bounded number of batches and writes the results in order.
+    Three tab-separated extracts are written to output_dir:
+
+    - identifiers.tsv: property, id, qid rows for the identifier properties.
+    - labels.tsv: qid, language, label, aliases, description and P31 types
+      (aliases and types joined by "|") for each language.
+    - edges.tsv: qid, property, value rows for the edge properties, e.g. P279.
+
+    Args:
+      dump_path (str): The path to the dump, optionally gzip or bz2 compressed.
+      output_dir (str): The folder where the extracts are written.
+      identifier_properties (list): The PIDs of the identifiers to extract.
+      edge_properties (list): The PIDs of the item-valued properties to extract as edges.
+        Defaults to ("P279",).
+      languages (list): The languages of labels, aliases and descriptions. Defaults to ("en",).
+      types (list): If set, only entities with one of these P31 values are kept.
+      required_properties (list): If set, only entities with at least one of these properties are kept.
+      processes (int): The number of worker processes. 1 decodes in the main process.
+        Defaults to the number of CPUs.
+      lines_per_batch (int): The number of dump lines sent to a worker at a time.
+
+    Returns:
+      DumpReport: Counts and timing for the pass.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        "identifier_properties": list(identifier_properties),
+        "edge_properties": list(edge_properties),
+        "languages": list(languages),
+        "types": set(types) if types is not None else None,
+        "required_properties": (
+            list(required_properties) if required_properties is not None else None
+        ),
+    }
+    report = DumpReport()
+    start = time.perf_counter()
+
+    with open_dump(dump_path) as dump, open(
+        output_dir.joinpath(IDENTIFIERS_EXTRACT), "w", newline="", encoding="utf-8"
+    ) as identifiers_file, open(
+        output_dir.joinpath(LABELS_EXTRACT), "w", newline="", encoding="utf-8"
+    ) as labels_file, open(
+        output_dir.joinpath(EDGES_EXTRACT), "w", newline="", encoding="utf-8"
+    ) as edges_file:
+        writers = [
+            csv.writer(identifiers_file, delimiter="\t"),
+            csv.writer(labels_file, delimiter="\t"),
+            csv.writer(edges_file, delimiter="\t"),
+        ]
+        batches = iter(lambda: list(islice(dump, lines_per_batch)), [])
+        progress = tqdm(unit=" entities")
+        for read, kept, extracts in _map_batches(batches, options, processes):
+            report.entities_read += read
+            report.entities_kept += kept
+            for writer, rows in zip(writers, extracts):
+                writer.writerows(rows)
+            progress.update(read)
+            progress.set_postfix(kept=report.entities_kept)
+        progress.close()
+
+    report.seconds = time.perf_counter() - start
+    print(
+        f"Read {report.entities_read} entities "
+        f"({report.entities_per_second:.0f} entities/s), kept {report.entities_kept}"
+    )
+    return report
+
+
+def read_extract(path):
+    """
+    Yields the rows of an extract written by `extract_from_dump`, as lists of strings.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.reader(f, delimiter="\t")
+
+
+def _map_batches(batches, options, processes):
+    if processes == 1:
+        for batch in batches:
+            yield _process_batch(batch, options)
+        return
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        max_pending = 2 * processes
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(_process_batch, batch, options))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _process_batch(lines, options):
+    identifiers = []
+    labels = []
+    edges = []
+    read = 0
+    kept = 0
+    for line in lines:
+        entity = parse_entity_line(line)
+        if entity is None:
+            continue
+        read += 1
+        if not _keep_entity(entity, options):
+            continue
+        kept += 1
+        qid = entity["id"]
+        for wikidata_property in options["identifier_properties"]:
+            for value in truthy_values(entity, wikidata_property):
+                identifiers.append((wikidata_property, str(value), qid))
+        for wikidata_property in options["edge_properties"]:
+            for value in truthy_values(entity, wikidata_property):
+                edges.append((qid, wikidata_property, value))
+        types = "|".join(truthy_values(entity, "P31"))
+        for language in options["languages"]:
+            label = entity.get("labels", {}).get(language, {}).get("value", "")
+            aliases = "|".join(
+                alias["value"] for alias in entity.get("aliases", {}).get(language, [])
+            )
+            description = (
+                entity.get("descriptions", {}).get(language, {}).get("value", "")
+            )
+            if label or aliases:
+                labels.append((qid, language, label, aliases, description, types))
+    return read, kept, (identifiers, labels, edges)
+
+
+def _keep_entity(entity, options):
+    if options["types"] is not None:
+        if not options["types"].intersection(truthy_values(entity, "P31")):
+            return False
+    if options["required_properties"] is not None:
+        claims = entity.get("claims", {})
+        if not any(p in claims for p in options["required_properties"]):
+            return False
+    return True
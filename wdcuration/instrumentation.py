@@ -0,0 +1,156 @@
+"""Hooks reporting the requests made by wdcuration"""
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+_request_hooks = []
+
+
+@dataclass
+class RequestEvent:
+    """
+    A request made by wdcuration, or a lookup answered by one of its caches.
+
+    Attributes:
+      endpoint: The host and path of the request, with the API action for the
+        Wikidata and Wikipedia APIs, e.g. "www.wikidata.org/w/api.php?action=wbgetentities".
+      method: The HTTP method.
+      latency: The seconds taken by the last attempt of the request.
+      bytes: The size of the response body, as sent by the server when known.
+      status: The HTTP status of the response, or None for cache hits.
+      retries: The number of attempts that were throttled and retried.
+      cache_hit: Whether the lookup was answered from a cache without a request.
+    """
+
+    endpoint: str
+    method: str = "GET"
+    latency: float = 0.0
+    bytes: int = 0
+    status: int = None
+    retries: int = 0
+    cache_hit: bool = False
+
+
+def add_request_hook(hook):
+    """
+    Registers a callable that receives a `RequestEvent` for every request and cache hit.
+
+    Hooks may be called from worker threads, so they should be thread-safe.
+    """
+    _request_hooks.append(hook)
+
+
+def remove_request_hook(hook):
+    """Unregisters a hook added with `add_request_hook`."""
+    _request_hooks.remove(hook)
+
+
+def has_request_hooks():
+    return bool(_request_hooks)
+
+
+def emit_request_event(event):
+    for hook in list(_request_hooks):
+        hook(event)
+
+
+def emit_cache_hit(url, params=None):
+    """Reports a lookup for url answered from a cache."""
+    if _request_hooks:
+        emit_request_event(RequestEvent(endpoint_name(url, params), cache_hit=True))
+
+
+def endpoint_name(url, params=None):
+    """
+    Returns the host and path of a URL. For MediaWiki APIs, the "action" and "list"
+    parameters are added, so searches and wbgetentities calls are told apart.
+    """
+    parsed = urlparse(url)
+    name = parsed.netloc + parsed.path
+    query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+    query.update(params or {})
+    api_parameters = [
+        f"{key}={query[key]}" for key in ["action", "list"] if key in query
+    ]
+    if api_parameters:
+        name += "?" + "&".join(api_parameters)
+    return name
+
+
+class RequestCollector:
+    """
+    A hook that stores request events and summarizes them per endpoint.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def summary(self):
+        """
+        Returns a DataFrame with one row per endpoint: the number of requests, cache hits,
+        retries and error responses, the bytes received and the 50th, 90th and 99th
+        percentile latencies (in seconds) of the requests.
+        """
+        columns = [
+            "requests",
+            "cache_hits",
+            "retries",
+            "errors",
+            "bytes",
+            "p50",
+            "p90",
+            "p99",
+        ]
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+        events = pd.DataFrame([asdict(event) for event in self.events])
+        rows = {}
+        for endpoint, group in events.groupby("endpoint", sort=True):
+            requests = group[~group["cache_hit"]]
+            latencies = requests["latency"].to_numpy()
+            if len(latencies):
+                p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            else:
+                p50 = p90 = p99 = np.nan
+            rows[endpoint] = [
+                len(requests),
+                int(group["cache_hit"].sum()),
+                int(group["retries"].sum()),
+                int((requests["status"] >= 400).sum()),
+                int(group["bytes"].sum()),
+                p50,
+                p90,
+                p99,
+            ]
+        return pd.DataFrame.from_dict(rows, orient="index", columns=columns)
+
+    def print_summary(self):
+        """Prints the summary of the collected requests."""
+        print(self.summary().to_string(float_format="{:.3f}".format))
+
+
+@contextmanager
+def collect_requests():
+    """
+    Collects the requests made inside a with block.
+
+    Example:
+      with collect_requests() as collector:
+          generate_curation_spreadsheet(...)
+      collector.print_summary()
+
+    Yields:
+      RequestCollector: The collector of the events.
+    """
+    collector = RequestCollector()
+    add_request_hook(collector)
+    try:
+        yield collector
+    finally:
+        remove_request_hook(collector)
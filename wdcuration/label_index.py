@@ -0,0 +1,205 @@
+"""Local label indexes for searching Wikidata items without network calls"""
+from collections import Counter
+
+from wdcuration.api_searches import BASIC_EXCLUSION
+from wdcuration.dumps import read_extract
+from wdcuration.sparql import query_wikidata
+from wdcuration.utils import normalize_label
+
+
+def trigrams(normalized_text):
+    """Returns the set of character trigrams of a normalized text, padded with spaces."""
+    padded = f"  {normalized_text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class LabelIndex:
+    """
+    A trigram index over labels and aliases of Wikidata items.
+
+    Searches return the same shape as `wdcuration.api_searches.parse_wikidata_result`,
+    so an index can be passed to `search_wikidata` as label_index.
+
+    Args:
+      min_score (float): The minimum trigram similarity for a match. Defaults to 0.5.
+    """
+
+    def __init__(self, min_score=0.5):
+        self.min_score = min_score
+        self.qids = []
+        self.labels = []
+        self.descriptions = []
+        self.types = []
+        self.names = []
+        self.name_entries = []
+        self.name_trigram_counts = []
+        self.exact_names = {}
+        self.postings = {}
+        self.entry_positions = {}
+
+    @classmethod
+    def from_records(cls, records, min_score=0.5):
+        """
+        Builds an index from records, e.g. the result of `query_wikidata`.
+
+        Each record must have "item" (a QID or entity IRI) and "label", and may have
+        "description", "aliases" and "types" (P31 QIDs), the last two as lists or "|"-separated strings.
+        """
+        index = cls(min_score=min_score)
+        for record in records:
+            index.add(
+                record["item"].split("/")[-1],
+                record["label"],
+                aliases=_split(record.get("aliases", [])),
+                description=record.get("description", ""),
+                types=[t.split("/")[-1] for t in _split(record.get("types", []))],
+            )
+        return index
+
+    @classmethod
+    def from_sparql(cls, query, min_score=0.5):
+        """
+        Builds an index from a SPARQL query returning ?item and ?label, and optionally
+        ?description, ?aliases and ?types, the last two as GROUP_CONCAT(...; separator="|").
+        """
+        return cls.from_records(query_wikidata(query), min_score=min_score)
+
+    @classmethod
+    def from_extract(cls, extract_path, language="en", min_score=0.5):
+        """
+        Builds an index from the labels.tsv extract written by
+        `wdcuration.dumps.extract_from_dump`.
+        """
+        index = cls(min_score=min_score)
+        for qid, row_language, label, aliases, description, types in read_extract(
+            extract_path
+        ):
+            if row_language == language:
+                index.add(
+                    qid,
+                    label,
+                    aliases=_split(aliases),
+                    description=description,
+                    types=_split(types),
+                )
+        return index
+
+    def add(self, qid, label, aliases=(), description="", types=()):
+        """
+        Adds an item to the index.
+
+        Adding a QID that is already indexed merges the new names and types into its
+        entry, and fills its label and description if they were empty.
+        """
+        entry = self.entry_positions.get(qid)
+        if entry is None:
+            entry = len(self.qids)
+            self.entry_positions[qid] = entry
+            self.qids.append(qid)
+            self.labels.append(label)
+            self.descriptions.append(description)
+            self.types.append(frozenset(types))
+        else:
+            self.labels[entry] = self.labels[entry] or label
+            self.descriptions[entry] = self.descriptions[entry] or description
+            self.types[entry] = self.types[entry].union(types)
+        for name in {normalize_label(n) for n in [label, *aliases] if n}:
+            if any(
+                self.name_entries[p] == entry for p in self.exact_names.get(name, [])
+            ):
+                continue
+            position = len(self.names)
+            self.names.append(name)
+            self.name_entries.append(entry)
+            self.exact_names.setdefault(name, []).append(position)
+            name_trigrams = trigrams(name)
+            self.name_trigram_counts.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                self.postings.setdefault(trigram, []).append(position)
+
+    def candidates(
+        self,
+        search_term,
+        k=10,
+        excluded_types=None,
+        fixed_type=None,
+        exclude_basic=True,
+    ):
+        """
+        Returns up to k (score, QID) pairs matching the search term, best first.
+
+        Type filters mirror the "haswbstatement" filters of `search_wikidata`.
+        """
+        excluded = set(excluded_types or [])
+        if exclude_basic:
+            excluded.update(BASIC_EXCLUSION)
+
+        query = normalize_label(search_term)
+        scores = {}
+        for position in self.exact_names.get(query, []):
+            scores[self.name_entries[position]] = 1.0
+
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self.postings.get(trigram, []))
+        for position, count in shared.items():
+            score = (
+                2 * count / (len(query_trigrams) + self.name_trigram_counts[position])
+            )
+            entry = self.name_entries[position]
+            if score >= self.min_score and score > scores.get(entry, 0):
+                scores[entry] = score
+
+        ranked = []
+        for entry, score in sorted(scores.items(), key=lambda x: (-x[1], x[0])):
+            entry_types = self.types[entry]
+            if excluded & entry_types:
+                continue
+            if fixed_type is not None and fixed_type not in entry_types:
+                continue
+            ranked.append((score, self.qids[entry]))
+            if len(ranked) == k:
+                break
+        return ranked
+
+    def search(
+        self,
+        search_term,
+        excluded_types=None,
+        fixed_type=None,
+        exclude_basic=True,
+    ):
+        """
+        Looks up a string in the index and returns the best match as a
+        dict with "id", "label", "description" and "url".
+        """
+        ranked = self.candidates(
+            search_term,
+            k=1,
+            excluded_types=excluded_types,
+            fixed_type=fixed_type,
+            exclude_basic=exclude_basic,
+        )
+        if not ranked:
+            qid = "NONE"
+            return {
+                "id": qid,
+                "label": "NONE",
+                "description": "NONE",
+                "url": f"https://www.wikidata.org/wiki/{qid}",
+            }
+        qid = ranked[0][1]
+        entry = self.entry_positions[qid]
+        return {
+            "id": qid,
+            "label": self.labels[entry] or "NONE",
+            "description": self.descriptions[entry] or "NONE",
+            "url": f"https://www.wikidata.org/wiki/{qid}",
+        }
+
+
+def _split(values):
+    if isinstance(values, str):
+        return [v for v in values.split("|") if v]
+    return list(values)
@@ -0,0 +1,128 @@
+"""Local indexes answering Wikidata lookups without network calls"""
+import sqlite3
+
+from wdcuration.dumps import (
+    iter_entities,
+    iter_ntriples,
+    read_extract,
+    truthy_values,
+)
+from wdcuration.utils import chunk
+
+# SQLite limits the number of parameters in a single statement.
+SQLITE_CHUNK_SIZE = 500
+
+
+class IdentifierIndex:
+    """
+    An ID:QID index for identifier properties, stored in SQLite.
+
+    It can be passed as the backend of `lookup_id`, `lookup_multiple_ids` and
+    `get_wikidata_items_for_id`, or set globally with `wdcuration.sparql.set_default_backend`.
+
+    Args:
+      path (str): The path to the SQLite file. Defaults to ":memory:" (not persisted).
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = str(path)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS identifiers "
+            "(property TEXT NOT NULL, id TEXT NOT NULL, qid TEXT NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS identifiers_property_id "
+            "ON identifiers (property, id)"
+        )
+
+    @classmethod
+    def from_json_dump(cls, dump_path, properties, path=":memory:"):
+        """
+        Builds an index from a Wikidata JSON dump (or an extract of one).
+
+        Args:
+          dump_path (str): The path to the dump, optionally gzip or bz2 compressed.
+          properties (list): The PIDs of the identifier properties to index.
+          path (str): The path to the SQLite file. Defaults to ":memory:".
+        """
+        index = cls(path)
+        index.add(
+            (wikidata_property, str(value), entity["id"])
+            for entity in iter_entities(dump_path)
+            for wikidata_property in properties
+            for value in truthy_values(entity, wikidata_property)
+        )
+        return index
+
+    @classmethod
+    def from_ntriples(cls, dump_path, properties, path=":memory:"):
+        """
+        Builds an index from a Wikidata N-Triples dump (or an extract of one).
+
+        Args:
+          dump_path (str): The path to the dump, optionally gzip or bz2 compressed.
+          properties (list): The PIDs of the identifier properties to index.
+          path (str): The path to the SQLite file. Defaults to ":memory:".
+        """
+        index = cls(path)
+        index.add(
+            (wikidata_property, value, qid)
+            for qid, wikidata_property, value in iter_ntriples(dump_path, properties)
+        )
+        return index
+
+    @classmethod
+    def from_extract(cls, extract_path, path=":memory:"):
+        """
+        Builds an index from the identifiers.tsv extract written by
+        `wdcuration.dumps.extract_from_dump`.
+
+        Args:
+          extract_path (str): The path to the extract.
+          path (str): The path to the SQLite file. Defaults to ":memory:".
+        """
+        index = cls(path)
+        index.add(read_extract(extract_path))
+        return index
+
+    def add(self, rows):
+        """
+        Adds (PID, ID, QID) rows to the index.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO identifiers (property, id, qid) VALUES (?, ?, ?)", rows
+            )
+
+    def lookup(self, wikidata_property, ids):
+        """
+        Looks up IDs for a property.
+
+        Returns:
+          dict: An ID:list of QIDs dictionary. IDs without matches are left out.
+        """
+        result = {}
+        for ids_chunk in chunk(list(ids), SQLITE_CHUNK_SIZE):
+            placeholders = ",".join("?" * len(ids_chunk))
+            cursor = self.connection.execute(
+                "SELECT id, qid FROM identifiers "
+                f"WHERE property = ? AND id IN ({placeholders}) ORDER BY rowid",
+                (wikidata_property, *ids_chunk),
+            )
+            for id, qid in cursor:
+                result.setdefault(id, []).append(qid)
+        return result
+
+    def items_for_property(self, wikidata_property):
+        """
+        Returns an ID:QID dictionary for all occurences of an identifier property.
+        """
+        cursor = self.connection.execute(
+            "SELECT id, qid FROM identifiers WHERE property = ? ORDER BY rowid",
+            (wikidata_property,),
+        )
+        return dict(cursor)
+
+    def close(self):
+        self.connection.close()
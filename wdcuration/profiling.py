@@ -0,0 +1,138 @@
+"""Per-stage profiling of curation pipelines"""
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import pandas as pd
+
+
+@dataclass
+class StageReport:
+    """
+    Measurements for one stage of a pipeline.
+
+    Attributes:
+      name: The name of the stage.
+      wall_seconds: The elapsed time of the stage.
+      cpu_seconds: The CPU time of the process during the stage. Much lower than
+        wall_seconds for network-bound stages.
+      peak_memory_bytes: The peak memory allocated by Python during the stage,
+        or None if memory was not traced.
+      rows: The number of rows processed, if known.
+    """
+
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_memory_bytes: int = None
+    rows: int = None
+
+    @property
+    def rows_per_second(self):
+        if not self.rows or self.wall_seconds == 0:
+            return None
+        return self.rows / self.wall_seconds
+
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, peak memory and throughput for named stages.
+
+    Example:
+      profiler = StageProfiler()
+      with profiler.stage("load") as stage:
+          df = pd.read_csv(path)
+          stage.rows = len(df)
+      profiler.close()
+      profiler.print_report()
+
+    Args:
+      enabled (bool): If False, stages are not measured. Defaults to True.
+      trace_memory (bool): Whether to trace peak memory with tracemalloc, which slows
+        down allocation-heavy code. Defaults to True.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages = []
+        self._started_tracing = False
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Measures the code in a with block as a stage. The yielded StageReport's rows
+        can be set inside the block, once the number of rows is known.
+        """
+        report = StageReport(name, rows=rows)
+        if not self.enabled:
+            yield report
+            return
+        if self.trace_memory:
+            self._reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield report
+        finally:
+            report.wall_seconds = time.perf_counter() - start_wall
+            report.cpu_seconds = time.process_time() - start_cpu
+            if self.trace_memory:
+                report.peak_memory_bytes = (
+                    tracemalloc.get_traced_memory()[1] - start_memory
+                )
+            self.stages.append(report)
+
+    def _reset_peak(self):
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        elif self._started_tracing:
+            # Python < 3.9 has no reset_peak, so the tracing started here is restarted.
+            tracemalloc.stop()
+            tracemalloc.start()
+
+    def close(self):
+        """Stops memory tracing, if the profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def report(self):
+        """
+        Returns a DataFrame with one row per stage, with the measurements of
+        `StageReport` and rows_per_second.
+        """
+        return pd.DataFrame(
+            [
+                {**asdict(stage), "rows_per_second": stage.rows_per_second}
+                for stage in self.stages
+            ],
+            columns=[
+                "name",
+                "wall_seconds",
+                "cpu_seconds",
+                "peak_memory_bytes",
+                "rows",
+                "rows_per_second",
+            ],
+        )
+
+    def save(self, path):
+        """Writes the report as JSON if path ends in ".json", and as CSV otherwise."""
+        path = Path(path)
+        report = self.report()
+        if path.suffix == ".json":
+            records = report.astype(object).where(report.notna(), None)
+            path.write_text(json.dumps(records.to_dict("records"), indent=2))
+        else:
+            report.to_csv(path, index=False)
+
+    def print_report(self):
+        print(self.report().to_string(index=False, float_format="{:.3f}".format))
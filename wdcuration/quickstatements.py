@@ -1,7 +1,18 @@
 """Quickstatements management"""
+import csv
+import io
+from dataclasses import dataclass
+from pathlib import Path
 from time import gmtime, strftime, strptime
 from urllib.parse import quote
 
+from wdcuration.cache import get_entities
+from wdcuration.sparql import ENTITY_PREFIX, get_statement_values_for_multiple_qids
+
+QS_URL_PREFIX = "https://quickstatements.toolforge.org/#/v1="
+# Long URLs are truncated or rejected by browsers and web servers.
+MAX_QS_URL_LENGTH = 8000
+
 
 def convert_date_to_quickstatements(date, format="%Y-%m-%d"):
     """Converts a date to Quickstatements format using the datetime package."""
@@ -20,5 +31,288 @@ def render_qs_url(qs):
     Render an URL targeting Quickstatements.
     """
     quoted_qs = quote(qs.replace("\t", "|").replace("\n", "||"), safe="")
-    url = f"https://quickstatements.toolforge.org/#/v1={quoted_qs}\\"
+    url = f"{QS_URL_PREFIX}{quoted_qs}\\"
     return url
+
+
+@dataclass(frozen=True)
+class Create:
+    """A CREATE command. Following commands with subject "LAST" refer to the new item."""
+
+    def to_v1(self):
+        return "CREATE"
+
+
+@dataclass(frozen=True)
+class Statement:
+    """
+    A statement command.
+
+    Attributes:
+      subject: A QID, or "LAST" for the last created item.
+      property: The PID.
+      value: The value, in Quickstatements format (e.g. "Q5" or a date).
+      is_string: Whether the value is a string (e.g. an external ID), to be quoted.
+    """
+
+    subject: str
+    property: str
+    value: str
+    is_string: bool = False
+
+    @property
+    def column(self):
+        return self.property
+
+    @property
+    def column_value(self):
+        return f'"{self.value}"' if self.is_string else self.value
+
+    def to_v1(self):
+        return f"{self.subject}|{self.property}|{self.column_value}"
+
+
+@dataclass(frozen=True)
+class Label:
+    """
+    A label command.
+
+    Attributes:
+      subject: A QID, or "LAST" for the last created item.
+      language: The language code.
+      text: The label.
+    """
+
+    subject: str
+    language: str
+    text: str
+    prefix = "L"
+
+    @property
+    def column(self):
+        return f"{self.prefix}{self.language}"
+
+    @property
+    def column_value(self):
+        return self.text
+
+    def to_v1(self):
+        return f'{self.subject}|{self.column}|"{self.text}"'
+
+
+@dataclass(frozen=True)
+class Description(Label):
+    """A description command, with the attributes of `Label`."""
+
+    prefix = "D"
+
+
+@dataclass(frozen=True)
+class Alias(Label):
+    """An alias command, with the attributes of `Label`."""
+
+    prefix = "A"
+
+
+def to_v1(commands):
+    """Serializes commands to the Quickstatements V1 format, one command per line."""
+    return "\n".join(command.to_v1() for command in commands)
+
+
+def to_csv(commands):
+    """
+    Serializes commands to the Quickstatements CSV format, with one row per item.
+
+    Commands on "LAST" belong to the row of the preceding CREATE, and consecutive
+    commands on the same QID share a row. Columns that an item needs more than once
+    (e.g. two P31 values) are repeated in the header.
+    """
+    rows = []
+    for command in commands:
+        if isinstance(command, Create):
+            rows.append(("", []))
+            continue
+        subject = "" if command.subject == "LAST" else command.subject
+        if not rows or rows[-1][0] != subject:
+            rows.append((subject, []))
+        rows[-1][1].append((command.column, command.column_value))
+
+    header = {}
+    for _, cells in rows:
+        counts = {}
+        for column, _ in cells:
+            counts[column] = counts.get(column, 0) + 1
+        for column, count in counts.items():
+            header[column] = max(header.get(column, 0), count)
+
+    positions = {}
+    columns = ["qid"]
+    for column, count in header.items():
+        positions[column] = len(columns)
+        columns.extend([column] * count)
+
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(columns)
+    for subject, cells in rows:
+        row = [subject] + [""] * (len(columns) - 1)
+        used = {}
+        for column, value in cells:
+            row[positions[column] + used.get(column, 0)] = value
+            used[column] = used.get(column, 0) + 1
+        writer.writerow(row)
+    return output.getvalue()
+
+
+def split_commands(commands, max_commands=None, max_url_length=MAX_QS_URL_LENGTH):
+    """
+    Splits commands into batches that each fit in one Quickstatements URL.
+
+    A CREATE command is never separated from the "LAST" commands that follow it.
+    An item that does not fit in the budgets on its own becomes a batch by itself.
+
+    Args:
+      commands (list): The commands.
+      max_commands (int): The maximum number of commands in a batch. Defaults to no limit.
+      max_url_length (int): The maximum length of the URL of a batch, as rendered
+        by `render_qs_url`. None disables the limit. Defaults to MAX_QS_URL_LENGTH.
+
+    Yields:
+      list: The commands of each batch.
+    """
+    # Quoting is done character by character, so the URL length is the sum of the
+    # quoted lengths of the commands and of the "||" separators between them.
+    separator_length = len(quote("||", safe=""))
+    fixed_length = len(QS_URL_PREFIX) + 1 - separator_length
+    batch = []
+    batch_length = fixed_length
+    for unit in _items(commands):
+        unit_length = sum(
+            len(quote(command.to_v1(), safe="")) + separator_length for command in unit
+        )
+        too_many = max_commands is not None and len(batch) + len(unit) > max_commands
+        too_long = (
+            max_url_length is not None and batch_length + unit_length > max_url_length
+        )
+        if batch and (too_many or too_long):
+            yield batch
+            batch = []
+            batch_length = fixed_length
+        batch.extend(unit)
+        batch_length += unit_length
+    if batch:
+        yield batch
+
+
+def render_qs_urls(commands, max_commands=None, max_url_length=MAX_QS_URL_LENGTH):
+    """
+    Renders commands as Quickstatements URLs, split with `split_commands`.
+
+    Yields:
+      str: The URL of each batch.
+    """
+    for batch in split_commands(commands, max_commands, max_url_length):
+        yield render_qs_url(to_v1(batch))
+
+
+def write_quickstatements_batches(
+    commands, output_dir, max_commands=10000, format="v1", prefix="quickstatements"
+):
+    """
+    Writes commands to numbered files of at most max_commands commands each.
+
+    Args:
+      commands (list): The commands.
+      output_dir (str): The folder for the files.
+      max_commands (int): The maximum number of commands per file. Defaults to 10000.
+      format (str): "v1" for Quickstatements V1 text files, or "csv". Defaults to "v1".
+      prefix (str): The start of the file names. Defaults to "quickstatements".
+
+    Returns:
+      list: The paths of the files written.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    serializer, suffix = (to_csv, "csv") if format == "csv" else (to_v1, "txt")
+    paths = []
+    batches = split_commands(commands, max_commands=max_commands, max_url_length=None)
+    for i, batch in enumerate(batches, start=1):
+        path = output_dir.joinpath(f"{prefix}_{i:04d}.{suffix}")
+        path.write_text(serializer(batch), encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def drop_existing_commands(commands):
+    """
+    Drops the commands that would not change existing items.
+
+    Statements whose value the item already has, and labels, descriptions and aliases
+    it already has (or aliases equal to its label) are dropped, as are repeated
+    commands. Statement values are checked with batched SPARQL queries and terms
+    with batched wbgetentities calls, so a whole sheet takes a few requests.
+    Commands on new ("LAST") items are kept.
+
+    Args:
+      commands (list): The commands.
+
+    Returns:
+      list: The remaining commands, in the original order.
+    """
+    statements = [
+        c for c in commands if isinstance(c, Statement) and c.subject != "LAST"
+    ]
+    terms = [c for c in commands if isinstance(c, Label) and c.subject != "LAST"]
+
+    existing = set()
+    if statements:
+        values = get_statement_values_for_multiple_qids(
+            [c.subject for c in statements],
+            list(dict.fromkeys(c.property for c in statements)),
+        )
+        for qid, property_values in values.items():
+            for property, property_value_list in property_values.items():
+                existing.update(
+                    (qid, property, value.replace(ENTITY_PREFIX, ""))
+                    for value in property_value_list
+                )
+    if terms:
+        languages = list(dict.fromkeys(c.language for c in terms))
+        entities = get_entities(
+            [c.subject for c in terms], ["labels", "descriptions", "aliases"], languages
+        )
+        for qid, entity in entities.items():
+            for language, label in entity.get("labels", {}).items():
+                existing.add((qid, f"L{language}", label["value"]))
+                existing.add((qid, f"A{language}", label["value"]))
+            for language, description in entity.get("descriptions", {}).items():
+                existing.add((qid, f"D{language}", description["value"]))
+            for language, aliases in entity.get("aliases", {}).items():
+                existing.update((qid, f"A{language}", a["value"]) for a in aliases)
+
+    kept = []
+    for command in commands:
+        if getattr(command, "subject", "LAST") == "LAST":
+            kept.append(command)
+            continue
+        if isinstance(command, Statement):
+            key = (command.subject, command.property, str(command.value))
+        else:
+            key = (command.subject, command.column, str(command.text))
+        if key not in existing:
+            existing.add(key)
+            kept.append(command)
+    return kept
+
+
+def _items(commands):
+    """Groups commands into units that must stay together: a CREATE with its "LAST" commands."""
+    unit = []
+    for command in commands:
+        joins_unit = unit and getattr(command, "subject", None) == "LAST"
+        if not joins_unit and unit:
+            yield unit
+            unit = []
+        unit.append(command)
+    if unit:
+        yield unit
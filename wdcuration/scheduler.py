@@ -0,0 +1,316 @@
+"""Rate-limit-aware scheduling of requests to Wikimedia services"""
+import asyncio
+import random
+import time
+from threading import Lock
+from urllib.parse import urlparse
+
+import requests
+
+from wdcuration.instrumentation import (
+    RequestEvent,
+    emit_request_event,
+    endpoint_name,
+    has_request_hooks,
+)
+from wdcuration.utils import json_loads
+
+# Starting requests per second for each host. Other hosts use DEFAULT_RATE.
+HOST_RATES = {
+    "query.wikidata.org": 2.0,
+    "www.wikidata.org": 10.0,
+    "en.wikipedia.org": 10.0,
+}
+DEFAULT_RATE = 5.0
+THROTTLE_STATUS_CODES = {429, 503}
+# Async response bodies from this size on are decoded in a worker thread,
+# so that the event loop keeps sending the other requests meanwhile.
+EXECUTOR_DECODE_BYTES = 256 * 1024
+
+
+class DatabaseLagError(Exception):
+    """
+    Raised when the Wikidata replication lag stays above maxlag for all the retries.
+
+    Attributes:
+      lag (float): The lag in seconds reported by the last response, if known.
+    """
+
+    def __init__(self, url, lag, attempts):
+        self.lag = lag
+        super().__init__(
+            f"Database lag of {lag} seconds for {url} is still above maxlag "
+            f"after {attempts} attempts"
+        )
+
+
+class TokenBucket:
+    """
+    A token bucket that hands out reservations instead of blocking.
+
+    Each call to `reserve` takes one token and returns how long the caller
+    must wait before using it, so the same bucket serves threads and coroutines.
+
+    Args:
+      rate (float): Tokens added per second.
+      capacity (float): The maximum number of tokens (the allowed burst).
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(delay, self.blocked_until - now)
+
+
+class RequestScheduler:
+    """
+    Paces outgoing requests with one token bucket per host, and retries throttled requests.
+
+    Responses with status 429 or 503, or MediaWiki "maxlag" responses (signalled by the
+    X-Database-Lag header), are retried with jittered exponential backoff, waiting at
+    least as long as the Retry-After header asks. Throttling halves the rate for the
+    host; a run of successful requests raises it again, up to max_rate.
+
+    Each request is reported to the hooks of `wdcuration.instrumentation`.
+
+    Args:
+      rates (dict): Starting requests per second by host. Defaults to HOST_RATES.
+      burst (float): The number of requests a host can receive at once. Defaults to 5.
+      max_rate (float): The highest rate the scheduler tunes itself up to. Defaults to 50.
+      min_rate (float): The lowest rate the scheduler backs off to. Defaults to 0.2.
+      max_retries (int): Retries for a throttled request before giving up. Defaults to 5.
+      base_backoff (float): The first backoff delay, in seconds. Defaults to 1.
+      max_backoff (float): The longest backoff delay, in seconds. Defaults to 60.
+      increase_after (int): Successful requests before the rate for a host is raised. Defaults to 20.
+      maxlag (int): If set, sent as the maxlag parameter of Wikidata API requests, so that
+        the API asks clients to slow down when replication lag is high.
+      shared_limiter (SharedRateLimiter): If set, requests are also paced by a limiter
+        shared with other processes (see `wdcuration.batch.SharedRateLimiter`).
+    """
+
+    def __init__(
+        self,
+        rates=None,
+        burst=5,
+        max_rate=50.0,
+        min_rate=0.2,
+        max_retries=5,
+        base_backoff=1.0,
+        max_backoff=60.0,
+        increase_after=20,
+        maxlag=None,
+        shared_limiter=None,
+    ):
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        self.burst = burst
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.increase_after = increase_after
+        self.maxlag = maxlag
+        self.shared_limiter = shared_limiter
+        self.buckets = {}
+        self.successes = {}
+        self.lock = Lock()
+
+    def reserve(self, host):
+        """Takes a token for host and returns the delay in seconds before the request can start."""
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(
+                    self.rates.get(host, DEFAULT_RATE), self.burst
+                )
+            delay = self.buckets[host].reserve(time.monotonic())
+            if self.shared_limiter is not None:
+                delay = max(delay, self.shared_limiter.reserve(host))
+            return delay
+
+    def record_success(self, host):
+        """Counts a successful request, raising the rate for host after a run of them."""
+        with self.lock:
+            self.successes[host] = self.successes.get(host, 0) + 1
+            if self.successes[host] >= self.increase_after:
+                self.successes[host] = 0
+                bucket = self.buckets[host]
+                bucket.rate = min(self.max_rate, bucket.rate * 1.1)
+
+    def record_throttle(self, host, retry_after=None):
+        """Halves the rate for host and, if given, blocks it for retry_after seconds."""
+        with self.lock:
+            self.successes[host] = 0
+            bucket = self.buckets[host]
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            if retry_after is not None:
+                bucket.blocked_until = max(
+                    bucket.blocked_until, time.monotonic() + retry_after
+                )
+                if self.shared_limiter is not None:
+                    self.shared_limiter.block(host, retry_after)
+
+    def backoff(self, attempt, retry_after=None):
+        """Returns a jittered exponential backoff delay, never shorter than retry_after."""
+        delay = min(self.max_backoff, self.base_backoff * 2**attempt)
+        delay = random.uniform(delay / 2, delay)
+        return max(delay, retry_after or 0.0)
+
+    def request(self, method, url, session=None, **kwargs):
+        """
+        Sends a request with requests, paced and retried by the scheduler.
+
+        Args:
+          method (str): The HTTP method.
+          url (str): The URL.
+          session (requests.Session): An optional session to send the request with.
+          **kwargs: Passed on to requests.
+
+        Returns:
+          requests.Response: The response. After max_retries throttled attempts,
+          the last throttled response is returned.
+
+        Raises:
+          DatabaseLagError: If the database lag is still above maxlag after max_retries attempts.
+        """
+        host = urlparse(url).netloc
+        self._add_maxlag(host, kwargs)
+        sender = session if session is not None else requests
+        for attempt in range(self.max_retries + 1):
+            time.sleep(self.reserve(host))
+            start = time.perf_counter()
+            response = sender.request(method, url, **kwargs)
+            latency = time.perf_counter() - start
+            throttled = _is_throttled(response.status_code, response.headers)
+            if not throttled:
+                self.record_success(host)
+            if not throttled or attempt == self.max_retries:
+                if has_request_hooks():
+                    body_size = response.headers.get("Content-Length")
+                    if body_size is None and not kwargs.get("stream"):
+                        body_size = len(response.content)
+                    emit_request_event(
+                        RequestEvent(
+                            endpoint_name(url, kwargs.get("params")),
+                            method,
+                            latency,
+                            int(body_size or 0),
+                            response.status_code,
+                            attempt,
+                        )
+                    )
+            if not throttled:
+                return response
+            retry_after = _retry_after(response.headers)
+            self.record_throttle(host, retry_after)
+            if attempt == self.max_retries:
+                _raise_for_lag(url, response.headers, attempt + 1)
+                return response
+            response.close()
+            time.sleep(self.backoff(attempt, retry_after))
+
+    async def async_request_json(self, session, method, url, **kwargs):
+        """
+        Sends a request with an aiohttp session, paced and retried by the scheduler,
+        and returns the decoded JSON body.
+
+        Bodies of EXECUTOR_DECODE_BYTES or more are decoded in the default executor
+        of the event loop.
+
+        Raises:
+          aiohttp.ClientResponseError: If the response has an error status,
+            including a request still throttled after max_retries attempts.
+          DatabaseLagError: If the database lag is still above maxlag after max_retries attempts.
+        """
+        host = urlparse(url).netloc
+        self._add_maxlag(host, kwargs)
+        for attempt in range(self.max_retries + 1):
+            await asyncio.sleep(self.reserve(host))
+            start = time.perf_counter()
+            async with session.request(method, url, **kwargs) as response:
+                throttled = _is_throttled(response.status, response.headers)
+                if not throttled or attempt == self.max_retries:
+                    body = await response.read()
+                    if has_request_hooks():
+                        emit_request_event(
+                            RequestEvent(
+                                endpoint_name(url, kwargs.get("params")),
+                                method,
+                                time.perf_counter() - start,
+                                int(response.headers.get("Content-Length", len(body))),
+                                response.status,
+                                attempt,
+                            )
+                        )
+                    response.raise_for_status()
+                    if throttled:
+                        # 429 and 503 responses raised above, so the lag is too high.
+                        _raise_for_lag(url, response.headers, attempt + 1)
+                    self.record_success(host)
+                    if len(body) >= EXECUTOR_DECODE_BYTES:
+                        loop = asyncio.get_running_loop()
+                        return await loop.run_in_executor(None, json_loads, body)
+                    return json_loads(body)
+                retry_after = _retry_after(response.headers)
+            self.record_throttle(host, retry_after)
+            await asyncio.sleep(self.backoff(attempt, retry_after))
+
+    def _add_maxlag(self, host, kwargs):
+        if self.maxlag is not None and host == "www.wikidata.org":
+            params = dict(kwargs.get("params") or {})
+            params.setdefault("maxlag", self.maxlag)
+            kwargs["params"] = params
+
+
+_default_scheduler = RequestScheduler()
+
+
+def get_scheduler():
+    """Returns the scheduler used for all requests made by wdcuration."""
+    return _default_scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    Replaces the scheduler used for all requests made by wdcuration.
+
+    Args:
+      scheduler (RequestScheduler): The new scheduler.
+    """
+    global _default_scheduler
+    _default_scheduler = scheduler
+
+
+def _is_throttled(status, headers):
+    if status in THROTTLE_STATUS_CODES:
+        return True
+    return "X-Database-Lag" in headers
+
+
+def _raise_for_lag(url, headers, attempts):
+    lag = headers.get("X-Database-Lag")
+    if lag is None:
+        return
+    try:
+        lag = float(lag)
+    except ValueError:
+        pass
+    raise DatabaseLagError(url, lag, attempts)
+
+
+def _retry_after(headers):
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
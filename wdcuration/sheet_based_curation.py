@@ -1,7 +1,9 @@
 import asyncio
-import time
+import json
+import re
 
 import inflect
+import numpy as np
 import pandas as pd
 from aiohttp import ClientSession
 from numpy import dtype
@@ -9,39 +11,38 @@ from tqdm import tqdm
 from typing import List
 import os
 
-from wdcuration.api_searches import parse_wikidata_result
-from wdcuration.quickstatements import render_qs_url
+from wdcuration.api_searches import (
+    BASIC_EXCLUSION,
+    SearchResults,
+    merge_search_hits,
+    multilingual_result,
+    multilingual_search_payload,
+    parse_wikidata_result,
+    rerank_candidates,
+    search_expression,
+)
+from wdcuration.cache import WIKIDATA_API, get_entity_cache, get_search_cache
+from wdcuration.instrumentation import emit_cache_hit
+from wdcuration.profiling import StageProfiler
+from wdcuration.quickstatements import (
+    Alias,
+    Statement,
+    drop_existing_commands,
+    render_qs_url,
+)
+from wdcuration.scheduler import get_scheduler
+from wdcuration.sheet_io import read_sheet, write_sheet
 from wdcuration.sparql import get_wikidata_items_for_id
-from wdcuration.utils import divide_in_chunks_of_equal_len
-
-BASIC_EXCLUSION = list(
-        {
-            "Q26842193": "journal",
-            "Q5633421": "scientific journal",
-            "Q737498": "academic journal",
-            "Q7725634": "literary work",
-            "Q47461344": "written work",
-            "Q101352": "family name",
-            "Q13442814": "scholarly article",
-            "Q732577": "publication",
-            "Q3331189": "version, edition or translation",
-            "Q187685": "doctoral thesis",
-            "Q1266946": "thesis",
-            "Q4167410": "disambiguation page",
-            "Q16521": "taxon",
-            "Q4167836": "Wikimedia category",
-            "Q30612": "clinical trial",
-            "Q215380": "musical group",
-            "Q482994": "musical album",
-            "Q105543609": "musical work",
-            "Q134556": "music single",
-            "Q5": "human",
-            "Q838795": "comic strip",
-            "Q3305213": "painting",
-            "Q21191270": "television series episode",
-            "Q15711870": "animated character",
-        }.keys()
-    )
+from wdcuration.utils import divide_in_chunks_of_equal_len, normalize_label
+
+SEARCH_RESULT_COLUMNS = [
+    "search_term",
+    "wikidata_id",
+    "wikidata_label",
+    "wikidata_description",
+]
+
+
 def print_quickstatements_for_curated_sheet(
     curated_sheet_path, wikidata_property, dropnas=False
 ):
@@ -52,33 +53,51 @@ def print_quickstatements_for_curated_sheet(
 
 
 def get_quickstatements_for_curated_sheet(
-    curated_sheet_path, wikidata_property, dropnas=False, add_name_as_alias=True, alias_lang = "en"
+    curated_sheet_path,
+    wikidata_property,
+    dropnas=False,
+    add_name_as_alias=True,
+    alias_lang="en",
+    min_score=None,
+    skip_existing=False,
 ):
     """
     Gets a quickstatements from an standardized curation sheet.
 
     Args:
-      curated_sheet_path (str): The path to the sheet of interest.
+      curated_sheet_path (str): The path to the sheet of interest, as CSV, Parquet or Feather
+        (see `wdcuration.sheet_io.read_sheet`).
       wikidata_property (str): The PID of the property to use on Quickstatements.
       dropnas (bool): Whether or not a curation column labeled "ok_row_ was added.
         If true, will dropnas in the column. Useful when good matches are rare.
       add_aliases (bool)
+      min_score (float): If set, only rows with a "match_score" of at least min_score are used,
+        instead of a manual "ok_row" column. Scores are computed with `score_curation_sheet`
+        if the sheet has none.
+      skip_existing (bool): Whether to drop the statements and aliases that the items
+        already have, checked in bulk with `wdcuration.quickstatements.drop_existing_commands`.
 
     """
-    df = pd.read_csv(curated_sheet_path, dtype={"id": object})
+    df = read_sheet(curated_sheet_path)
     if dropnas:
         df = df.dropna(subset=["ok_row"])
-    qs = ""
-    for i, row in df.iterrows():
-        if row["wikidata_id"] != "NONE":
-            database_id = row["id"]
-            database_p_id = wikidata_property
-            wikidata_id = row["wikidata_id"]
-            database_label = row["name"]
-            qs += f'{wikidata_id}|{database_p_id}|"{database_id}"' + "\n"
-            if add_name_as_alias:
-             qs += f'{wikidata_id}|A{alias_lang}|"{database_label}"' + "\n"
-    return qs
+    if min_score is not None:
+        if "match_score" not in df.columns:
+            df = score_curation_sheet(df)
+        df = df[df["match_score"] >= min_score]
+    df = df[df["wikidata_id"] != "NONE"]
+    commands = []
+    for wikidata_id, database_id, database_label in zip(
+        df["wikidata_id"], df["id"], df["name"]
+    ):
+        commands.append(
+            Statement(wikidata_id, wikidata_property, database_id, is_string=True)
+        )
+        if add_name_as_alias:
+            commands.append(Alias(wikidata_id, alias_lang, database_label))
+    if skip_existing:
+        commands = drop_existing_commands(commands)
+    return "".join(command.to_v1() + "\n" for command in commands)
 
 
 async def async_search_wikidata(
@@ -87,38 +106,84 @@ async def async_search_wikidata(
     excluded_types: List[str] = None,
     fixed_type: str = None,
     exclude_basic: bool = False,
+    top_k: int = None,
+    languages: List[str] = None,
 ):
     """
     Looks up string on Wikidata.
 
     Returns a nested dictionary with the search term as key and the associated results as value
+
+    If top_k is set, the first top_k hits are re-ranked locally and the best one is kept
+    (see `async_search_wikidata_candidates`).
+    If a list of languages is set, the searches in each language run concurrently and
+    are merged as in `wdcuration.api_searches.search_wikidata`.
+    Results are shared with `search_wikidata` through the search cache, if one is set
+    with `wdcuration.cache.set_search_cache`.
     """
     if excluded_types is None:
         excluded_types = []
     elif not isinstance(excluded_types, list):
         raise TypeError("excluded_types must be a list")
+    if languages is not None and top_k is not None:
+        raise ValueError("top_k can not be combined with languages")
+
+    search_cache = get_search_cache()
+    options = {
+        "excluded_types": excluded_types,
+        "fixed_type": fixed_type,
+        "exclude_basic": exclude_basic,
+        "top_k": top_k,
+    }
+    if languages is not None:
+        options["language"] = "|".join(languages)
+    if search_cache is not None:
+        cached = search_cache.get(search_term, **options)
+        if cached is not None:
+            emit_cache_hit(WIKIDATA_API, {"action": "query", "list": "search"})
+            return {search_term: cached}
+    if languages is not None:
+        result = await _async_search_wikidata_multilingual(
+            search_term, session, excluded_types, fixed_type, exclude_basic, languages
+        )
+    else:
+        result = await _async_search_wikidata_uncached(
+            search_term, session, excluded_types, fixed_type, exclude_basic, top_k
+        )
+    if search_cache is not None:
+        search_cache.put(result[search_term], search_term, **options)
+    return result
 
-    # Note: for some reason, adding the "haswbstatement" bits messes up with the ranking of the results.
-    basic_exclusion = BASIC_EXCLUSION
-    excluded_types_local = excluded_types
-    # Workaround to avoid accumulation. Not sure why, but they are accumulating.
-    excluded_types_local = list(set(excluded_types_local))
 
-    search_expression = search_term
-    if exclude_basic:
-        for excluded_type in basic_exclusion:
-            excluded_types_local.append(excluded_type)  # Disambiguation page
+async def _async_search_wikidata_uncached(
+    search_term, session, excluded_types, fixed_type, exclude_basic, top_k
+):
+    if top_k is not None:
+        candidates = await async_search_wikidata_candidates(
+            search_term,
+            session,
+            k=top_k,
+            excluded_types=excluded_types,
+            fixed_type=fixed_type,
+            exclude_basic=exclude_basic,
+        )
+        if not candidates:
+            return {search_term: parse_wikidata_result({"query": {"search": []}})}
+        best = candidates[0]
+        return {
+            search_term: {k: best[k] for k in ["id", "label", "description", "url"]}
+        }
 
-    for excluded_type in excluded_types_local:
-        search_expression += f" -haswbstatement:P31={excluded_type} "
-    if fixed_type is not None:
-        search_expression += f" haswbstatement:P31={fixed_type} "
+    # Note: for some reason, adding the "haswbstatement" bits messes up with the ranking of the results.
+    expression = search_expression(
+        search_term, excluded_types, fixed_type, exclude_basic
+    )
 
     base_url = "https://www.wikidata.org/w/api.php?"
     payload = {
         "action": "query",
         "list": "search",
-        "srsearch": search_expression,
+        "srsearch": expression,
         "language": "en",
         "format": "json",
         "origin": "*",
@@ -128,21 +193,111 @@ async def async_search_wikidata(
         base_url += f"&{k}={v}"
 
     url = base_url.replace("?&", "?")
-    async with session.request("GET", url) as response:
-        # Raise if the response code is >= 400.
-        # Some 200 codes may still be "ok".
-        # You can also pass raise_for_status within
-        # client.request().
-        response.raise_for_status()
-
-        # Let your code be fully async.  The call to json.loads()
-        # is blocking and won't take full advantage.
-        #
-        # And it does largely the same thing you're doing now:
-        # https://github.com/aio-libs/aiohttp/blob/76268e31630bb8615999ec40984706745f7f82d1/aiohttp/client_reqrep.py#L985
-        j = await response.json()
-        parsed_result = await async_parse_result(j, session)
-        return {search_term: parsed_result}
+    # The scheduler paces the requests and raises if the response code is >= 400.
+    j = await get_scheduler().async_request_json(session, "GET", url)
+    parsed_result = await async_parse_result(j, session)
+    return {search_term: parsed_result}
+
+
+async def _async_search_wikidata_multilingual(
+    search_term, session, excluded_types, fixed_type, exclude_basic, languages
+):
+    expression = search_expression(
+        search_term, excluded_types, fixed_type, exclude_basic
+    )
+    responses = await asyncio.gather(
+        *[
+            get_scheduler().async_request_json(
+                session,
+                "GET",
+                WIKIDATA_API,
+                params=multilingual_search_payload(expression, language),
+            )
+            for language in languages
+        ]
+    )
+    qids = merge_search_hits(
+        [[hit["title"] for hit in j["query"]["search"]] for j in responses]
+    )
+    if not qids:
+        return {search_term: multilingual_result(qids, {}, languages)}
+
+    qid = qids[0]
+    cache = get_entity_cache()
+    cached = None
+    if cache is not None:
+        cached = cache.get(qid, ["labels", "descriptions"], languages)
+    if cached is not None and cache.is_fresh(cached[2]):
+        entities = {qid: cached[0]}
+        emit_cache_hit(WIKIDATA_API, {"action": "wbgetentities"})
+    else:
+        payload = {
+            "action": "wbgetentities",
+            "props": "labels|descriptions|info",
+            "ids": qid,
+            "languages": "|".join(languages),
+            "format": "json",
+        }
+        data = await get_scheduler().async_request_json(
+            session, "GET", WIKIDATA_API, params=payload
+        )
+        entities = data.get("entities", {})
+        if cache is not None and qid in entities:
+            cache.put(entities[qid], ["labels", "descriptions"], languages)
+    return {search_term: multilingual_result(qids, entities, languages)}
+
+
+async def async_search_wikidata_candidates(
+    search_term: str,
+    session: ClientSession,
+    k: int = 5,
+    excluded_types: List[str] = None,
+    fixed_type: str = None,
+    exclude_basic: bool = False,
+    preferred_types: List[str] = None,
+):
+    """
+    Looks up string on Wikidata and returns up to k re-ranked candidates.
+
+    Async version of `wdcuration.api_searches.search_wikidata_candidates`:
+    one search request and one batched wbgetentities request per search term.
+    """
+    base_url = "https://www.wikidata.org/w/api.php"
+    payload = {
+        "action": "query",
+        "list": "search",
+        "srsearch": search_term,
+        "srlimit": k,
+        "uselang": "en",
+        "format": "json",
+        "origin": "*",
+    }
+    j = await get_scheduler().async_request_json(
+        session, "GET", base_url, params=payload
+    )
+    qids = [hit["title"] for hit in j["query"]["search"]]
+    if not qids:
+        return []
+
+    payload = {
+        "action": "wbgetentities",
+        "props": "labels|descriptions|aliases|claims",
+        "ids": "|".join(qids),
+        "languages": "en",
+        "format": "json",
+    }
+    data = await get_scheduler().async_request_json(
+        session, "GET", base_url, params=payload
+    )
+    return rerank_candidates(
+        search_term,
+        qids,
+        data.get("entities", {}),
+        excluded_types=excluded_types,
+        fixed_type=fixed_type,
+        exclude_basic=exclude_basic,
+        preferred_types=preferred_types,
+    )
 
 
 async def async_parse_result(wikidata_result, session):
@@ -157,40 +312,51 @@ async def async_parse_result(wikidata_result, session):
         return base_result
     first_item = wikidata_result["query"]["search"][0]
     qid = first_item["title"]
-    url = f"https://www.wikidata.org/w/api.php?action=wbgetentities&props=labels|descriptions&ids={qid}&languages=en&format=json"
 
-    async with session.request("GET", url) as response:
-        response.raise_for_status()
-        data = await response.json()
+    cache = get_entity_cache()
+    cached = None
+    if cache is not None:
+        cached = cache.get(qid, ["labels", "descriptions"], ["en"])
+    if cached is not None and cache.is_fresh(cached[2]):
+        data = {"entities": {qid: cached[0]}}
+        emit_cache_hit(WIKIDATA_API, {"action": "wbgetentities"})
+    else:
+        url = f"https://www.wikidata.org/w/api.php?action=wbgetentities&props=labels|descriptions|info&ids={qid}&languages=en&format=json"
+        data = await get_scheduler().async_request_json(session, "GET", url)
+        if cache is not None and qid in data.get("entities", {}):
+            cache.put(data["entities"][qid], ["labels", "descriptions"], ["en"])
 
-        label_and_description = {"label": "NONE", "description": "NONE"}
+    label_and_description = {"label": "NONE", "description": "NONE"}
 
-        try:
-            label_and_description["label"] = data["entities"][qid]["labels"]["en"][
-                "value"
-            ]
+    try:
+        label_and_description["label"] = data["entities"][qid]["labels"]["en"]["value"]
 
-        except KeyError:
-            pass
+    except KeyError:
+        pass
 
-        try:
-            label_and_description["description"] = data["entities"][qid][
-                "descriptions"
-            ]["en"]["value"]
+    try:
+        label_and_description["description"] = data["entities"][qid][
+            "descriptions"
+        ]["en"]["value"]
 
-        except KeyError:
-            pass
+    except KeyError:
+        pass
 
-        return {
-            "id": qid,
-            "label": label_and_description["label"],
-            "description": label_and_description.get("description", "no description"),
-            "url": f"https://www.wikidata.org/wiki/{qid}",
-        }
+    return {
+        "id": qid,
+        "label": label_and_description["label"],
+        "description": label_and_description.get("description", "no description"),
+        "url": f"https://www.wikidata.org/wiki/{qid}",
+    }
 
 
 async def run_multiple_searches(
-    search_terms, fixed_type, excluded_types, exclude_basic=False
+    search_terms,
+    fixed_type,
+    excluded_types,
+    exclude_basic=False,
+    top_k=None,
+    languages=None,
 ):
     tasks = []
 
@@ -205,6 +371,8 @@ async def run_multiple_searches(
                     fixed_type=fixed_type,
                     excluded_types=excluded_types,
                     exclude_basic=exclude_basic,
+                    top_k=top_k,
+                    languages=languages,
                 )
             )
             tasks.append(task)
@@ -225,7 +393,12 @@ def generate_curation_spreadsheet(
     excluded_types: List[str] = None,
     drop_nones: bool = True,
     exclude_basic: bool = False,
-    overwrite: bool= True
+    overwrite: bool= True,
+    score_matches: bool = False,
+    profile=False,
+    fingerprint_path: str = None,
+    columns: List[str] = None,
+    languages: List[str] = None,
 ):
     """
     Generates a curation spreadsheet based on input data, filtering and searching for Wikidata entries.
@@ -235,17 +408,32 @@ def generate_curation_spreadsheet(
 
     Args:
         identifiers_property: The identifier property used for Wikidata searching.
-        curation_table_path: Path to the input spreadsheet to be curated.
-        output_file_path: Path where the curated spreadsheet will be saved.
+        curation_table_path: Path to the input spreadsheet to be curated, as CSV, Parquet or Feather.
+        output_file_path: Path where the curated spreadsheet will be saved. Files ending in ".parquet"
+            or ".feather" are written in those formats, and others as CSV.
         description_term_lookup (str, optional): A term to filter the input table based on the "description" column.
         fixed_type (str, optional): A fixed type to filter the Wikidata search results.
         excluded_types (list of str, optional): Types to exclude from the Wikidata search results.
         drop_nones (bool, optional): If True, rows without a Wikidata ID will be dropped.
         exclude_basic (bool, optional): If True, basic types will be excluded from the Wikidata search.
         overwrite (bool, optional): If False, code will check for the existence of a previous target file and keep it.
+        score_matches (bool, optional): If True, "match_score" and "match_status" columns are added with `score_curation_sheet`.
+        profile (bool or str, optional): If True, wall time, CPU time, peak memory and rows/sec are
+            recorded for each stage (see `wdcuration.profiling.StageProfiler`) and the report is returned.
+            If a path, the report is also written there, as JSON if it ends in ".json" and as CSV otherwise.
+        fingerprint_path (str, optional): A file keeping a fingerprint (see `fingerprint_rows`) and the
+            search results of each row. If set, rows whose id, name and description are unchanged since
+            the previous run (with the same search options) reuse the stored results instead of
+            being searched again. The file is created if missing and updated after each run.
+        columns (list of str, optional): If set, only these columns of the input are read and kept,
+            e.g. ["id", "name", "description"] (`wdcuration.sheet_io.CATALOG_COLUMNS`).
+        languages (list of str, optional): If set, names are searched in each of these languages
+            concurrently, and labels and descriptions are taken from the first language that has them
+            (see `async_search_wikidata`).
 
     Returns:
         None: The function outputs the curated spreadsheet to the specified file path.
+        If profile is set, a DataFrame with one row per stage is returned.
     """
     if not overwrite and os.path.isfile(output_file_path):
       print(f"Target file '{output_file_path}' already exists. Skipping generation.")
@@ -255,76 +443,312 @@ def generate_curation_spreadsheet(
     elif not isinstance(excluded_types, list):
         raise TypeError("excluded_types must be a list")
 
-    not_on_wikidata = get_subset_not_on_wikidata(
-        identifiers_property, curation_table_path, description_term_lookup
-    )
+    profiler = StageProfiler(enabled=bool(profile))
+    try:
+        not_on_wikidata = get_subset_not_on_wikidata(
+            identifiers_property,
+            curation_table_path,
+            description_term_lookup,
+            profiler=profiler,
+            columns=columns,
+        )
 
-    p = inflect.engine()
-    search_terms_dict = {}
-    search_terms = []
-    for i, row in not_on_wikidata.iterrows():
-        search_term = p.singular_noun(row["name"])
-        if not search_term:
-            search_term = row["name"]
-        search_terms.append(search_term)
-        search_terms_dict[row["name"]] = search_term
-
-    n_per_batch = 25
-    list_of_search_lists = list(
-        divide_in_chunks_of_equal_len(search_terms, n_per_batch)
-    )
+        previous_results = None
+        to_search = not_on_wikidata
+        if fingerprint_path is not None:
+            with profiler.stage("fingerprints", rows=len(not_on_wikidata)):
+                search_options = [sorted(excluded_types), fixed_type, exclude_basic]
+                if languages is not None:
+                    search_options.append(list(languages))
+                fingerprints = fingerprint_rows(not_on_wikidata, search_options)
+                previous_results = _read_fingerprints(fingerprint_path)
+                reused = fingerprints.isin(previous_results.index).to_numpy()
+                to_search = not_on_wikidata[~reused]
+            print(f"Reusing stored results for {reused.sum()} unchanged rows")
+
+        with profiler.stage("normalization", rows=len(to_search)):
+            p = inflect.engine()
+            search_terms_dict = {}
+            search_terms = []
+            for i, row in to_search.iterrows():
+                search_term = p.singular_noun(row["name"])
+                if not search_term:
+                    search_term = row["name"]
+                search_terms.append(search_term)
+                search_terms_dict[row["name"]] = search_term
+
+        n_per_batch = 25
+        list_of_search_lists = list(
+            divide_in_chunks_of_equal_len(search_terms, n_per_batch)
+        )
 
-    results = {}
+        results = SearchResults()
+
+        print(f"Running {str(len(search_terms))} searches in batches of {n_per_batch}")
+        with profiler.stage("searches", rows=len(search_terms)):
+            for group_of_search_terms in tqdm(
+                list_of_search_lists, total=len(list(list_of_search_lists))
+            ):
+                results_now = asyncio.run(
+                    run_multiple_searches(
+                        group_of_search_terms,
+                        fixed_type=fixed_type,
+                        excluded_types=excluded_types,
+                        exclude_basic=exclude_basic,
+                        languages=languages,
+                    )
+                )
+                results.update(results_now)
 
-    print(f"Running {str(len(search_terms))} searches in batches of {n_per_batch}")
-    for group_of_search_terms in tqdm(
-        list_of_search_lists, total=len(list(list_of_search_lists))
-    ):
-        loop = asyncio.get_event_loop()
-        future = asyncio.ensure_future(
-            run_multiple_searches(
-                group_of_search_terms,
-                fixed_type=fixed_type,
-                excluded_types=excluded_types,
-                exclude_basic=exclude_basic,
+        with profiler.stage("column_mapping", rows=len(not_on_wikidata)):
+            not_on_wikidata = results.join(
+                not_on_wikidata.assign(
+                    search_term=not_on_wikidata["name"].map(search_terms_dict)
+                )
             )
+            if previous_results is not None:
+                stored = previous_results.reindex(fingerprints.to_numpy())
+                for column in SEARCH_RESULT_COLUMNS:
+                    merged = (
+                        not_on_wikidata[column]
+                        .astype(object)
+                        .where(~reused, stored[column].to_numpy())
+                    )
+                    if isinstance(not_on_wikidata[column].dtype, pd.CategoricalDtype):
+                        merged = merged.astype("category")
+                    not_on_wikidata[column] = merged
+                _write_fingerprints(fingerprint_path, fingerprints, not_on_wikidata)
+
+        with profiler.stage("dedup", rows=len(not_on_wikidata)):
+            if drop_nones:
+                not_on_wikidata = not_on_wikidata[
+                    not_on_wikidata["wikidata_id"] != "NONE"
+                ]
+            not_on_wikidata = not_on_wikidata.drop_duplicates()
+        if score_matches:
+            with profiler.stage("scoring", rows=len(not_on_wikidata)):
+                not_on_wikidata = score_curation_sheet(
+                    not_on_wikidata, expected_types=[fixed_type] if fixed_type else None
+                )
+        with profiler.stage("write", rows=len(not_on_wikidata)):
+            write_sheet(not_on_wikidata, output_file_path)
+    finally:
+        profiler.close()
+    if not profile:
+        return
+    if profile is not True:
+        profiler.save(profile)
+    return profiler.report()
+
+
+def fingerprint_rows(df, search_options=None):
+    """
+    Returns a 64-bit fingerprint of the "id", "name" and "description" columns of each row,
+    computed with `pandas.util.hash_pandas_object`.
+
+    Args:
+        df (pandas.DataFrame): A Mix'n'match-like spreadsheet.
+        search_options (list, optional): Options of the search, hashed with each row, so that
+            fingerprints change when the options change.
+
+    Returns:
+        pandas.Series: The fingerprints (uint64), with the index of df.
+    """
+    columns = [c for c in ["id", "name", "description"] if c in df.columns]
+    hashed = df[columns].astype(str)
+    if search_options is not None:
+        hashed = hashed.assign(search_options=json.dumps(search_options))
+    return pd.util.hash_pandas_object(hashed, index=False).set_axis(df.index)
+
+
+def _read_fingerprints(path):
+    columns = ["fingerprint", *SEARCH_RESULT_COLUMNS]
+    if not os.path.isfile(path):
+        return pd.DataFrame(columns=columns).set_index("fingerprint")
+    stored = pd.read_csv(path, dtype=str, keep_default_na=False)
+    stored["fingerprint"] = stored["fingerprint"].astype("uint64")
+    return stored.set_index("fingerprint")[SEARCH_RESULT_COLUMNS]
+
+
+def _write_fingerprints(path, fingerprints, df):
+    stored = df[SEARCH_RESULT_COLUMNS].assign(fingerprint=fingerprints)
+    stored = stored.drop_duplicates(subset="fingerprint")
+    stored[["fingerprint", *SEARCH_RESULT_COLUMNS]].to_csv(path, index=False)
+
+
+def get_subset_not_on_wikidata(
+    identifiers_property,
+    curation_table_path,
+    description_term_lookup,
+    profiler=None,
+    columns=None,
+):
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    with profiler.stage("existing_ids") as stage:
+        terms_on_wikidata = get_wikidata_items_for_id(identifiers_property)
+        stage.rows = len(terms_on_wikidata)
+    with profiler.stage("load_and_filter") as stage:
+        full_df = read_sheet(curation_table_path, columns=columns, skip_bad_lines=True)
+        stage.rows = len(full_df)
+        if description_term_lookup != "":
+          full_df = full_df.dropna(subset=["description"])
+          df_subset = full_df.query(
+              f"description.str.contains('{description_term_lookup}')",
+              engine="python",
+          )
+        else:
+            df_subset = full_df
+        df_subset["id"] = [a.strip() for a in df_subset["id"]]
+        not_on_wikidata = df_subset[~df_subset.id.isin(terms_on_wikidata.keys())]
+    return not_on_wikidata
+
+
+def score_curation_sheet(
+    df,
+    accept_threshold: float = 0.9,
+    review_threshold: float = 0.6,
+    expected_description_terms: List[str] = None,
+    expected_types: List[str] = None,
+):
+    """
+    Scores the matches of a curation sheet, over the whole DataFrame at once.
+
+    The score is the trigram similarity (Dice coefficient) between the normalized
+    "search_term" (or "name") and "wikidata_label", or any of the "|"-separated
+    "wikidata_aliases" if that column is present. Type-consistency signals then
+    adjust it: a bonus if "wikidata_description" contains one of the expected
+    description terms or if the "|"-separated "wikidata_types" contain one of the
+    expected types, and a penalty if they contain a type in BASIC_EXCLUSION.
+
+    Args:
+        df (pandas.DataFrame): A curation sheet, as written by `generate_curation_spreadsheet`.
+        accept_threshold (float, optional): The minimum score for automatic acceptance.
+        review_threshold (float, optional): The minimum score for manual review. Lower scores are rejected.
+        expected_description_terms (list of str, optional): Terms expected in the descriptions of good matches.
+        expected_types (list of str, optional): P31 values expected for good matches.
+
+    Returns:
+        pandas.DataFrame: The sheet with "match_score" and "match_status"
+        ("accept", "review" or "reject") columns added.
+    """
+    df = df.copy()
+    query_column = "search_term" if "search_term" in df.columns else "name"
+    queries = _normalize_series(df[query_column])
+    similarity = _dice_similarity(queries, _normalize_series(df["wikidata_label"]))
+
+    if "wikidata_aliases" in df.columns:
+        aliases = df["wikidata_aliases"].fillna("").astype(str).str.split("|").explode()
+        aliases = aliases[aliases != ""]
+        if len(aliases) > 0:
+            alias_similarity = _dice_similarity(
+                queries.loc[aliases.index], _normalize_series(aliases)
+            )
+            alias_similarity = alias_similarity.groupby(level=0).max()
+            similarity = np.maximum(
+                similarity, alias_similarity.reindex(df.index, fill_value=0.0)
+            )
+
+    score = similarity.copy()
+    if expected_description_terms and "wikidata_description" in df.columns:
+        in_description = (
+            df["wikidata_description"]
+            .astype(object)
+            .fillna("")
+            .astype(str)
+            .str.contains("|".join(map(re.escape, expected_description_terms)), case=False)
+        )
+        score += 0.1 * in_description
+    if "wikidata_types" in df.columns:
+        types = "|" + df["wikidata_types"].fillna("").astype(str) + "|"
+        if expected_types:
+            score += 0.1 * types.str.contains(
+                "|".join(re.escape(f"|{t}|") for t in expected_types)
+            )
+        score -= 0.5 * types.str.contains(
+            "|".join(re.escape(f"|{t}|") for t in BASIC_EXCLUSION)
         )
-        results_now = loop.run_until_complete(future)
-        results.update(results_now)
-        time.sleep(1)
 
-    not_on_wikidata["search_term"] = not_on_wikidata["name"].map(search_terms_dict)
-    not_on_wikidata["wikidata_id"] = not_on_wikidata["search_term"].map(
-        {k: v["id"] for k, v in results.items()}
+    score = score.clip(0, 1).where(df["wikidata_id"].astype(str) != "NONE", 0.0)
+    df["match_score"] = score.round(4)
+    df["match_status"] = np.select(
+        [score >= accept_threshold, score >= review_threshold],
+        ["accept", "review"],
+        default="reject",
     )
-    not_on_wikidata["wikidata_label"] = not_on_wikidata["search_term"].map(
-        {k: v["label"] for k, v in results.items()}
+    return df
+
+
+def _normalize_series(series):
+    """Applies `wdcuration.utils.normalize_label` to a Series, once per unique value."""
+    codes, uniques = pd.factorize(series.astype(object).fillna("").astype(str))
+    normalized = np.array([normalize_label(value) for value in uniques], dtype=object)
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+
+def _dice_similarity(left, right):
+    """
+    Trigram Dice similarity between two aligned Series of normalized strings.
+
+    Each distinct (left, right) pair is scored once. Trigrams are encoded as
+    integer (pair, trigram) keys, so the intersections for all pairs are
+    computed with a single numpy set operation.
+    """
+    left_codes, left_uniques = pd.factorize(left.to_numpy())
+    right_codes, right_uniques = pd.factorize(right.to_numpy())
+    pair_codes, pairs = pd.factorize(
+        left_codes.astype(np.int64) * len(right_uniques) + right_codes
     )
-    not_on_wikidata["wikidata_description"] = not_on_wikidata["search_term"].map(
-        {k: v["description"] for k, v in results.items()}
+    n_pairs = len(pairs)
+    left_rows, left_grams = _trigram_codes(left_uniques[pairs // len(right_uniques)])
+    right_rows, right_grams = _trigram_codes(right_uniques[pairs % len(right_uniques)])
+    codes, uniques = pd.factorize(np.concatenate([left_grams, right_grams]))
+    n_grams = max(len(uniques), 1)
+    left_keys = _sorted_unique(left_rows * n_grams + codes[: len(left_grams)])
+    right_keys = _sorted_unique(right_rows * n_grams + codes[len(left_grams) :])
+    shared_keys = np.intersect1d(left_keys, right_keys, assume_unique=True)
+
+    shared = np.bincount(shared_keys // n_grams, minlength=n_pairs)
+    left_counts = np.bincount(left_keys // n_grams, minlength=n_pairs)
+    right_counts = np.bincount(right_keys // n_grams, minlength=n_pairs)
+    total = left_counts + right_counts
+    similarity = np.divide(
+        2 * shared, total, out=np.zeros(n_pairs, dtype=float), where=total > 0
     )
+    return pd.Series(similarity[pair_codes], index=left.index)
 
-    if drop_nones:
-        not_on_wikidata = not_on_wikidata[not_on_wikidata["wikidata_id"] != "NONE"]
-    not_on_wikidata = not_on_wikidata.drop_duplicates()
-    not_on_wikidata.to_csv(output_file_path, index=False)
 
+def _sorted_unique(keys):
+    keys = np.sort(keys)
+    keep = np.ones(len(keys), dtype=bool)
+    keep[1:] = keys[1:] != keys[:-1]
+    return keys[keep]
 
-def get_subset_not_on_wikidata(
-    identifiers_property, curation_table_path, description_term_lookup
-):
-    terms_on_wikidata = get_wikidata_items_for_id(identifiers_property)
-    full_df = pd.read_csv(
-        curation_table_path, on_bad_lines="skip", dtype={"id": object}
-    )
-    if description_term_lookup != "":
-      full_df = full_df.dropna(subset=["description"])
-      df_subset = full_df.query(
-          f"description.str.contains('{description_term_lookup}')",
-          engine="python",
-      )
-    else:
-        df_subset = full_df
-    df_subset["id"] = [a.strip() for a in df_subset["id"]]
-    not_on_wikidata = df_subset[~df_subset.id.isin(terms_on_wikidata.keys())]
-    return not_on_wikidata
+
+def _trigram_codes(strings, rows_per_block=100000):
+    """
+    Returns the (row, trigram) pairs of padded strings, with trigrams encoded as
+    integers built from their three code points.
+    """
+    strings = np.asarray(strings, dtype=object)
+    all_rows = []
+    all_grams = []
+    for block_start in range(0, len(strings), rows_per_block):
+        block = strings[block_start : block_start + rows_per_block]
+        padded = np.array(["  " + text + " " for text in block], dtype=str)
+        width = padded.dtype.itemsize // 4
+        code_points = padded.view(np.uint32).reshape(len(padded), width)
+        code_points = code_points.astype(np.int64)
+        lengths = np.char.str_len(padded)
+        grams = (
+            (code_points[:, :-2] << 42)
+            | (code_points[:, 1:-1] << 21)
+            | code_points[:, 2:]
+        )
+        present = np.arange(width - 2)[None, :] < (lengths - 2)[:, None]
+        rows, _ = np.nonzero(present)
+        all_rows.append(rows + block_start)
+        all_grams.append(grams[present])
+    if not all_rows:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    return np.concatenate(all_rows).astype(np.int64), np.concatenate(all_grams)
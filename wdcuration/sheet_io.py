@@ -0,0 +1,110 @@
+"""Reading and writing curation sheets as CSV, Parquet or Arrow IPC (Feather)"""
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    from pyarrow import csv as pyarrow_csv
+except ImportError:
+    pyarrow = None
+
+PARQUET_SUFFIXES = {".parquet", ".pq"}
+FEATHER_SUFFIXES = {".feather", ".arrow", ".ipc"}
+CATALOG_COLUMNS = ["id", "name", "description"]
+
+
+def read_sheet(path, columns=None, skip_bad_lines=False):
+    """
+    Reads a curation sheet or catalog, with the format chosen by the file suffix.
+
+    Parquet and Arrow IPC (Feather) files need pyarrow (`pip install wdcuration[arrow]`).
+    CSV files are read with the multithreaded pyarrow reader when pyarrow is installed,
+    and with pandas otherwise. The "id" column is always read as text.
+
+    Args:
+      path (str): The path to a .csv, .tsv, .parquet or .feather/.arrow file.
+      columns (list): If set, only these columns are read, e.g. CATALOG_COLUMNS.
+        Columns missing from the file are ignored.
+      skip_bad_lines (bool): Whether to skip malformed CSV lines instead of raising.
+
+    Returns:
+      pandas.DataFrame: The sheet.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES or suffix in FEATHER_SUFFIXES:
+        _require_pyarrow(suffix)
+        if columns is not None:
+            schema_names = (
+                pyarrow.parquet.read_schema(path).names
+                if suffix in PARQUET_SUFFIXES
+                else pyarrow.ipc.open_file(path).schema.names
+            )
+            columns = [c for c in columns if c in schema_names]
+        if suffix in PARQUET_SUFFIXES:
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_feather(path, columns=columns)
+        if "id" in df.columns:
+            df["id"] = df["id"].astype(str)
+        return df
+
+    delimiter = "\t" if suffix == ".tsv" else ","
+    if pyarrow is None:
+        return pd.read_csv(
+            path,
+            sep=delimiter,
+            usecols=(lambda c: c in columns) if columns is not None else None,
+            dtype={"id": object},
+            on_bad_lines="skip" if skip_bad_lines else "error",
+        )
+
+    # Catalog descriptions often hold quoted line breaks.
+    parse_options = pyarrow_csv.ParseOptions(
+        delimiter=delimiter,
+        newlines_in_values=True,
+        invalid_row_handler=(lambda row: "skip") if skip_bad_lines else None,
+    )
+    if columns is not None:
+        header = pyarrow_csv.open_csv(path, parse_options=parse_options).schema.names
+        columns = [c for c in columns if c in header]
+    convert_options = pyarrow_csv.ConvertOptions(
+        include_columns=columns,
+        column_types={"id": pyarrow.string()},
+        strings_can_be_null=True,
+    )
+    table = pyarrow_csv.read_csv(
+        path,
+        read_options=pyarrow_csv.ReadOptions(use_threads=True),
+        parse_options=parse_options,
+        convert_options=convert_options,
+    )
+    return table.to_pandas()
+
+
+def write_sheet(df, path):
+    """
+    Writes a curation sheet, with the format chosen by the file suffix
+    (.parquet, .feather/.arrow or CSV otherwise), without the index.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        _require_pyarrow(suffix)
+        df.to_parquet(path, index=False)
+    elif suffix in FEATHER_SUFFIXES:
+        _require_pyarrow(suffix)
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False, sep="\t" if suffix == ".tsv" else ",")
+
+
+def _require_pyarrow(suffix):
+    if pyarrow is None:
+        raise ImportError(
+            f"Reading and writing {suffix} files requires pyarrow. "
+            "Install it with `pip install wdcuration[arrow]`."
+        )
@@ -1,21 +1,86 @@
 """Wikidata lookups via SPARQL"""
-from time import sleep
+import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from urllib.parse import quote
 
-from SPARQLWrapper import JSON, SPARQLWrapper
+import pandas as pd
 from tqdm import tqdm
 
-from wdcuration.utils import chunk
+from wdcuration.cache import get_entities, get_entity_cache
+from wdcuration.instrumentation import emit_cache_hit, has_request_hooks
+from wdcuration.scheduler import get_scheduler
+from wdcuration.utils import chunk, json_loads, truthy_values
+
+ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+XSD_PREFIX = "http://www.w3.org/2001/XMLSchema#"
+WIKIDATA_SPARQL_ENDPOINT = "https://query.wikidata.org/sparql"
+INTEGER_DATATYPES = {
+    XSD_PREFIX + datatype
+    for datatype in [
+        "integer",
+        "int",
+        "long",
+        "short",
+        "byte",
+        "nonNegativeInteger",
+        "positiveInteger",
+        "negativeInteger",
+        "nonPositiveInteger",
+    ]
+}
+FLOAT_DATATYPES = {XSD_PREFIX + datatype for datatype in ["decimal", "double", "float"]}
+DATETIME_DATATYPES = {XSD_PREFIX + datatype for datatype in ["dateTime", "date"]}
+
+# Queries longer than this (URL-encoded) are sent as POST bodies instead of GET URLs.
+POST_QUERY_LENGTH = 2000
+VALUES_CHUNK_SIZE = 1000
+
+# In-memory LRU cache of (QID, language) -> label used by lookup_labels.
+LABEL_CACHE_SIZE = 100000
+_label_cache = OrderedDict()
+_label_cache_lock = Lock()
+
+# Backend for identifier lookups; None means the Wikidata Query Service.
+_default_backend = None
+
+
+def set_default_backend(backend):
+    """
+    Sets the backend used by `lookup_id`, `lookup_multiple_ids` and `get_wikidata_items_for_id`.
+
+    Args:
+      backend: A local index, such as `wdcuration.local_index.IdentifierIndex`,
+        or None to go back to the Wikidata Query Service.
+    """
+    global _default_backend
+    _default_backend = backend
+
 
+def _resolve_backend(backend):
+    if backend is None:
+        return _default_backend
+    if backend == "wdqs":
+        return None
+    return backend
 
-def get_wikidata_items_for_id(identifier_property):
+
+def get_wikidata_items_for_id(identifier_property, backend=None):
     """
     Returns and ID:QID dictionary for all occurences of a certain identifier on Wikidata.
     Might time-out for heavily used identifiers.
 
     Args:
       identifier_property (str): The identifier property to be used on Wikidata. E.g. "P7963".
+      backend: A local index to use instead of the default backend, or "wdqs" to force
+        the Wikidata Query Service. Defaults to the one set with `set_default_backend`.
     """
-    existing_terms_output = query_wikidata(
+    local_backend = _resolve_backend(backend)
+    if local_backend is not None:
+        return local_backend.items_for_property(identifier_property)
+
+    existing_terms_output = iter_query_wikidata(
         f'  SELECT DISTINCT ?id   (REPLACE(STR(?item), ".*Q", "Q") AS ?qid)  WHERE {{ ?item wdt:{identifier_property} ?id . }} '
     )
 
@@ -26,19 +91,66 @@ def get_wikidata_items_for_id(identifier_property):
     return existing_terms_dict
 
 
-def detect_direct_links(list_of_qids, link_phrase="wdt:P279*"):
+def detect_direct_links(
+    list_of_qids,
+    link_phrase="wdt:P279*",
+    block_size=250,
+    max_workers=4,
+):
     """Detects and returns pairs from a list of Wikidata QIDs
     with links to each other.
     The base link if "wdt:P279*" which covers indirect and direct subclasses (P279*).
 
+    Lists longer than block_size are split into blocks, and one query is run for each
+    pair of blocks, so the server never has to evaluate the full cross product at once.
+    Block-pair queries run in parallel and the resulting pairs are deduplicated.
+
     Args:
       list_of_qids (list): A list of Wikidata QIDs.
       link_phrase (str): The link to be searched between the entities. Defaults to "wdt:P279*"
+      block_size (int): The maximum number of QIDs in each VALUES block. Defaults to 250.
+      max_workers (int): The number of block-pair queries running at the same time. Defaults to 4.
+
+    Returns:
+      list: A list of {"a": QID, "b": QID} dicts, one for each linked pair.
     """
     clean_list = [x for x in list_of_qids if str(x) != "nan"]
 
-    formatted_qids = "{ wd:" + " wd:".join(clean_list) + "}"
-    query = f"""
+    if len(clean_list) <= block_size:
+        return query_wikidata(_direct_links_query(clean_list, clean_list, link_phrase))
+
+    blocks = chunk(clean_list, block_size)
+    queries = [
+        _direct_links_query(block_a, block_b, link_phrase)
+        for block_a in blocks
+        for block_b in blocks
+    ]
+    links = []
+    seen_pairs = set()
+    for result in _run_queries_in_parallel(queries, max_workers):
+        for link in result:
+            pair = (link["a"], link["b"])
+            if pair not in seen_pairs:
+                seen_pairs.add(pair)
+                links.append(link)
+    return links
+
+
+def _run_queries_in_parallel(queries, max_workers):
+    """
+    Runs queries on a thread pool, yielding results as they complete.
+    The request scheduler paces the queries.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(query_wikidata, query) for query in queries]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            yield future.result()
+
+
+def _direct_links_query(qids_a, qids_b, link_phrase):
+    formatted_qids_a = "{ wd:" + " wd:".join(qids_a) + "}"
+    formatted_qids_b = "{ wd:" + " wd:".join(qids_b) + "}"
+    return f"""
   SELECT
     (REPLACE(STR(?a_), ".*Q", "Q") AS ?a)
     (REPLACE(STR(?b_), ".*Q", "Q") AS ?b)
@@ -46,43 +158,129 @@ def detect_direct_links(list_of_qids, link_phrase="wdt:P279*"):
   WHERE
 {{
 
-  VALUES ?a_ {formatted_qids} .
-  VALUES ?b_ {formatted_qids} .
+  VALUES ?a_ {formatted_qids_a} .
+  VALUES ?b_ {formatted_qids_b} .
   FILTER (?a_ != ?b_)
   ?a_ {link_phrase}?b_ .
   }}"""
-    return query_wikidata(query)
 
 
 def lookup_label(qid, lang="en", default=""):
     """
-    Looks up a label on Wikidata given a QID.
+    Looks up a label on Wikidata given a QID (e.g. "Q5" or "wd:Q5").
+    Uses the entity cache when one is set with `wdcuration.cache.set_entity_cache`,
+    and the in-memory label cache of `lookup_labels` otherwise.
     """
+    entity_id = qid.split(":")[-1].split("/")[-1]
+    if get_entity_cache() is not None:
+        entity = get_entities([entity_id], ["labels"], [lang]).get(entity_id, {})
+        return entity.get("labels", {}).get(lang, {}).get("value", default)
 
-    sparql = SPARQLWrapper(
-        "https://query.wikidata.org/sparql",
-        agent="wdcuration (https://github.com/lubianat/wdcuration)",
-    )
-    query = f"""
-    SELECT ?item ?itemLabel
-    WHERE
-    {{
-        {qid} rdfs:label ?itemLabel.
-        FILTER (LANG (?itemLabel) = "{lang}")
-    }}
+    return lookup_labels([entity_id], lang, default=default)[entity_id]
+
+
+def lookup_labels(
+    list_of_qids,
+    langs="en",
+    fallback_chain=None,
+    default="",
+    chunk_size=VALUES_CHUNK_SIZE,
+):
     """
-    bindings = query_wikidata(query)
-    if len(bindings) == 1:
-        item = bindings[0]["itemLabel"].split("/")[-1]
-        return item
-    else:
-        return default
+    Looks up the labels of many Wikidata QIDs with batched queries.
+
+    Labels are kept in an in-memory LRU cache of LABEL_CACHE_SIZE entries,
+    so only QIDs not seen recently are queried.
+
+    Args:
+      list_of_qids (list): A list of Wikidata QIDs.
+      langs (str or list): The language of the labels, or a list of languages.
+      fallback_chain (list): Languages to try, in order, when there is no label
+        in the requested language. E.g. ["mul", "en"].
+      default (str): The label for items without a label in any of the languages. Defaults to "".
+      chunk_size (int): The number of QIDs per query.
+
+    Returns:
+      dict: A QID:label dictionary if langs is a string, or a QID:{language:label}
+        dictionary if it is a list.
+    """
+    single_language = isinstance(langs, str)
+    if single_language:
+        langs = [langs]
+    languages = list(dict.fromkeys([*langs, *(fallback_chain or [])]))
+    qids = list(dict.fromkeys(list_of_qids))
+
+    # The result is built from this dict, as the LRU cache may evict entries
+    # of this call before it ends.
+    known = {}
+    to_query = []
+    with _label_cache_lock:
+        for qid in qids:
+            if any((qid, language) not in _label_cache for language in languages):
+                to_query.append(qid)
+            else:
+                for language in languages:
+                    known[(qid, language)] = _label_cache_get((qid, language))
+    if has_request_hooks():
+        for _ in range(len(qids) - len(to_query)):
+            emit_cache_hit(WIKIDATA_SPARQL_ENDPOINT)
+    formatted_languages = ", ".join(f'"{language}"' for language in languages)
+    for qids_chunk in chunk(to_query, chunk_size):
+        query = f"""
+  SELECT
+  (REPLACE(STR(?item), ".*Q", "Q") AS ?qid)
+  ?label (LANG(?label) AS ?lang)
+  WHERE {{
+    VALUES ?item {format_with_prefix(qids_chunk)} .
+    ?item rdfs:label ?label .
+    FILTER (LANG (?label) IN ({formatted_languages}))
+  }}"""
+        found = {
+            (entry["qid"], entry["lang"]): entry["label"]
+            for entry in query_wikidata(query)
+        }
+        with _label_cache_lock:
+            for qid in qids_chunk:
+                for language in languages:
+                    label = found.get((qid, language))
+                    known[(qid, language)] = label
+                    _label_cache_put((qid, language), label)
+
+    result = {}
+    for qid in qids:
+        labels = {}
+        for language in langs:
+            label = known[(qid, language)]
+            for fallback_language in fallback_chain or []:
+                if label is not None:
+                    break
+                label = known[(qid, fallback_language)]
+            labels[language] = default if label is None else label
+        result[qid] = labels[langs[0]] if single_language else labels
+    return result
+
+
+def _label_cache_get(key):
+    label = _label_cache.get(key)
+    if key in _label_cache:
+        _label_cache.move_to_end(key)
+    return label
+
+
+def _label_cache_put(key, label):
+    _label_cache[key] = label
+    _label_cache.move_to_end(key)
+    while len(_label_cache) > LABEL_CACHE_SIZE:
+        _label_cache.popitem(last=False)
 
 
 def get_statement_values(qid, property, label=False):
     """
     Return the values for a Wikidata QID + PID pair as a Python list.
+    Uses the claims in the entity cache when one is set with `wdcuration.cache.set_entity_cache`.
     """
+    if get_entity_cache() is not None:
+        return _statement_values_from_cache(qid, property, label)
 
     if label:
         label_projection = "?valueLabel"
@@ -117,20 +315,164 @@ def get_statement_values(qid, property, label=False):
     return value_list
 
 
+def get_statement_values_for_multiple_qids(
+    list_of_qids,
+    properties,
+    label=False,
+    return_type="dict",
+    chunk_size=VALUES_CHUNK_SIZE,
+    max_workers=4,
+):
+    """
+    Returns the values for many Wikidata QIDs and PIDs, with a few batched queries.
+
+    Replaces loops over `get_statement_values`: QIDs are split in chunks of
+    chunk_size, and the queries for the chunks run in parallel.
+
+    Args:
+      list_of_qids (list): A list of Wikidata QIDs.
+      properties (list): A list of PIDs, e.g. ["P31", "P279"].
+      label (bool): Whether to also return the English labels of the values.
+        Values without an English label get an empty label.
+      return_type (str): "dict" for a nested {QID: {PID: [values]}} dictionary, with
+        values as in `get_statement_values`, or "dataframe" for a table with the
+        columns qid, property, value (and value_label). Defaults to "dict".
+      chunk_size (int): The number of QIDs per query.
+      max_workers (int): The number of queries running at the same time. Defaults to 4.
+    """
+    clean_list = list(dict.fromkeys(x for x in list_of_qids if str(x) != "nan"))
+    formatted_properties = "{ " + " ".join(f"wdt:{p}" for p in properties) + " }"
+    if label:
+        label_projection = "?valueLabel"
+        label_line = "OPTIONAL { ?value rdfs:label ?valueLabel . FILTER (LANG (?valueLabel) = 'en') }"
+    else:
+        label_projection = ""
+        label_line = ""
+
+    queries = [f"""
+  SELECT
+  (REPLACE(STR(?item), ".*Q", "Q") AS ?qid)
+  (REPLACE(STR(?p), ".*/", "") AS ?property)
+  ?value {label_projection}
+  WHERE {{
+    VALUES ?item {format_with_prefix(qids)} .
+    VALUES ?p {formatted_properties} .
+    ?item ?p ?value .
+    {label_line}
+  }}""" for qids in chunk(clean_list, chunk_size)]
+    rows = []
+    for result in _run_queries_in_parallel(queries, max_workers):
+        rows.extend(result)
+
+    if return_type == "dataframe":
+        columns = ["qid", "property", "value"]
+        if label:
+            columns.append("value_label")
+        return pd.DataFrame(
+            [
+                [row["qid"], row["property"], row["value"]]
+                + ([row.get("valueLabel", "")] if label else [])
+                for row in rows
+            ],
+            columns=columns,
+        )
+
+    result_dict = {qid: {p: [] for p in properties} for qid in clean_list}
+    for row in rows:
+        if label:
+            value = {
+                "id": row["value"].split("/")[-1],
+                "label": row.get("valueLabel", ""),
+            }
+        else:
+            value = row["value"]
+        result_dict[row["qid"]][row["property"]].append(value)
+    return result_dict
+
+
+def _statement_values_from_cache(qid, property, label):
+    entity = get_entities([qid], ["claims"], []).get(qid, {})
+    values = [
+        _datavalue_to_sparql(datavalue)
+        for datavalue in truthy_values(entity, property, datavalues=True)
+    ]
+    if not label:
+        return values
+
+    value_ids = [value.split("/")[-1] for value in values]
+    value_entities = get_entities(value_ids, ["labels"], ["en"])
+    value_list = []
+    for value_id in value_ids:
+        value_labels = value_entities.get(value_id, {}).get("labels", {})
+        if "en" in value_labels:
+            value_list.append({"id": value_id, "label": value_labels["en"]["value"]})
+    return value_list
+
+
+def _datavalue_to_sparql(datavalue):
+    """Converts a datavalue from entity JSON to the plain value returned by SPARQL."""
+    value = datavalue["value"]
+    if datavalue["type"] == "wikibase-entityid":
+        return ENTITY_PREFIX + value["id"]
+    if datavalue["type"] == "monolingualtext":
+        return value["text"]
+    if datavalue["type"] == "quantity":
+        return value["amount"].lstrip("+")
+    if datavalue["type"] == "time":
+        return value["time"].lstrip("+")
+    if datavalue["type"] == "globecoordinate":
+        return f"Point({value['longitude']} {value['latitude']})"
+    return str(value)
+
+
 def query_wikidata(
     query,
-    endpoint="https://query.wikidata.org/sparql",
+    endpoint=WIKIDATA_SPARQL_ENDPOINT,
     agent="wdcuration (https://github.com/lubianat/wdcuration)",
     simplify=True,
+    result_type="records",
+    result_format="json",
 ):
-    """A simple function to query Wikidata and return a python dictionary"""
-    sparql = SPARQLWrapper(endpoint=endpoint, agent=agent)
-    sparql.setQuery(query)
+    """A simple function to query Wikidata and return a python dictionary
+
+    Queries longer than POST_QUERY_LENGTH characters (URL-encoded) are sent via POST,
+    so large VALUES blocks do not hit URL length limits. Compressed responses are requested.
 
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
+    Args:
+      query (str): The SPARQL query.
+      endpoint (str): The SPARQL endpoint. Defaults to the Wikidata Query Service.
+      agent (str): The user agent sent to the endpoint.
+      simplify (bool): Whether to reduce each binding to its plain string value.
+        Only used for the "records" result type.
+      result_type (str): "records" for a list of dicts, "dataframe" for a typed
+        pandas DataFrame or "arrays" for a dict of numpy arrays. Defaults to "records".
+      result_format (str): The format requested from the endpoint for the
+        "dataframe" and "arrays" result types, either "json" or "csv".
+        CSV is faster to parse for large results, but datatypes are inferred
+        instead of read from the response. Defaults to "json".
+    """
+    if result_type not in ["records", "dataframe", "arrays"]:
+        raise ValueError(f"Unknown result_type: {result_type}")
+    if result_format not in ["json", "csv"]:
+        raise ValueError(f"Unknown result_format: {result_format}")
+
+    if result_type != "records" and result_format == "csv":
+        response = _sparql_request(query, endpoint, agent, accept="text/csv")
+        response.raise_for_status()
+        df = parse_csv_result(response.content)
+        return _dataframe_to_result_type(df, result_type)
+
+    response = _sparql_request(
+        query, endpoint, agent, accept="application/sparql-results+json"
+    )
+    response.raise_for_status()
+    results = json_loads(response.content)
     bindings = results["results"]["bindings"]
 
+    if result_type != "records":
+        df = parse_json_result(results["head"]["vars"], bindings)
+        return _dataframe_to_result_type(df, result_type)
+
     if simplify:
         return_value = []
 
@@ -144,7 +486,204 @@ def query_wikidata(
         return bindings
 
 
-def lookup_id(id, property, default="") -> str:
+def iter_query_wikidata(
+    query,
+    endpoint=WIKIDATA_SPARQL_ENDPOINT,
+    agent="wdcuration (https://github.com/lubianat/wdcuration)",
+    batch_size=None,
+):
+    """
+    Queries Wikidata and yields results as they arrive, without loading the full response.
+
+    The response is requested as tab-separated values and parsed line by line,
+    so memory use does not grow with the size of the result set.
+    Rows have the same shape as the ones from `query_wikidata` with simplify=True.
+
+    Args:
+      query (str): The SPARQL query.
+      endpoint (str): The SPARQL endpoint. Defaults to the Wikidata Query Service.
+      agent (str): The user agent sent to the endpoint.
+      batch_size (int): If set, yields tuples of up to batch_size rows instead of single rows.
+    """
+    response = _sparql_request(
+        query, endpoint, agent, accept="text/tab-separated-values", stream=True
+    )
+    with response:
+        response.raise_for_status()
+        # iter_lines would also split on U+0085, U+2028 and other characters
+        # that can appear inside literals; TSV rows end only at "\n".
+        response.raw.decode_content = True
+        text = io.TextIOWrapper(response.raw, encoding="utf-8", newline="\n")
+        rows = parse_tsv_lines(line.rstrip("\n") for line in text)
+        if batch_size is None:
+            yield from rows
+        else:
+            yield from chunk(rows, batch_size, return_type=iter)
+
+
+def parse_tsv_lines(lines):
+    """
+    Parses lines of a SPARQL TSV response into simplified rows.
+
+    Args:
+      lines (iterable): The lines of the response, starting with the header.
+
+    Yields:
+      dict: A variable:value dictionary for each result. Unbound variables are left out.
+    """
+    lines = iter(lines)
+    header = next(lines, None)
+    if header is None:
+        return
+    variables = [variable.lstrip("?$") for variable in header.split("\t")]
+    for line in lines:
+        if line == "":
+            continue
+        row = {}
+        for variable, term in zip(variables, line.split("\t")):
+            if term != "":
+                row[variable] = parse_tsv_term(term)
+        yield row
+
+
+def parse_tsv_term(term):
+    """
+    Returns the plain value of an RDF term as encoded in SPARQL TSV results.
+
+    IRIs lose their angle brackets and literals lose their quotes, language tags and datatypes.
+    """
+    if term.startswith("<") and term.endswith(">"):
+        return term[1:-1]
+    if term.startswith('"'):
+        end = term.rindex('"')
+        return _unescape_tsv_literal(term[1:end])
+    return term
+
+
+def _unescape_tsv_literal(literal):
+    if "\\" not in literal:
+        return literal
+    escapes = {"t": "\t", "n": "\n", "r": "\r", '"': '"', "'": "'", "\\": "\\"}
+    characters = []
+    index = 0
+    while index < len(literal):
+        character = literal[index]
+        if character == "\\" and index + 1 < len(literal):
+            characters.append(escapes.get(literal[index + 1], literal[index + 1]))
+            index += 2
+        else:
+            characters.append(character)
+            index += 1
+    return "".join(characters)
+
+
+def _sparql_request(query, endpoint, agent, accept, stream=False):
+    headers = {
+        "Accept": accept,
+        "Accept-Encoding": "gzip, deflate",
+        "User-Agent": agent,
+    }
+    if len(quote(query)) > POST_QUERY_LENGTH:
+        return get_scheduler().request(
+            "POST", endpoint, data={"query": query}, headers=headers, stream=stream
+        )
+    return get_scheduler().request(
+        "GET", endpoint, params={"query": query}, headers=headers, stream=stream
+    )
+
+
+def parse_json_result(variables, bindings):
+    """
+    Decodes SPARQL JSON bindings into a pandas DataFrame with typed columns.
+
+    Integer and decimal literals become numeric columns, xsd:dateTime literals become
+    datetime64 columns and Wikidata entity IRIs are stripped to their QIDs.
+    Columns with mixed kinds are kept as strings.
+
+    Args:
+      variables (list): The variable names, as in the "head" of the response.
+      bindings (list): The bindings, as in the "results" of the response.
+
+    Returns:
+      pandas.DataFrame: One column per variable, one row per binding.
+    """
+    columns = {}
+    for variable in variables:
+        values = []
+        kinds = set()
+        for binding in bindings:
+            term = binding.get(variable)
+            if term is None:
+                values.append(None)
+                continue
+            values.append(term["value"])
+            kinds.add(_term_kind(term))
+        columns[variable] = _typed_column(values, kinds)
+    return pd.DataFrame(columns, columns=variables)
+
+
+def parse_csv_result(data):
+    """
+    Parses a SPARQL CSV response into a pandas DataFrame.
+
+    Numeric types are inferred by pandas, ISO 8601 timestamps are converted to
+    datetime64 and Wikidata entity IRIs are stripped to their QIDs.
+
+    Args:
+      data (bytes): The raw CSV response.
+
+    Returns:
+      pandas.DataFrame: One column per variable, one row per result.
+    """
+    df = pd.read_csv(io.BytesIO(data))
+    for column in df.columns:
+        values = df[column].dropna()
+        if len(values) == 0 or not pd.api.types.is_string_dtype(values):
+            continue
+        if values.str.startswith(ENTITY_PREFIX).all():
+            df[column] = df[column].str.slice(len(ENTITY_PREFIX))
+        elif values.str.fullmatch(r"-?\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z").all():
+            df[column] = pd.to_datetime(df[column], utc=True, errors="coerce")
+    return df
+
+
+def _term_kind(term):
+    if term["type"] == "uri":
+        if term["value"].startswith(ENTITY_PREFIX):
+            return "entity"
+        return "string"
+    datatype = term.get("datatype")
+    if datatype in INTEGER_DATATYPES:
+        return "integer"
+    if datatype in FLOAT_DATATYPES:
+        return "float"
+    if datatype in DATETIME_DATATYPES:
+        return "datetime"
+    return "string"
+
+
+def _typed_column(values, kinds):
+    if kinds == {"entity"}:
+        return pd.Series(
+            [None if v is None else v[len(ENTITY_PREFIX) :] for v in values],
+            dtype=object,
+        )
+    if kinds == {"integer"}:
+        return pd.Series(pd.to_numeric(values), dtype="Int64")
+    if kinds <= {"integer", "float"} and kinds:
+        return pd.Series(pd.to_numeric(values), dtype="float64")
+    if kinds == {"datetime"}:
+        return pd.Series(pd.to_datetime(values, utc=True, errors="coerce"))
+    return pd.Series(values, dtype=object)
+
+
+def _dataframe_to_result_type(df, result_type):
+    if result_type == "arrays":
+        return {column: df[column].to_numpy() for column in df.columns}
+    return df
+
+
+def lookup_id(id, property, default="", backend=None) -> str:
     """
     Looks up a foreign ID on Wikidata based on its specific property.
 
@@ -152,15 +691,19 @@ def lookup_id(id, property, default="") -> str:
       id (str): The value of the ID as encoded on Wikidata.
       property (str): The property used to link to that ID .
       default (str): What to return if no unique ID is present. Defaults to "".
+      backend: A local index to use instead of the default backend, or "wdqs" to force
+        the Wikidata Query Service. Defaults to the one set with `set_default_backend`.
 
     Returns:
       str: The Wikidata QID for the foreign ID or "".
     """
+    local_backend = _resolve_backend(backend)
+    if local_backend is not None:
+        qids = local_backend.lookup(property, [id]).get(id, [])
+        if len(qids) == 1:
+            return qids[0]
+        return default
 
-    sparql = SPARQLWrapper(
-        "https://query.wikidata.org/sparql",
-        agent="wdcuration (https://github.com/lubianat/wdcuration)",
-    )
     query = f"""
     SELECT ?item ?itemLabel
     WHERE
@@ -168,13 +711,9 @@ def lookup_id(id, property, default="") -> str:
         ?item wdt:{property} "{id}" .
     }}
     """
-    sparql.setQuery(query)
-
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    bindings = results["results"]["bindings"]
+    bindings = query_wikidata(query)
     if len(bindings) == 1:
-        item = bindings[0]["item"]["value"].split("/")[-1]
+        item = bindings[0]["item"].split("/")[-1]
         return item
     else:
         return default
@@ -185,17 +724,21 @@ def format_with_prefix(list_of_qids):
     return "{ " + " ".join(list_with_prefix) + " }"
 
 
-def lookup_value_for_multiple_qids(list_of_qids, wikidata_property, return_type="dict"):
+def lookup_value_for_multiple_qids(
+    list_of_qids, wikidata_property, return_type="dict", chunk_size=VALUES_CHUNK_SIZE
+):
     """
     Looks up multiple Wikidata QIDs on Wikidata and returns a dict containing them and the values for the property.
+    Lists longer than chunk_size are queried in chunks.
     """
-    if len(list_of_qids) > 200:
-        list_of_smaller_lists_of_qids = chunk(list_of_qids, 200)
+    if len(list_of_qids) > chunk_size:
+        list_of_smaller_lists_of_qids = chunk(list_of_qids, chunk_size)
         result_dict = {}
         for small_list in tqdm(list_of_smaller_lists_of_qids):
-            current_dict = lookup_value_for_multiple_qids(small_list, wikidata_property)
+            current_dict = lookup_value_for_multiple_qids(
+                small_list, wikidata_property, chunk_size=chunk_size
+            )
             result_dict.update(current_dict)
-            sleep(0.3)
 
         if return_type == "dict":
             return result_dict
@@ -225,17 +768,38 @@ def lookup_value_for_multiple_qids(list_of_qids, wikidata_property, return_type=
         return list(result_dict.values())
 
 
-def lookup_multiple_ids(list_of_ids, wikidata_property, return_type="dict"):
+def lookup_multiple_ids(
+    list_of_ids,
+    wikidata_property,
+    return_type="dict",
+    chunk_size=VALUES_CHUNK_SIZE,
+    backend=None,
+):
     """
     Looks up multiple IDs on Wikidata and returns a dict containing them and the QIDs.
+    Lists longer than chunk_size are queried in chunks.
+
+    A local index can be passed as backend (or set with `set_default_backend`);
+    "wdqs" forces the Wikidata Query Service.
+    IDs on several items are mapped to the first item found, with either backend.
     """
-    if len(list_of_ids) > 200:
-        list_of_smaller_lists_of_ids = chunk(list_of_ids, 200)
+    local_backend = _resolve_backend(backend)
+    if local_backend is not None:
+        matches = local_backend.lookup(wikidata_property, list_of_ids)
+        result_dict = {id: qids[0] for id, qids in matches.items()}
+        if return_type == "dict":
+            return result_dict
+        if return_type == "list":
+            return list(result_dict.values())
+
+    if len(list_of_ids) > chunk_size:
+        list_of_smaller_lists_of_ids = chunk(list_of_ids, chunk_size)
         result_dict = {}
         for small_list in tqdm(list_of_smaller_lists_of_ids):
-            current_dict = lookup_multiple_ids(small_list, wikidata_property)
+            current_dict = lookup_multiple_ids(
+                small_list, wikidata_property, chunk_size=chunk_size, backend="wdqs"
+            )
             result_dict.update(current_dict)
-            sleep(0.3)
 
         if return_type == "dict":
             return result_dict
@@ -257,7 +821,7 @@ def lookup_multiple_ids(list_of_ids, wikidata_property, return_type="dict"):
     query_result = query_wikidata(query)
     result_dict = {}
     for entry in query_result:
-        result_dict[entry["id"]] = entry["qid"]
+        result_dict.setdefault(entry["id"], entry["qid"])
     if return_type == "dict":
         return result_dict
     if return_type == "list":
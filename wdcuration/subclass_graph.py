@@ -0,0 +1,231 @@
+"""Local subclass graphs for fast reachability checks"""
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from wdcuration.sparql import VALUES_CHUNK_SIZE, format_with_prefix, query_wikidata
+from wdcuration.utils import chunk
+
+
+@dataclass
+class SubclassGraph:
+    """
+    A directed graph of Wikidata items stored as compressed sparse rows (CSR).
+
+    Edges point from an item to the values of the property, e.g. from a class to
+    its superclasses when built from P279. The out-edges of the node at position i
+    are indices[indptr[i]:indptr[i + 1]].
+
+    Attributes:
+      nodes: The QIDs in the graph, in the order used by the CSR arrays.
+      indptr: The row pointer array, with len(nodes) + 1 entries.
+      indices: The target node positions for all edges.
+      closure_indptr: The row pointer array of the precomputed transitive closure, if any.
+      closure_indices: The reachable node positions of the precomputed transitive closure, if any.
+    """
+
+    nodes: list
+    indptr: np.ndarray
+    indices: np.ndarray
+    closure_indptr: np.ndarray = None
+    closure_indices: np.ndarray = None
+    node_positions: dict = field(init=False, repr=False)
+    _reverse: tuple = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        self.nodes = list(self.nodes)
+        self.node_positions = {qid: i for i, qid in enumerate(self.nodes)}
+
+    @classmethod
+    def from_edges(cls, edges):
+        """
+        Builds a graph from (source, target) QID pairs.
+
+        Args:
+          edges (iterable): Pairs of QIDs, e.g. (subclass, superclass).
+        """
+        node_positions = {}
+        sources = []
+        targets = []
+        for source, target in edges:
+            sources.append(node_positions.setdefault(source, len(node_positions)))
+            targets.append(node_positions.setdefault(target, len(node_positions)))
+        indptr, indices = _to_csr(
+            np.array(sources, dtype=np.int64),
+            np.array(targets, dtype=np.int64),
+            len(node_positions),
+        )
+        return cls(list(node_positions), indptr, indices)
+
+    @classmethod
+    def from_wikidata(
+        cls,
+        seed_qids,
+        wikidata_property="P279",
+        direction="ancestors",
+        chunk_size=VALUES_CHUNK_SIZE,
+    ):
+        """
+        Fetches the edges around a set of seed items from Wikidata, once.
+
+        Args:
+          seed_qids (list): The QIDs the graph should cover.
+          wikidata_property (str): The PID of the property used as edges. Defaults to "P279".
+          direction (str): "ancestors" fetches all edges reachable upwards from the seeds,
+            "descendants" all edges reachable downwards. Defaults to "ancestors".
+          chunk_size (int): The number of seeds per query.
+        """
+        if direction == "ancestors":
+            pattern = f"?seed wdt:{wikidata_property}* ?item ."
+        elif direction == "descendants":
+            pattern = f"?item wdt:{wikidata_property}* ?seed ."
+        else:
+            raise ValueError(f"Unknown direction: {direction}")
+
+        edges = set()
+        for seeds in chunk(seed_qids, chunk_size):
+            query = f"""
+  SELECT DISTINCT
+  (REPLACE(STR(?item), ".*Q", "Q") AS ?source)
+  (REPLACE(STR(?value), ".*Q", "Q") AS ?target)
+  WHERE {{
+    VALUES ?seed {format_with_prefix(seeds)} .
+    {pattern}
+    ?item wdt:{wikidata_property} ?value .
+  }}"""
+            for entry in query_wikidata(query):
+                edges.add((entry["source"], entry["target"]))
+        return cls.from_edges(sorted(edges))
+
+    @classmethod
+    def load(cls, path):
+        """Loads a graph saved with `save`."""
+        with np.load(Path(path), allow_pickle=False) as data:
+            closure_indptr = (
+                data["closure_indptr"] if "closure_indptr" in data else None
+            )
+            closure_indices = (
+                data["closure_indices"] if "closure_indices" in data else None
+            )
+            return cls(
+                data["nodes"].tolist(),
+                data["indptr"],
+                data["indices"],
+                closure_indptr,
+                closure_indices,
+            )
+
+    def save(self, path):
+        """Saves the graph, including the precomputed closure if available, as a .npz file."""
+        arrays = {
+            "nodes": np.array(self.nodes, dtype=str),
+            "indptr": self.indptr,
+            "indices": self.indices,
+        }
+        if self.closure_indptr is not None:
+            arrays["closure_indptr"] = self.closure_indptr
+            arrays["closure_indices"] = self.closure_indices
+        with open(Path(path), "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    def compute_closure(self):
+        """
+        Precomputes the transitive closure, so that `ancestors` and `is_linked` are lookups.
+        """
+        closure_sets = [
+            self._traverse(position, self.indptr, self.indices)
+            for position in range(len(self.nodes))
+        ]
+        lengths = np.array([len(reached) for reached in closure_sets], dtype=np.int64)
+        self.closure_indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.closure_indices = np.fromiter(
+            (position for reached in closure_sets for position in sorted(reached)),
+            dtype=np.int64,
+            count=int(self.closure_indptr[-1]),
+        )
+
+    def ancestors(self, qid):
+        """Returns the set of QIDs reachable from qid following the edges."""
+        position = self.node_positions.get(qid)
+        if position is None:
+            return set()
+        if self.closure_indptr is not None:
+            start, end = (
+                self.closure_indptr[position],
+                self.closure_indptr[position + 1],
+            )
+            reached = self.closure_indices[start:end]
+        else:
+            reached = self._traverse(position, self.indptr, self.indices)
+        return {self.nodes[i] for i in reached}
+
+    def descendants(self, qid):
+        """Returns the set of QIDs from which qid is reachable following the edges."""
+        position = self.node_positions.get(qid)
+        if position is None:
+            return set()
+        reverse_indptr, reverse_indices = self._reverse_csr()
+        reached = self._traverse(position, reverse_indptr, reverse_indices)
+        return {self.nodes[i] for i in reached}
+
+    def is_linked(self, qid_a, qid_b):
+        """Returns True if qid_b is reachable from qid_a, as in `?a wdt:P279* ?b`."""
+        if qid_a == qid_b:
+            return True
+        position_a = self.node_positions.get(qid_a)
+        position_b = self.node_positions.get(qid_b)
+        if position_a is None or position_b is None:
+            return False
+        if self.closure_indptr is not None:
+            start, end = self.closure_indptr[position_a : position_a + 2]
+            reached = self.closure_indices[start:end]
+            found = np.searchsorted(reached, position_b)
+            return bool(found < len(reached) and reached[found] == position_b)
+        return position_b in self._traverse(position_a, self.indptr, self.indices)
+
+    def detect_links(self, list_of_qids):
+        """
+        Detects pairs from a list of QIDs with links to each other, locally.
+
+        Mirrors `wdcuration.sparql.detect_direct_links` with the default "wdt:P279*" link.
+
+        Returns:
+          list: A list of {"a": QID, "b": QID} dicts, one for each linked pair.
+        """
+        qids = {x for x in list_of_qids if str(x) != "nan"}
+        links = []
+        for qid_a in sorted(qids):
+            for qid_b in sorted(self.ancestors(qid_a) & qids):
+                if qid_a != qid_b:
+                    links.append({"a": qid_a, "b": qid_b})
+        return links
+
+    def _reverse_csr(self):
+        if self._reverse is None:
+            sources = np.repeat(
+                np.arange(len(self.nodes), dtype=np.int64), np.diff(self.indptr)
+            )
+            self._reverse = _to_csr(self.indices, sources, len(self.nodes))
+        return self._reverse
+
+    @staticmethod
+    def _traverse(start, indptr, indices):
+        reached = set()
+        queue = deque([start])
+        while queue:
+            position = queue.popleft()
+            for neighbour in indices[indptr[position] : indptr[position + 1]].tolist():
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    queue.append(neighbour)
+        reached.discard(start)
+        return reached
+
+
+def _to_csr(sources, targets, n_nodes):
+    order = np.argsort(sources, kind="stable")
+    counts = np.bincount(sources, minlength=n_nodes)
+    indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return indptr, targets[order].astype(np.int64)
@@ -1,5 +1,13 @@
+import json
+import re
+import unicodedata
 from itertools import islice
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 def divide_in_chunks_of_equal_len(arr_range, arr_size, return_type="iter"):
     """Breaks up a list into a list of lists"""
@@ -14,3 +22,58 @@ def chunk(arr_range, arr_size, return_type="iter"):
     else:
         arr_range = iter(arr_range)
         return list(iter(lambda: tuple(islice(arr_range, arr_size)), ()))
+
+
+def json_loads(data):
+    """
+    Decodes JSON from bytes or str, with orjson when it is installed
+    (`pip install wdcuration[fast]`) and with the json module otherwise.
+
+    Raises:
+      json.JSONDecodeError: If data is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def truthy_values(entity, wikidata_property, datavalues=False):
+    """
+    Returns the values for a property in a Wikidata entity (JSON), following the "truthy" (wdt:) rules.
+
+    Preferred statements win over normal ones, deprecated statements and
+    statements without a value ("somevalue", "novalue") are ignored.
+    Item values are returned as QIDs, other values as in the JSON.
+
+    Args:
+      entity (dict): The entity, as in dumps or wbgetentities responses.
+      wikidata_property (str): The PID of the property.
+      datavalues (bool): If True, returns the full datavalue dicts (with "type" and "value") instead.
+    """
+    statements = entity.get("claims", {}).get(wikidata_property, [])
+    preferred = [s for s in statements if s.get("rank") == "preferred"]
+    if not preferred:
+        preferred = [s for s in statements if s.get("rank", "normal") == "normal"]
+    values = []
+    for statement in preferred:
+        snak = statement["mainsnak"]
+        if snak.get("snaktype", "value") != "value":
+            continue
+        if datavalues:
+            values.append(snak["datavalue"])
+            continue
+        value = snak["datavalue"]["value"]
+        if isinstance(value, dict) and "id" in value:
+            value = value["id"]
+        values.append(value)
+    return values
+
+
+def normalize_label(text):
+    """
+    Normalizes a label for matching: accents removed, case folded,
+    punctuation replaced by spaces and whitespace collapsed.
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[\W_]+", " ", stripped.casefold()).split())
@@ -1,7 +1,7 @@
 from tqdm import tqdm
 from wdcuration import divide_in_chunks_of_equal_len
-import time
-import requests
+from wdcuration.scheduler import get_scheduler
+from wdcuration.utils import json_loads
 
 
 def get_qids_from_enwiki_pages(pages):
@@ -13,7 +13,6 @@ def get_qids_from_enwiki_pages(pages):
     if len(pages) > 50:
         for pages in tqdm(divide_in_chunks_of_equal_len(pages, 50, "list")):
             pages_with_wikidata_ids.update(get_qids_from_enwiki_pages(pages))
-            time.sleep(0.2)
         return pages_with_wikidata_ids
     else:
         url = "https://en.wikipedia.org/w/api.php?action=query"
@@ -24,8 +23,8 @@ def get_qids_from_enwiki_pages(pages):
             "redirects": "1",
             "titles": "|".join(pages),
         }
-        r = requests.get(url, params)
-        data = r.json()
+        r = get_scheduler().request("GET", url, params=params)
+        data = json_loads(r.content)
         id_dict = {}
         for key, values in data["query"]["pages"].items():
             title = values["title"]